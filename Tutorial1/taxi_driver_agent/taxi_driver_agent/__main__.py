@@ -1,12 +1,13 @@
 import logging
 import os
 import time
-from typing import Optional
+from typing import Callable, Optional
 
 import fire
 import gymnasium as gym
 import numpy as np
 from taxi_driver_env.utils.colorize import colorize
+from taxi_driver_env.utils.profiler import format_summary
 from tqdm import trange
 
 import taxi_driver_agent.pyflow as pf
@@ -18,20 +19,10 @@ BAR_FORMAT = "{l_bar}{bar}| {n_fmt}/{total_fmt}"
 class Agent:
     CK = np.array([0.25, 0.5, 0.25])
 
-    def __init__(
-        self,
-        model: Optional[pf.Sequential] = None,
-        mutate: bool = False,
-        timestep: int = 0,
-    ) -> None:
+    def __init__(self, model: Optional[pf.Sequential] = None, timestep: int = 0) -> None:
         self.fitness = 0.0
-
-        lr = pf.functions.lr_exp_decay(timestep, 1000, np.log(0.1), 0.1, 0.001)
         self.model = get_agent_model() if model is None else model.clone()
-        self.model.compile(optimizer=pf.optimizers.sgd(momentum=(1 - lr), lr=lr, nesterov=True))
-
-        if mutate:
-            self.model.fit(epochs=1, shuffle=False, verbose=False)
+        self.model.compile(optimizer=get_optimizer(timestep))
 
     def get_model(self) -> pf.Sequential:
         return self.model
@@ -43,11 +34,10 @@ class Agent:
         self.fitness = fitness
         return self
 
-    def get_action(self, observation: dict[str, np.ndarray]) -> np.ndarray:
+    @staticmethod
+    def get_input(observation: dict[str, np.ndarray]) -> np.ndarray:
         vel, cam = observation["agent_vel"], observation["agent_cam"]
-        x = np.concat([vel, np.convolve(cam, Agent.CK, "same")])
-        y = self.model.predict(x)
-        return y[0]
+        return np.concat([vel, np.convolve(cam, Agent.CK, "same")]).astype(pf.functions.floatx())
 
 
 def get_agent_model() -> pf.Sequential:
@@ -61,18 +51,14 @@ def get_agent_model() -> pf.Sequential:
     )
 
 
-def spawn_agents(
-    mode: str,
-    agent_count: int,
-    model_or_pool: Optional[pf.Sequential] | pf.GeneticPool,
-    mutate: bool,
-    timestep: int = 0,
-) -> list[Agent]:
-    get_model = lambda: (
-        model_or_pool.select_parent().get_model() if isinstance(model_or_pool, pf.GeneticPool) else model_or_pool
-    )
+def get_optimizer(timestep: int) -> Callable:
+    lr = pf.functions.lr_exp_decay(timestep, 1000, np.log(0.1), 0.1, 0.001)
+    return pf.optimizers.sgd(momentum=(1 - lr), lr=lr, nesterov=True)
+
+
+def spawn_agents(mode: str, agent_count: int, model: Optional[pf.Sequential], timestep: int = 0) -> list[Agent]:
     return [
-        Agent(get_model(), mutate, timestep)
+        Agent(model, timestep)
         for _ in trange(
             agent_count,
             desc=f"Spawning agents ({mode})",
@@ -82,14 +68,81 @@ def spawn_agents(
     ]
 
 
+def select_parents(scores: np.ndarray, count: int, method: str) -> np.ndarray:
+    pool = pf.GeneticPool(fitness=scores)
+    pool.sample()
+    pool.normalize()
+    return pool.select_parents(count, method)
+
+
+def evolve_generation(
+    population: pf.Population, scores: np.ndarray, timestep: int, selection: str, crossover: bool
+) -> None:
+    population.evolve(
+        select_parents(scores, len(population), selection),
+        get_optimizer(timestep),
+        mates=select_parents(scores, len(population), selection) if crossover else None,
+    )
+
+
+def capture_checkpoint(env: gym.Env, population: pf.Population, scores: np.ndarray, timestep: int) -> pf.Checkpoint:
+    # The spawn location moves forward with the best agents, the next reset must start from the same one
+
+    index, point = env.unwrapped.get_spawn_location()  # type: ignore
+    spawn_location = (index, point.tolist() if point is not None else None)
+    return pf.Checkpoint.capture(population, scores, timestep, {"spawn_location": spawn_location})
+
+
+def resume_training(
+    checkpoint_file: str,
+    population: pf.Population,
+    archive: Optional[pf.Population],
+    archive_scores: np.ndarray,
+    selection: str,
+    crossover: bool,
+) -> tuple[int, int, dict]:
+    """Restores the training from a checkpoint, and returns the time step, the evaluated count and the reset options."""
+    checkpoint = pf.Checkpoint.load(checkpoint_file)
+    logging.warning(colorize(f"Resuming the training at the time step {checkpoint.timestep} ...", "yellow"))
+    options = {"spawn_location": checkpoint.extra.get("spawn_location")}
+
+    if archive is None:
+        # The checkpoint is the evaluated generation, its children are bred again from the restored generators
+
+        checkpoint.restore(population)
+        evolve_generation(population, checkpoint.fitness, checkpoint.timestep, selection, crossover)
+        return checkpoint.timestep, 0, options
+
+    # In autoreset mode, the checkpoint is the full archive and its time step counts the evaluated agents. The
+    # episode was not saved, so it restarts
+
+    checkpoint.restore(archive)
+    archive_scores[:] = checkpoint.fitness
+    population.copy_from(archive, np.arange(len(archive)), np.arange(len(archive)))
+    return checkpoint.timestep - 1, len(archive), options
+
+
 def main(
     seed: int = 5,
     mode: str = "training",
     agent_count: int = 100,
     model_file: Optional[str] = None,
     render_fps: Optional[int] = None,
+    render_every: int = 1,
+    uncapped: bool = False,
+    headless: bool = False,
     duration: float = 15.0,
     timestep: int = 0,
+    max_timestep: Optional[int] = None,
+    profile: bool = False,
+    profile_file: Optional[str] = None,
+    record_file: Optional[str] = None,
+    autoreset: bool = False,
+    crossover: bool = False,
+    selection: str = "roulette",
+    checkpoint_file: Optional[str] = None,
+    checkpoint_every: float = 5.0,
+    resume: bool = False,
 ) -> None:
     """Welcome to the taxi driver simulation tutorial!
 
@@ -105,21 +158,44 @@ def main(
     agent_count: Number of agents to run during a training.
     model_file: Load the model file to initialize the agent' networks. AFter a training, the new model will be saved as
                 model_file.new
-    render_fps: Set the frame per second during a training.
+    render_fps: Set the frame per second during a training. In uncapped mode, it is the refresh rate of the window.
+    render_every: Render one frame every render_every simulation steps.
+    uncapped: Run the simulation as fast as possible and refresh the window at render_fps in wall-clock time.
+    headless: Run the simulation without a window.
     duration: Duration in minutes of the simulation.
     timestep: Set the starting timestep. It is used to calculate the learning rate.
+    max_timestep: Stop the simulation when the timestep reaches this value, even before the end of the duration.
+    profile: Time the phases of each simulation step and print a summary at the end.
+    profile_file: Record a cProfile of the simulation into this file, it can be opened with snakeviz.
+    record_file: Record the episodes and the actions of the agents into this file, it can be replayed with
+                 `python -m taxi_driver_env.replay`.
+    autoreset: Replace each destroyed agent at once by a child of the best agents evaluated recently, instead of
+               waiting for all the agents to be destroyed.
+    crossover: Mix the parameters of two parents to create a child, instead of mutating a single parent.
+    selection: Set the selection of the parents; 'roulette', 'tournament' or 'rank'.
+    checkpoint_file: Save the agents, their fitness and the state of the random generators into this file during a
+                     training, in the background.
+    checkpoint_every: Duration in minutes between two checkpoints.
+    resume: Restore the agents from the checkpoint file and continue the training.
     """
     assert seed >= 0
     assert mode in ("training", "validation")
     assert mode == "training" or mode == "validation" and model_file is not None
     assert agent_count > 0
     assert render_fps is None or render_fps > 0
+    assert render_every > 0
     assert duration > 0
     assert timestep >= 0
+    assert max_timestep is None or max_timestep > timestep
+    assert selection in ("roulette", "tournament", "rank")
+    assert checkpoint_every > 0
+    assert not resume or checkpoint_file is not None and os.path.exists(checkpoint_file)
 
     if mode == "validation":
         agent_count = 1
         render_fps = 60
+        render_every = 1
+        uncapped = False
 
     if model_file is not None and os.path.exists(model_file):
         best_model = get_agent_model()
@@ -130,23 +206,79 @@ def main(
     env = gym.make(
         "tutorial1/Tutorial1-v1",
         agent_count=agent_count,
-        render_mode="human",
+        render_mode=None if headless else "human",
         render_fps=render_fps,
+        render_every=render_every,
+        uncapped=uncapped,
+        profile=profile,
+        profile_file=profile_file,
+        record_file=record_file,
+        autoreset=autoreset,
     )
 
-    agents = spawn_agents(mode, agent_count, best_model, False, timestep)
+    # The generators are seeded before the agents are spawned, so their initial weights are reproductible
+
     observation, info = env.reset(seed=seed)
+    agents = spawn_agents(mode, agent_count, best_model, timestep)
+    population = pf.Population([agent.model for agent in agents])
+
+    # In autoreset mode, the parents are selected among the last evaluated agents, kept in a ring buffer
+
+    archive = pf.Population([agent.model.clone() for agent in agents]) if autoreset else None
+    archive_scores = np.zeros(agent_count)
+    evaluated_count = 0
+
+    if resume:
+        # The generators are restored after the first reset, the episode is reset again from them as it was after the
+        # checkpoint
+
+        timestep, evaluated_count, options = resume_training(
+            checkpoint_file, population, archive, archive_scores, selection, crossover
+        )
+        observation, info = env.reset(options=options)
+
+    writer = pf.CheckpointWriter(checkpoint_file) if mode == "training" and checkpoint_file is not None else None
+    t_checkpoint = time.monotonic() + 60 * checkpoint_every
 
     t_end = time.monotonic() + 60 * duration
-    while time.monotonic() < t_end:
-        action = [agent.get_action(obs) for agent, obs in zip(agents, observation, strict=True)]
+    while time.monotonic() < t_end and (max_timestep is None or timestep < max_timestep):
+        action = population.predict(np.array([Agent.get_input(obs) for obs in observation]))
 
-        observation, _, terminated, truncated, info = env.step(action)
+        # The models compute in float32, the simulation in float64
+
+        observation, _, terminated, truncated, info = env.step(action.astype(np.float64))
         scores, best_agent_vin = info["scores"], info["best_agent_vin"]
 
         if best_agent_vin >= 0:
             best_model = agents[best_agent_vin].model
 
+        if archive is not None and np.any(info["dones"]):
+            dones = np.flatnonzero(info["dones"])
+            ring = (evaluated_count + np.arange(len(dones))) % agent_count
+            archive.copy_from(population, dones, ring)
+            archive_scores[ring] = info["final_scores"][dones]
+            evaluated_count += len(dones)
+
+            if mode == "training":
+                # The children overwrite the models in place, the best one is kept aside
+
+                best_model = best_model.clone() if best_model is not None else None
+                candidates = archive_scores[: min(evaluated_count, agent_count)]
+                population.evolve(
+                    select_parents(candidates, len(dones), selection),
+                    get_optimizer(timestep + evaluated_count // agent_count),
+                    mates=select_parents(candidates, len(dones), selection) if crossover else None,
+                    slots=dones,
+                    source=archive,
+                )
+
+                # The archive is the pool once it is full, its generation is the number of agents evaluated
+
+                if writer is not None and evaluated_count >= agent_count and time.monotonic() >= t_checkpoint:
+                    generation = timestep + evaluated_count // agent_count
+                    writer.submit(capture_checkpoint(env, archive, archive_scores, generation))
+                    t_checkpoint = time.monotonic() + 60 * checkpoint_every
+
         if terminated or truncated:
             logging.warning(
                 colorize(
@@ -157,16 +289,26 @@ def main(
             timestep += 1
 
             if mode == "training":
-                pool = pf.GeneticPool([agent.set_fitness(score) for agent, score in zip(agents, scores, strict=True)])
-                pool.sample()
-                pool.normalize()
-                agents = spawn_agents(mode, agent_count, pool, True, timestep)
+                # The checkpoint holds the agents with the scores they were evaluated with, before they are replaced
+
+                if writer is not None and time.monotonic() >= t_checkpoint:
+                    writer.submit(capture_checkpoint(env, population, np.array(scores), timestep))
+                    t_checkpoint = time.monotonic() + 60 * checkpoint_every
+
+                best_model = best_model.clone() if best_model is not None else None
+                evolve_generation(population, np.array(scores), timestep, selection, crossover)
 
             observation, info = env.reset()
 
     if mode == "training" and model_file is not None and best_model is not None:
         best_model.save(f"{model_file}.new")
 
+    if writer is not None:
+        writer.close()
+
+    if profile:
+        print(format_summary(env.unwrapped.profile_summary()))  # type: ignore
+
     env.close()
 
 
@@ -0,0 +1,20 @@
+import fire
+
+from taxi_driver_agent.__main__ import get_agent_model
+
+
+def main(json_file: str, model_file: str) -> None:
+    """Converts a model file of the agent from the JSON format to the binary format.
+
+    Params:
+    -------
+    json_file: The model file in the JSON format.
+    model_file: The model file to write in the binary format, which can be loaded memory mapped.
+    """
+    model = get_agent_model()
+    model.load(json_file)
+    model.save(model_file)
+
+
+if __name__ == "__main__":
+    fire.Fire(main)
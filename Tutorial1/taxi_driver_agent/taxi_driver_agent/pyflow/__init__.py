@@ -1,8 +1,13 @@
 from taxi_driver_agent.pyflow import (
+    binary,  # noqa: F401
     functions,  # noqa: F401
     layers,  # noqa: F401
     optimizers,  # noqa: F401
 )
+from taxi_driver_agent.pyflow.checkpoint import *  # noqa: F403
+from taxi_driver_agent.pyflow.dataset import *  # noqa: F403
 from taxi_driver_agent.pyflow.genetic import *  # noqa: F403
 from taxi_driver_agent.pyflow.gradient import *  # noqa: F403
+from taxi_driver_agent.pyflow.parallel import *  # noqa: F403
+from taxi_driver_agent.pyflow.population import *  # noqa: F403
 from taxi_driver_agent.pyflow.sequential import *  # noqa: F403
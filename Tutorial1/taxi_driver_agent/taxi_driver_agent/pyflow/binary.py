@@ -0,0 +1,111 @@
+import json
+import struct
+
+import numpy as np
+
+from taxi_driver_agent.pyflow.core import Layer
+
+MAGIC = b"PYFL"
+VERSION = 2
+ALIGNMENT = 64  # bytes
+
+# The file is a prefix, a JSON header describing its content, then the arrays as little endian blobs, each one starting
+# at an offset aligned for the memory mapping. The header lists the dtype, the shape and the offset of the blobs
+
+PREFIX = struct.Struct("<4sHI")  # magic, version, offset of the first blob
+
+
+def is_binary(file_path: str) -> bool:
+    with open(file_path, "rb") as f:
+        return f.read(len(MAGIC)) == MAGIC
+
+
+def write(file_path: str, header: dict, blobs: list[np.ndarray]) -> None:
+    """Writes a header of JSON values and arrays."""
+    blobs = [np.ascontiguousarray(blob, dtype=blob.dtype.newbyteorder("<")) for blob in blobs]
+
+    offsets, offset = [], 0
+    for blob in blobs:
+        offsets.append(offset)
+        offset = _align(offset + blob.nbytes)
+
+    header = header | {
+        "blobs": [
+            {"dtype": blob.dtype.str, "shape": blob.shape, "offset": offset}
+            for blob, offset in zip(blobs, offsets, strict=True)
+        ]
+    }
+    data = json.dumps(header).encode()
+    start = _align(PREFIX.size + len(data))
+
+    with open(file_path, "wb") as f:
+        f.write(PREFIX.pack(MAGIC, VERSION, start))
+        f.write(data)
+        for blob, offset in zip(blobs, offsets, strict=True):
+            f.seek(start + offset)
+            f.write(blob.tobytes())
+
+
+def read(file_path: str, mmap: bool = False) -> tuple[dict, list[np.ndarray]]:
+    """Reads a header and arrays, with mmap the arrays are read-only views of the file."""
+    buffer = np.memmap(file_path, dtype=np.uint8, mode="r") if mmap else np.fromfile(file_path, dtype=np.uint8)
+    magic, version, start = PREFIX.unpack_from(buffer)
+    assert magic == MAGIC, "Not a pyflow file"
+    assert version in (1, VERSION), f"Unsupported pyflow file version {version}"
+
+    header = json.loads(buffer[PREFIX.size : start].tobytes().rstrip(b"\0"))
+    if version == 1:
+        header = _upgrade_version_1(header)
+    blobs = []
+    for bt in header.pop("blobs"):
+        dtype, shape, offset = np.dtype(bt["dtype"]), tuple(bt["shape"]), start + bt["offset"]
+        blobs.append(buffer[offset : offset + dtype.itemsize * int(np.prod(shape))].view(dtype).reshape(shape))
+    return header, blobs
+
+
+def save(layers: list[Layer], file_path: str) -> None:
+    """Writes the weights of the layers, the optimizer states are not saved."""
+    header = {
+        "kind": "model",
+        "layers": [{"class": type(lr).__name__, "activation": getattr(lr, "activation_name", None)} for lr in layers],
+    }
+    write(file_path, header, [p.data for lr in layers for p in (lr.kernel, lr.bias)])
+
+
+def load(layers: list[Layer], file_path: str, mmap: bool = False) -> None:
+    """Reads the weights of the layers, which must have the architecture saved in the file.
+
+    With mmap, the parameters become read-only views of the file, so the processes loading the same file share its
+    pages. Such a model can predict but not be trained.
+    """
+    header, blobs = read(file_path, mmap)
+    assert header["kind"] == "model", f"The file is a {header['kind']}, not a model"
+    assert len(header["layers"]) == len(layers), "The model file has a different number of layers"
+
+    params = iter(blobs)
+    for lr, dt in zip(layers, header["layers"], strict=True):
+        assert dt["class"] == type(lr).__name__, f"The model file has a {dt['class']} layer"
+        activation = getattr(lr, "activation_name", None)
+        assert dt["activation"] == activation, f"The model file has a {dt['activation']} activation"
+        for p, array in ((lr.kernel, next(params)), (lr.bias, next(params))):
+            assert array.shape == p.data.shape, f"The model file has a {array.shape} parameter"
+            if mmap:
+                p.data = array.astype(p.data.dtype, copy=False)
+                p.state = None
+            else:
+                p[0] = array
+
+
+def _upgrade_version_1(header: dict) -> dict:
+    # The version 1 only held models, with one dtype for all the parameters and their blobs listed in the layers
+
+    dtype = np.dtype(header["dtype"]).newbyteorder("<").str
+    return {
+        "kind": "model",
+        "layers": [{"class": dt["class"], "activation": dt["activation"]} for dt in header["layers"]],
+        "blobs": [{"dtype": dtype, **pt} for dt in header["layers"] for pt in dt["params"]],
+    }
+
+
+def _align(offset: int) -> int:
+    return -(-offset // ALIGNMENT) * ALIGNMENT
@@ -0,0 +1,133 @@
+from __future__ import annotations
+
+import os
+import random
+import threading
+from dataclasses import dataclass, field
+from typing import Optional
+
+import numpy as np
+
+from taxi_driver_agent.pyflow import binary
+from taxi_driver_agent.pyflow.population import Population
+
+
+@dataclass
+class Checkpoint:
+    """This class holds a copy of a population, with the fitness of its models and the state of the random generators.
+
+    Restoring it gives back the same models, and the same random draws for the following selections and mutations.
+    The extra values are saved along for the caller, such as the state of the environment.
+    """
+
+    kernels: list[np.ndarray]
+    biases: list[np.ndarray]
+    fitness: np.ndarray
+    timestep: int
+    np_random_state: dict
+    random_state: tuple
+    extra: dict = field(default_factory=dict)
+
+    @staticmethod
+    def capture(population: Population, fitness: np.ndarray, timestep: int, extra: Optional[dict] = None) -> Checkpoint:
+        return Checkpoint(
+            [x.copy() for x in population.kernels],
+            [x.copy() for x in population.biases],
+            np.array(fitness, dtype=np.float64),
+            timestep,
+            np.random.get_state(legacy=False),
+            random.getstate(),
+            extra if extra is not None else {},
+        )
+
+    def restore(self, population: Population) -> None:
+        population.restore(self.kernels, self.biases)
+        np.random.set_state(self.np_random_state)
+        random.setstate(self.random_state)
+
+    def save(self, file_path: str) -> None:
+        """Writes the checkpoint to a temporary file first, then replaces the file, so it is never left truncated."""
+        np_random_state = self.np_random_state | {"state": {"pos": self.np_random_state["state"]["pos"]}}
+        header = {
+            "kind": "population",
+            "layers": len(self.kernels),
+            "timestep": self.timestep,
+            "np_random_state": np_random_state,
+            "random_state": self.random_state,
+            "extra": self.extra,
+        }
+        blobs = [*self.kernels, *self.biases, self.fitness, self.np_random_state["state"]["key"]]
+
+        binary.write(f"{file_path}.tmp", header, blobs)
+        os.replace(f"{file_path}.tmp", file_path)
+
+    @staticmethod
+    def load(file_path: str) -> Checkpoint:
+        header, blobs = binary.read(file_path)
+        assert header["kind"] == "population", f"The file is a {header['kind']}, not a population"
+
+        n = header["layers"]
+        np_random_state = header["np_random_state"]
+        np_random_state["state"]["key"] = blobs[2 * n + 1].copy()
+        version, state, gauss_next = header["random_state"]
+        return Checkpoint(
+            [x.copy() for x in blobs[:n]],
+            [x.copy() for x in blobs[n : 2 * n]],
+            blobs[2 * n].copy(),
+            header["timestep"],
+            np_random_state,
+            (version, tuple(state), gauss_next),
+            header.get("extra", {}),
+        )
+
+
+class CheckpointWriter:
+    """This class writes the checkpoints in a background thread, so the simulation does not wait for the disk.
+
+    Only the last submitted checkpoint waits to be written, an older one is dropped if it has not been written yet.
+    """
+
+    def __init__(self, file_path: str) -> None:
+        self.file_path = file_path
+        self.written = 0
+        self._pending: Optional[Checkpoint] = None
+        self._closed = False
+        self._error: Optional[BaseException] = None
+        self._condition = threading.Condition()
+        self._thread = threading.Thread(target=self._run, name="checkpoint-writer", daemon=True)
+        self._thread.start()
+
+    def submit(self, checkpoint: Checkpoint) -> None:
+        with self._condition:
+            assert not self._closed
+            self._raise_error()
+            self._pending = checkpoint
+            self._condition.notify()
+
+    def close(self) -> None:
+        """Writes the pending checkpoint and stops the thread."""
+        with self._condition:
+            self._closed = True
+            self._condition.notify()
+        self._thread.join()
+        self._raise_error()
+
+    def _run(self) -> None:
+        while True:
+            with self._condition:
+                self._condition.wait_for(lambda: self._pending is not None or self._closed)
+                checkpoint, self._pending = self._pending, None
+                if checkpoint is None:
+                    return
+
+            try:
+                checkpoint.save(self.file_path)
+                self.written += 1
+            except BaseException as e:
+                with self._condition:
+                    self._error = e
+                return
+
+    def _raise_error(self) -> None:
+        if self._error is not None:
+            raise RuntimeError(f"Writing the checkpoint {self.file_path} failed") from self._error
@@ -4,9 +4,11 @@ import copy
 from typing import Callable, Optional, Protocol
 
 import numpy as np
-from tqdm import trange
+from tqdm import tqdm
 
-from taxi_driver_agent.pyflow.functions import __functions__
+from taxi_driver_agent.pyflow.dataset import Dataset, as_dataset, is_streamed, prefetch
+from taxi_driver_agent.pyflow.functions import ZERO, __functions__, cast
+from taxi_driver_agent.pyflow.optimizers import is_stateless
 
 
 class Trainer(Protocol):
@@ -20,7 +22,8 @@ class Params:
 
     It allows for initialization of parameters,
     supports item setting and retrieval, copying, converting to and from list representations, and checking for
-    equality.
+    equality. The item 0 is the parameters, the items 1 and 2 are the state of the optimizer, allocated when an
+    optimizer keeping a state is applied for the first time.
     """
 
     def __init__(
@@ -28,46 +31,61 @@ class Params:
         shape: tuple[int, int],
         initializer: str = "zeros",
         data: Optional[np.ndarray] = None,
+        state: Optional[np.ndarray] = None,
     ) -> None:
         if data is None:
             init_func = __functions__[initializer]["func"]
-            data = np.array(
-                [
-                    init_func(shape[0], shape[1]),
-                    np.zeros(shape),
-                    np.zeros(shape),
-                ]
-            )
+            data = init_func(shape[0], shape[1])
         self.data = data
+        self.state = state
 
     def __getitem__(self, idx: int) -> np.ndarray:
-        return self.data[idx]
+        if idx == 0:
+            return self.data
+        return self.get_state()[idx - 1]
 
     def __setitem__(self, idx: int, data: np.ndarray) -> None:
-        self.data[idx] = data
+        if idx == 0:
+            self.data[...] = data
+        else:
+            self.get_state()[idx - 1] = data
 
     def __eq__(self, other) -> bool:
         if not isinstance(other, Params):
             return NotImplemented
-        return np.array_equal(self.data, other.data)
-
-    def apply_grad(self, data: np.ndarray) -> None:
-        self[0] += data[0]
-        self[1] = data[1]
-        self[2] = data[2]
+        if self.state is None and other.state is None:
+            return np.array_equal(self.data, other.data)
+        return np.array_equal(self.data, other.data) and np.array_equal(self.get_state(), other.get_state())
+
+    def get_state(self) -> np.ndarray:
+        if self.state is None:
+            self.state = np.zeros((2, *self.data.shape), dtype=self.data.dtype)
+        return self.state
+
+    def apply_grad(self, gradient: np.ndarray, optimizer_func: Callable) -> None:
+        if self.state is None and not is_stateless(optimizer_func):
+            self.get_state()
+        s, v = self.state if self.state is not None else (ZERO, ZERO)
+        x, s, v = optimizer_func(gradient, s, v)
+        self.data += x
+        if self.state is not None:
+            self.state[0] = s
+            self.state[1] = v
 
     def clone(self) -> Params:
-        shape = (self[0].shape[0], self[0].shape[1])
-        return Params(shape, data=self.data.copy())
+        shape = (self.data.shape[0], self.data.shape[1])
+        return Params(shape, data=self.data.copy(), state=self.state.copy() if self.state is not None else None)
 
     def to_list(self) -> list:
-        return self[0].tolist()
+        return self.data.tolist()
 
     def from_list(self, alist: list):
-        if len(alist) == 3:  # Old format # noqa: PLR2004
-            self.data = np.asarray(alist)
+        array = np.asarray(alist, dtype=self.data.dtype)
+        if array.ndim == 3:  # Old format with the state # noqa: PLR2004
+            self.data = array[0]
+            self.state = array[1:]
         else:
-            self[0] = np.asarray(alist)
+            self[0] = array
 
 
 class Layer:
@@ -85,13 +103,17 @@ class Layer:
     def call(self, x: np.ndarray, training: bool = False, **kwargs) -> np.ndarray:
         raise NotImplementedError
 
+    def infer(self, x: np.ndarray, z: np.ndarray, out: np.ndarray) -> np.ndarray:
+        """Computes the output for inference without allocating, z receives the pre-activations and out the output."""
+        raise NotImplementedError
+
     def backward(self, *args, **kwargs) -> list[np.ndarray]:
         raise NotImplementedError
 
     def apply_grad(self, gradient: tuple[np.ndarray, np.ndarray], optimizer_func: Callable) -> Layer:
         if self.trainable:
-            self.kernel.apply_grad(optimizer_func(gradient[0], self.kernel[1], self.kernel[2]))
-            self.bias.apply_grad(optimizer_func(gradient[1], self.bias[1], self.bias[2]))
+            self.kernel.apply_grad(gradient[0], optimizer_func)
+            self.bias.apply_grad(gradient[1], optimizer_func)
         return self
 
     def clone(self) -> Layer:
@@ -124,10 +146,10 @@ class Model:
     def clone(self) -> Model:
         raise NotImplementedError
 
-    def load(self, file_path: str) -> None:
+    def load(self, file_path: str, mmap: bool = False) -> None:
         raise NotImplementedError
 
-    def save(self, file_path: str) -> None:
+    def save(self, file_path: str, format: str = "binary") -> None:
         raise NotImplementedError
 
     def compile(self, optimizer: str | Callable = "rmsprop", loss: str = "mse") -> None:
@@ -142,19 +164,35 @@ class Model:
 
     def fit(
         self,
-        x: Optional[np.ndarray] = None,
+        x: Optional[np.ndarray | Dataset] = None,
         y: Optional[np.ndarray] = None,
         epochs: int = 10,
         batch_size: int = 128,
         shuffle: bool = True,
         verbose: bool = True,
+        prefetch_size: int = 2,
+        workers: int = 1,
     ) -> dict[str, list[float]]:
-        history: dict[str, list[float]] = {"loss": [], "accuracy": []}
+        """Trains the model on arrays, memory mapped arrays or a dataset.
+
+        The batches are gathered by a background thread, up to prefetch_size batches ahead of the training. With more
+        than one worker, each batch is split across worker processes computing the gradients of their part.
+        """
+        if workers > 1:
+            from taxi_driver_agent.pyflow import gradient, parallel
+
+            assert self.trainer is gradient, "Only the gradient trainer can run in parallel"
+            self.trainer = parallel.ParallelTrainer(workers)
+            try:
+                return self.fit(x, y, epochs, batch_size, shuffle, verbose, prefetch_size)
+            finally:
+                self.trainer.close()  # type: ignore
+                self.trainer = gradient
 
-        n = x.shape[0] if x is not None else 0
+        history: dict[str, list[float]] = {"loss": [], "accuracy": []}
 
-        batch_sample = np.arange(n)
-        batch_count = max(1, np.ceil(n / batch_size))
+        dataset = as_dataset(x, y)
+        batch_count = dataset.batch_count(batch_size)
 
         first_pass = True
 
@@ -162,29 +200,30 @@ class Model:
             if verbose:
                 print(f"Epoch {e}/{epochs}")
 
-            if shuffle:
-                np.random.shuffle(batch_sample)
+            batches = dataset.batches(batch_size, shuffle)
+            if prefetch_size > 0 and x is not None:
+                batches = prefetch(batches, prefetch_size)
 
             train_loss = 0
             train_accuracy = 0
 
-            bar = trange(
-                batch_count,
+            bar = tqdm(
+                batches,
+                total=batch_count,
                 ncols=120,
                 bar_format="{l_bar}{bar}| {n_fmt}/{total_fmt} [{elapsed}<{remaining}{postfix}]",
                 disable=not verbose,
             )
-            for i in bar:
-                sample = batch_sample[i * batch_size : (i + 1) * batch_size]
-                loss, accuracy = self.train_batch(x, y, sample)
+            for i, (x_batch, y_batch) in enumerate(bar, 1):
+                loss, accuracy = self.train_step(x_batch, y_batch)
 
                 if first_pass:
                     first_pass = False
                     history["loss"].append(loss)
                     history["accuracy"].append(accuracy)
 
-                train_loss += loss / batch_count
-                train_accuracy += accuracy / batch_count
+                train_loss += (loss - train_loss) / i
+                train_accuracy += (accuracy - train_accuracy) / i
                 bar.set_postfix({"loss": train_loss, "accuracy": train_accuracy})
 
             history["loss"].append(train_loss)
@@ -192,18 +231,35 @@ class Model:
 
         return history
 
-    def evaluate(self, x: np.ndarray, y: np.ndarray, verbose: bool = True) -> tuple[float, float, np.ndarray]:
-        """Evaluates the performance of the trained model on a test set."""
-        loss, accuracy, yhat = self.test_step(x, y)
+    def evaluate(
+        self, x: np.ndarray | Dataset, y: Optional[np.ndarray] = None, batch_size: int = 128, verbose: bool = True
+    ) -> tuple[float, float, np.ndarray]:
+        """Evaluates the performance of the trained model on a test set, given as arrays or as a dataset."""
+        if not is_streamed(x):
+            loss, accuracy, yhat = self.test_step(cast(x), cast(y))
+        else:
+            losses, accuracies, yhats = [], [], []
+            for x_batch, y_batch in prefetch(as_dataset(x, y).batches(batch_size, False)):
+                loss, accuracy, yhat = self.test_step(x_batch, y_batch)
+                losses.append(loss * len(yhat))
+                accuracies.append(accuracy * len(yhat))
+                yhats.append(yhat)
+            yhat = np.concatenate(yhats)
+            loss, accuracy = sum(losses) / len(yhat), sum(accuracies) / len(yhat)
+
         if verbose:
             print(f"Test loss: {loss}")
             print(f"Test accuracy: {accuracy}")
         return loss, accuracy, yhat
 
-    def predict(self, x: np.ndarray) -> np.ndarray:
-        """Uses the trained model to make predictions on new data."""
-        *_, yhat = self.call(x)
-        return yhat
+    def predict(self, x: np.ndarray | Dataset, batch_size: int = 128) -> np.ndarray:
+        """Uses the trained model to make predictions on new data, given as an array or as a dataset."""
+        if not is_streamed(x):
+            *_, yhat = self.call(cast(x))
+            return yhat
+
+        batches = prefetch(as_dataset(x).batches(batch_size, False))
+        return np.concatenate([self.predict(x_batch) for x_batch, _ in batches])
 
     def train_batch(self, x: Optional[np.ndarray], y: Optional[np.ndarray], sample: np.ndarray) -> tuple[float, float]:
         x_sample = x[sample] if x is not None else x
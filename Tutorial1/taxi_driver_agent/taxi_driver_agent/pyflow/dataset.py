@@ -0,0 +1,131 @@
+from __future__ import annotations
+
+import queue
+import threading
+from typing import Callable, Iterable, Iterator, Optional, Protocol, TypeVar
+
+import numpy as np
+
+from taxi_driver_agent.pyflow.functions import cast
+
+T = TypeVar("T")
+Batch = tuple[Optional[np.ndarray], Optional[np.ndarray]]
+
+
+class Dataset(Protocol):
+    def batch_count(self, batch_size: int) -> Optional[int]: ...
+
+    def batches(self, batch_size: int, shuffle: bool) -> Iterator[Batch]: ...
+
+
+class ArrayDataset:
+    """This class iterates over batches of arrays, in memory or memory mapped.
+
+    A batch is gathered from the arrays and converted to the dtype of the models only when it is needed, so memory
+    mapped arrays larger than the memory are read batch by batch.
+    """
+
+    def __init__(self, x: Optional[np.ndarray], y: Optional[np.ndarray] = None) -> None:
+        assert x is None or y is None or len(x) == len(y)
+        self.x = x
+        self.y = y
+
+    def __len__(self) -> int:
+        return len(self.x) if self.x is not None else 0
+
+    @staticmethod
+    def load(x_file: str, y_file: Optional[str] = None) -> ArrayDataset:
+        """Memory maps arrays saved with `np.save`."""
+        x = np.load(x_file, mmap_mode="r")
+        y = np.load(y_file, mmap_mode="r") if y_file is not None else None
+        return ArrayDataset(x, y)
+
+    def batch_count(self, batch_size: int) -> Optional[int]:
+        return max(1, -(-len(self) // batch_size))
+
+    def batches(self, batch_size: int, shuffle: bool) -> Iterator[Batch]:
+        # The order is drawn at once by the caller, so the random draws do not depend on the prefetch thread
+
+        order = np.random.permutation(len(self)) if shuffle else np.arange(len(self))
+        return self._iterate(order, batch_size)
+
+    def _iterate(self, order: np.ndarray, batch_size: int) -> Iterator[Batch]:
+        if self.x is None:
+            yield None, None
+            return
+
+        for i in range(0, len(order), batch_size):
+            sample = order[i : i + batch_size]
+            if isinstance(self.x, np.memmap):
+                sample = np.sort(sample)  # Reads the file forward
+            yield _take(self.x, sample), _take(self.y, sample)
+
+
+class GeneratorDataset:
+    """This class iterates over the batches yielded by a generator, created again at each epoch.
+
+    The generator is in charge of the shuffling, the batch size given to `fit` is ignored.
+    """
+
+    def __init__(self, generator_func: Callable[[], Iterable[Batch]]) -> None:
+        self.generator_func = generator_func
+
+    def batch_count(self, batch_size: int) -> Optional[int]:
+        return None
+
+    def batches(self, batch_size: int, shuffle: bool) -> Iterator[Batch]:
+        return ((cast(x), cast(y)) for x, y in self.generator_func())
+
+
+def as_dataset(x: Optional[np.ndarray | Dataset], y: Optional[np.ndarray] = None) -> Dataset:
+    if isinstance(x, (ArrayDataset, GeneratorDataset)):
+        assert y is None
+        return x
+    return ArrayDataset(x, y)  # type: ignore
+
+
+def is_streamed(x: object) -> bool:
+    """Tells if the data must be read batch by batch, rather than at once."""
+    return isinstance(x, (ArrayDataset, GeneratorDataset, np.memmap))
+
+
+def prefetch(items: Iterator[T], size: int = 2) -> Iterator[T]:
+    """Iterates over items produced in a background thread, up to size items ahead of the consumer."""
+    buffer: queue.Queue = queue.Queue(maxsize=size)
+    stop = threading.Event()
+
+    def put(item: tuple) -> bool:
+        while not stop.is_set():
+            try:
+                buffer.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def run() -> None:
+        try:
+            for item in items:
+                if not put((True, item)):
+                    return
+            put((False, None))
+        except BaseException as e:
+            put((False, e))
+
+    thread = threading.Thread(target=run, name="prefetch", daemon=True)
+    thread.start()
+    try:
+        while True:
+            ok, item = buffer.get()
+            if not ok:
+                if item is not None:
+                    raise item
+                return
+            yield item
+    finally:
+        stop.set()
+        thread.join()
+
+
+def _take(x: Optional[np.ndarray], sample: np.ndarray) -> Optional[np.ndarray]:
+    return cast(np.take(x, sample, axis=0)) if x is not None else None
@@ -1,56 +1,101 @@
-from typing import Callable
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Callable, Optional
 
 import numpy as np
+import numpy.typing as npt
 
 ZERO = 0.0
 EPS = 1e-7
 
 
-def ac_lin(x):
-    return x
+@dataclass
+class Policy:
+    floatx: np.dtype = field(default_factory=lambda: np.dtype(np.float32))
+
+
+@lru_cache(1)
+def get_policy() -> Policy:
+    return Policy()
+
+
+def floatx() -> np.dtype:
+    """Returns the dtype of the parameters, the optimizer states, the inputs and the activations of the models."""
+    return get_policy().floatx
+
+
+def set_floatx(dtype: npt.DTypeLike) -> None:
+    """Sets the dtype of the models created from now on, float32 by default."""
+    assert np.dtype(dtype) in (np.float32, np.float64)
+    get_policy().floatx = np.dtype(dtype)
+
+
+def cast(x: Optional[npt.ArrayLike]) -> Optional[np.ndarray]:
+    """Converts an input to the dtype of the models, without a copy if it has it already."""
+    return np.asarray(x, dtype=floatx()) if x is not None else None
+
+
+# The activations write into out when it is given, it must not be x
+
+
+def ac_lin(x, out=None):
+    if out is None:
+        return x
+    np.copyto(out, x)
+    return out
 
 
 def ac_lin_prime(y):
     return 1.0
 
 
-def ac_tanh(x):
-    return np.tanh(x)
+def ac_tanh(x, out=None):
+    return np.tanh(x, out=out)
 
 
 def ac_tanh_prime(y):
     return 1.0 - y**2
 
 
-def ac_sigmoid(x):
-    return np.exp(-np.logaddexp(0, -x))
+def ac_sigmoid(x, out=None):
+    if out is None:
+        return np.exp(-np.logaddexp(0, -x))
+    np.negative(x, out=out)
+    np.logaddexp(0, out, out=out)
+    np.negative(out, out=out)
+    return np.exp(out, out=out)
 
 
 def ac_sigmoid_prime(y):
     return y * (1.0 - y)
 
 
-def ac_relu(x):
-    return np.where(x <= ZERO, 0.0, x)
+def ac_relu(x, out=None):
+    if out is None:
+        return np.where(x <= ZERO, 0.0, x)
+    return np.maximum(x, ZERO, out=out)
 
 
 def ac_relu_prime(y):
-    return np.where(y == ZERO, 0.0, 1.0)
+    return (y != ZERO).astype(y.dtype)
 
 
-def ac_leaky_relu(x, a=0.1):
-    return np.where(x <= ZERO, a * x, x)
+def ac_leaky_relu(x, a=0.1, out=None):
+    if out is None:
+        return np.where(x <= ZERO, a * x, x)
+    np.multiply(x, a, out=out)
+    return np.maximum(x, out, out=out)
 
 
 def ac_leaky_relu_prime(y, a=0.1):
-    return np.where(y == ZERO, a, 1.0)
+    return np.where(y == ZERO, a, 1.0).astype(y.dtype)
 
 
-def ac_softmax(x):
-    max = np.max(x, axis=1, keepdims=True)
-    e_x = np.exp(x - max)
-    sum = np.sum(e_x, axis=1, keepdims=True)
-    return e_x / sum
+def ac_softmax(x, out=None):
+    max = np.max(x, axis=-1, keepdims=True)
+    e_x = np.exp(x - max) if out is None else np.exp(np.subtract(x, max, out=out), out=out)
+    sum = np.sum(e_x, axis=-1, keepdims=True)
+    return np.divide(e_x, sum, out=out)
 
 
 def ac_softmax_prime(y):
@@ -82,21 +127,21 @@ def lo_bce_prime(x1, x2):
 
 
 def lr_exp_decay(e, s, a, lr1, lr2):
-    return max(lr1 * np.exp(a * np.floor(e / s)), lr2)
+    return max(float(lr1 * np.exp(a * np.floor(e / s))), lr2)
 
 
 def wi_zeros(n, m):
-    return np.zeros((n, m)).astype(np.float32)
+    return np.zeros((n, m), dtype=floatx())
 
 
 def wi_gorot(n, m):
     a = np.sqrt(6.0 / (n + m))
-    return np.random.uniform(-a, a, size=(n, m)).astype(np.float32)
+    return np.random.uniform(-a, a, size=(n, m)).astype(floatx())
 
 
 def wi_he(n, m):
     a = np.sqrt(6.0 / n)
-    return np.random.uniform(-a, a, size=(n, m)).astype(np.float32)
+    return np.random.uniform(-a, a, size=(n, m)).astype(floatx())
 
 
 def wu_sgd(g, s, v, momentum=0.0, lr=0.01, nesterov=False):
@@ -18,35 +18,72 @@ class GeneticIndividual(Protocol):
 
 
 class GeneticPool:
-    def __init__(self, pool: list[GeneticIndividual]) -> None:
+    """This class selects parents in a pool of individuals ranked by their fitness.
+
+    The fitness is kept in an array, so the selections are vectorized. A pool can also be built from the fitness
+    alone, its selections are then only indices.
+    """
+
+    def __init__(self, pool: Optional[list[GeneticIndividual]] = None, fitness: Optional[np.ndarray] = None) -> None:
+        assert pool is not None or fitness is not None
         self.pool = pool
+        if fitness is None:
+            fitness = np.array([individual.get_fitness() for individual in pool or []])
+        self.fitness = np.asarray(fitness, dtype=np.float64)
+        self.indices = np.arange(len(self.fitness))
 
     def sample(self, sample_count: Optional[int] = None) -> None:
         if sample_count is None:
-            sample_count = int(np.floor(np.random.rand() * len(self.pool)))
+            sample_count = int(np.floor(np.random.rand() * len(self.fitness)))
         sample_count = max(1, sample_count)
 
-        self.pool.sort(key=lambda x: x.get_fitness(), reverse=True)
-
-        if len(self.pool) > sample_count:
-            self.pool = self.pool[:sample_count]
+        order = np.argsort(-self.fitness, kind="stable")[:sample_count]
+        self.fitness = self.fitness[order]
+        self.indices = self.indices[order]
 
     def normalize(self) -> None:
-        fitnesses = [individual.get_fitness() for individual in self.pool]
-        fitnesses = ac_softmax(np.array([fitnesses]))[0]
-        for individual, fitness in zip(self.pool, fitnesses, strict=True):
-            individual.set_fitness(fitness)
+        self.fitness = ac_softmax(self.fitness[None, :])[0]
 
     def best_parent(self) -> GeneticIndividual:
-        return self.pool[0]
+        assert self.pool is not None
+        return self.pool[self.indices[0]]
 
     def select_parent(self) -> GeneticIndividual:
-        r = np.random.rand()
-        best_index = 0
-        while r > 0:
-            r -= self.pool[best_index].get_fitness()
-            best_index += 1
-        return self.pool[best_index - 1]
+        assert self.pool is not None
+        return self.pool[self.select_parents(1)[0]]
+
+    def select_parents(self, count: int, method: str = "roulette", tournament_size: int = 3) -> np.ndarray:
+        """Selects parents at once, and returns their indices in the pool given at the creation.
+
+        Args:
+            count: The number of parents.
+            method: "roulette" draws proportionally to the fitness, which must be positive such as once normalized.
+                "tournament" keeps the fittest of `tournament_size` individuals drawn uniformly. "rank" draws
+                proportionally to the rank of the fitness.
+            tournament_size: The number of individuals in a tournament.
+        """
+        assert method in ("roulette", "tournament", "rank")
+
+        match method:
+            case "roulette":
+                assert np.all(self.fitness >= 0)
+                selected = _draw(self.fitness, count)
+            case "tournament":
+                candidates = np.random.randint(0, len(self.fitness), (count, tournament_size))
+                selected = candidates[np.arange(count), np.argmax(self.fitness[candidates], axis=1)]
+            case _:
+                ranks = np.empty(len(self.fitness))
+                ranks[np.argsort(self.fitness, kind="stable")] = np.arange(1, len(self.fitness) + 1)
+                selected = _draw(ranks, count)
+        return self.indices[selected]
+
+
+def _draw(weights: np.ndarray, count: int) -> np.ndarray:
+    # Roulette wheel, the first individual whose cumulative weight reaches the draw like walking the pool
+
+    cumulative = np.cumsum(weights)
+    selected = np.searchsorted(cumulative, np.random.random_sample(count) * cumulative[-1], side="left")
+    return np.minimum(selected, len(weights) - 1)
 
 
 class GeneticTrainer:
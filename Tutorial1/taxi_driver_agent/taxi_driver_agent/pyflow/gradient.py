@@ -11,6 +11,18 @@ def train(model: Model, x: Optional[np.ndarray], y: Optional[np.ndarray]) -> Opt
     assert x is not None
     assert y is not None
 
+    gradients, yhat = compute_gradients(model, x, y)
+
+    for lr, gr in zip(model.layers, gradients, strict=True):
+        lr.apply_grad(gr, model.optimizer_func)
+
+    return yhat
+
+
+def compute_gradients(
+    model: Sequential, x: np.ndarray, y: np.ndarray
+) -> tuple[list[tuple[np.ndarray, np.ndarray]], np.ndarray]:
+    """Computes the gradients of the loss for each layer, as averages over the batch."""
     output = model.call(x, training=True)
     yhat = output[-1]
     loss = model.loss_prime(y, yhat)
@@ -20,7 +32,4 @@ def train(model: Model, x: Optional[np.ndarray], y: Optional[np.ndarray]) -> Opt
         dw, db, loss = lr.backward(output[-i], output[-(i + 1)], loss)
         gradients = [(dw, db), *gradients]
 
-    for lr, gr in zip(model.layers, gradients, strict=True):
-        lr.apply_grad(gr, model.optimizer_func)
-
-    return yhat
+    return gradients, yhat
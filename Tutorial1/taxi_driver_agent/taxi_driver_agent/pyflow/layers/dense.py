@@ -17,12 +17,18 @@ class Dense(Layer):
             Params((inputs, outputs), initializer=kernel_initializer),
             Params((1, outputs), initializer=bias_initializer),
         )
+        self.activation_name = activation
         self.activation = __functions__[activation]["func"]
         self.activation_prime = __functions__[activation]["prime"]
 
     def call(self, x: np.ndarray, *args, training: bool = False, **kwargs) -> np.ndarray:
         return self.activation(x @ self.kernel[0] + self.bias[0])
 
+    def infer(self, x: np.ndarray, z: np.ndarray, out: np.ndarray) -> np.ndarray:
+        np.matmul(x, self.kernel[0], out=z)
+        z += self.bias[0]
+        return self.activation(z, out=out)
+
     def backward(self, *args, **kwargs) -> list[np.ndarray]:
         x1, x0, loss = args
 
@@ -17,18 +17,24 @@ class GeneticDense(Layer):
             Params((inputs, outputs), initializer=kernel_initializer),
             Params((1, outputs), initializer=bias_initializer),
         )
+        self.activation_name = activation
         self.activation = __functions__[activation]["func"]
 
     def call(self, x: np.ndarray, *args, training: bool = False, **kwargs) -> np.ndarray:
         return self.activation(x @ self.kernel[0] + self.bias[0])
 
+    def infer(self, x: np.ndarray, z: np.ndarray, out: np.ndarray) -> np.ndarray:
+        np.matmul(x, self.kernel[0], out=z)
+        z += self.bias[0]
+        return self.activation(z, out=out)
+
     def backward(self, *args, **kwargs) -> list[np.ndarray]:
         rate, variance = args
 
         rate_mask = np.where(np.random.random_sample(self.kernel[0].shape) < rate, 1, 0)
-        dw = np.random.standard_normal(self.kernel[0].shape) * rate_mask * variance
+        dw = (np.random.standard_normal(self.kernel[0].shape) * rate_mask * variance).astype(self.kernel[0].dtype)
 
         rate_mask = np.where(np.random.random_sample(self.bias[0].shape) < rate, 1, 0)
-        db = np.random.standard_normal(self.bias[0].shape) * rate_mask * variance
+        db = (np.random.standard_normal(self.bias[0].shape) * rate_mask * variance).astype(self.bias[0].dtype)
 
         return [dw, db]
@@ -1,6 +1,7 @@
 from functools import partial
+from typing import Callable
 
-from taxi_driver_agent.pyflow.functions import wu_adadelta, wu_adam, wu_rmsprop, wu_sgd
+from taxi_driver_agent.pyflow.functions import ZERO, wu_adadelta, wu_adam, wu_rmsprop, wu_sgd
 
 
 def sgd(momentum=0.0, lr=0.01, nesterov=False):
@@ -17,3 +18,10 @@ def rmsprop(rho=0.9, lr=0.1):
 
 def adam(beta1=0.9, beta2=0.999, lr=0.001):
     return partial(wu_adam, beta1=beta1, beta2=beta2, lr=lr)
+
+
+def is_stateless(optimizer_func: Callable) -> bool:
+    """Tells if an optimizer ignores its state, only the sgd without momentum does."""
+    if isinstance(optimizer_func, partial):
+        return optimizer_func.func is wu_sgd and optimizer_func.keywords.get("momentum", ZERO) == ZERO
+    return False
@@ -0,0 +1,223 @@
+from __future__ import annotations
+
+import multiprocessing
+import os
+from contextlib import contextmanager
+from multiprocessing.connection import Connection
+from multiprocessing.process import BaseProcess
+from multiprocessing.shared_memory import SharedMemory
+from typing import Callable, Iterator, Optional
+
+import numpy as np
+import numpy.typing as npt
+
+from taxi_driver_agent.pyflow.core import Layer, Model
+from taxi_driver_agent.pyflow.gradient import compute_gradients
+from taxi_driver_agent.pyflow.sequential import Sequential
+
+BLAS_THREADS = ("OMP_NUM_THREADS", "OPENBLAS_NUM_THREADS", "MKL_NUM_THREADS")
+
+Shapes = list[tuple[int, ...]]
+
+
+class ParallelTrainer:
+    """This trainer splits each batch across worker processes holding replicas of the model.
+
+    The workers write the gradients of their part of the batch into shared memory, the gradients are averaged and
+    applied once to the model, then its weights are copied back into shared memory where the replicas read them. It
+    replaces the `gradient` trainer, with the same results up to the rounding of the sums.
+    """
+
+    def __init__(self, workers: int) -> None:
+        assert workers > 1
+        self.workers = workers
+        self.processes: list[BaseProcess] = []
+        self.conns: list[Connection] = []
+        self.params: Optional[_SharedArrays] = None
+        self.inputs: Optional[_SharedArrays] = None
+
+    def train(self, model: Model, x: Optional[np.ndarray], y: Optional[np.ndarray]) -> Optional[np.ndarray]:
+        assert isinstance(model, Sequential)
+        assert x is not None
+        assert y is not None
+
+        if not self.processes:
+            self._start(model)
+        self._reserve_inputs(model, x, y)
+        assert self.params is not None and self.inputs is not None
+
+        # The views of the shared memory are not kept in locals, so it can be closed whenever the training stops
+
+        n = len(x)
+        self.inputs.arrays[0][:n] = x
+        self.inputs.arrays[1][:n] = y
+
+        bounds = np.linspace(0, n, self.workers + 1).astype(int)
+        active = [k for k in range(self.workers) if bounds[k + 1] > bounds[k]]
+        for k in active:
+            self.conns[k].send(("step", bounds[k], bounds[k + 1]))
+
+        self._gather([self.conns[k] for k in active])
+
+        # The workers wrote the sums of the gradients over their rows, the average is taken over the whole batch
+
+        count = len(model.layers) * 2
+        for i, lr in enumerate(model.layers):
+            dw, db = (sum(self.params.arrays[(1 + k) * count + j] for k in active) / n for j in (2 * i, 2 * i + 1))
+            lr.apply_grad((dw, db), model.optimizer_func)
+            self.params.arrays[2 * i][...] = lr.kernel.data
+            self.params.arrays[2 * i + 1][...] = lr.bias.data
+
+        return self.inputs.arrays[2][:n].copy()
+
+    def close(self) -> None:
+        for conn in self.conns:
+            try:
+                conn.send(("stop",))
+            except ConnectionError:
+                pass  # The worker is dead already
+        for process in self.processes:
+            process.join()
+        for conn in self.conns:
+            conn.close()
+        for shared in (self.params, self.inputs):
+            if shared is not None:
+                shared.close(unlink=True)
+        self.processes, self.conns, self.params, self.inputs = [], [], None, None
+
+    def _start(self, model: Sequential) -> None:
+        shapes = [p.data.shape for lr in model.layers for p in (lr.kernel, lr.bias)]
+        self.params = _SharedArrays(shapes * (1 + self.workers), model.layers[0].kernel.data.dtype)
+        for array, p in zip(self.params.arrays, (p for lr in model.layers for p in (lr.kernel, lr.bias))):
+            array[...] = p.data
+
+        mp = multiprocessing.get_context("spawn")
+        layers = [lr.clone() for lr in model.layers]
+        for k in range(self.workers):
+            conn, child_conn = mp.Pipe()
+            process = mp.Process(target=_run_worker, args=(child_conn, k, layers, model.loss_prime), daemon=True)
+            with _single_threaded_blas():
+                process.start()
+            child_conn.close()
+            conn.send(("params", self.params.spec()))
+            self.processes.append(process)
+            self.conns.append(conn)
+        self._gather(self.conns)
+
+    def _reserve_inputs(self, model: Sequential, x: np.ndarray, y: np.ndarray) -> None:
+        if self.inputs is not None and len(self.inputs.arrays[0]) >= len(x):
+            return
+
+        if self.inputs is not None:
+            self.inputs.close(unlink=True)
+        outputs = model.layers[-1].kernel.data.shape[1]
+        shapes = [(len(x), *x.shape[1:]), (len(x), *y.shape[1:]), (len(x), outputs)]
+        self.inputs = _SharedArrays(shapes, x.dtype)
+        for conn in self.conns:
+            conn.send(("inputs", self.inputs.spec()))
+        self._gather(self.conns)
+
+    def _gather(self, conns: list[Connection]) -> None:
+        # Every message is acknowledged. All the replies are read before raising, so the next messages are not mixed
+        # up with the replies left behind
+
+        errors = [e for e in (self._receive(conn) for conn in conns) if e is not None]
+        if errors:
+            raise RuntimeError(f"{len(errors)} training worker(s) failed") from errors[0]
+
+    def _receive(self, conn: Connection) -> Optional[BaseException]:
+        try:
+            return conn.recv()
+        except (EOFError, ConnectionError) as e:
+            return e  # The worker died
+
+
+class _SharedArrays:
+    """Lays out arrays one after the other in a block of shared memory, which other processes attach to by its name."""
+
+    def __init__(self, shapes: Shapes, dtype: npt.DTypeLike, name: Optional[str] = None) -> None:
+        self.shapes = shapes
+        self.dtype = np.dtype(dtype)
+        sizes = [int(np.prod(shape)) for shape in shapes]
+        if name is None:
+            self.memory = SharedMemory(create=True, size=max(1, sum(sizes)) * self.dtype.itemsize)
+        else:
+            self.memory = SharedMemory(name=name)
+
+        flat = np.ndarray((sum(sizes),), dtype=self.dtype, buffer=self.memory.buf)
+        offsets = np.cumsum([0, *sizes])
+        self.arrays = [flat[offsets[i] : offsets[i + 1]].reshape(shape) for i, shape in enumerate(shapes)]
+
+    def spec(self) -> tuple[str, Shapes, str]:
+        return self.memory.name, self.shapes, self.dtype.str
+
+    def close(self, unlink: bool = False) -> None:
+        # The views must be released before the memory is closed
+
+        self.arrays = []
+        self.memory.close()
+        if unlink:
+            self.memory.unlink()
+
+
+@contextmanager
+def _single_threaded_blas() -> Iterator[None]:
+    # The workers already run on all the cores, each one must not start a BLAS thread per core as well
+
+    saved = {name: os.environ.get(name) for name in BLAS_THREADS}
+    os.environ.update(dict.fromkeys(BLAS_THREADS, "1"))
+    try:
+        yield
+    finally:
+        for name, value in saved.items():
+            if value is None:
+                del os.environ[name]
+            else:
+                os.environ[name] = value
+
+
+def _run_worker(conn: Connection, index: int, layers: list[Layer], loss_prime: Callable) -> None:
+    model = Sequential(layers, trainer=None)
+    model.loss_prime = loss_prime
+    params: Optional[_SharedArrays] = None
+    inputs: Optional[_SharedArrays] = None
+
+    while True:
+        message = conn.recv()
+        try:
+            match message:
+                case ("params", (name, shapes, dtype)):
+                    params = _SharedArrays(shapes, dtype, name)
+                    conn.send(None)
+                case ("inputs", (name, shapes, dtype)):
+                    if inputs is not None:
+                        inputs.close()
+                    inputs = _SharedArrays(shapes, dtype, name)
+                    conn.send(None)
+                case ("step", lo, hi):
+                    assert params is not None and inputs is not None
+                    _step(model, index, params, inputs, lo, hi)
+                    conn.send(None)
+                case ("stop",):
+                    for shared in (params, inputs):
+                        if shared is not None:
+                            shared.close()
+                    return
+        except Exception as e:
+            conn.send(e)
+
+
+def _step(model: Sequential, index: int, params: _SharedArrays, inputs: _SharedArrays, lo: int, hi: int) -> None:
+    # The replica copies the weights rather than viewing them, so only the shared arrays hold views of the memory
+
+    count = len(model.layers) * 2
+    for p, array in zip((p for lr in model.layers for p in (lr.kernel, lr.bias)), params.arrays[:count]):
+        p.data[...] = array
+
+    x, y, yhat = (array[lo:hi] for array in inputs.arrays)
+    gradients, yhat[...] = compute_gradients(model, x, y)
+
+    slots = params.arrays[(1 + index) * count : (2 + index) * count]
+    for (dw, db), gw, gb in zip(gradients, slots[::2], slots[1::2], strict=True):
+        np.multiply(dw, hi - lo, out=gw)
+        np.multiply(db, hi - lo, out=gb)
@@ -0,0 +1,202 @@
+from __future__ import annotations
+
+from typing import Callable, Optional
+
+import numpy as np
+
+from taxi_driver_agent.pyflow.core import Params
+from taxi_driver_agent.pyflow.functions import ZERO
+from taxi_driver_agent.pyflow.optimizers import is_stateless
+from taxi_driver_agent.pyflow.sequential import Sequential
+
+
+class Population:
+    """This class stacks the parameters of models sharing the same architecture, layer by layer.
+
+    The parameters of each model become views into the stacked arrays, so the models stay usable on their own, while
+    the whole population is evaluated with one batched matmul per layer. A stack is (P, 1, in, out) with the weights
+    only, it grows to (P, 3, in, out) once an optimizer with a state is applied.
+    """
+
+    def __init__(self, models: list[Sequential]) -> None:
+        assert len(models) > 0
+        self.models = models
+        self.layers = models[0].layers
+
+        stateful = any(p.state is not None for m in models for lr in m.layers for p in (lr.kernel, lr.bias))
+        self.kernels = [_stack([m.layers[i].kernel for m in models], stateful) for i in range(len(self.layers))]
+        self.biases = [_stack([m.layers[i].bias for m in models], stateful) for i in range(len(self.layers))]
+        self._back_kernels = [np.empty_like(x) for x in self.kernels]
+        self._back_biases = [np.empty_like(x) for x in self.biases]
+        self._buffers: list[tuple[np.ndarray, np.ndarray]] = []
+        for index, model in enumerate(models):
+            self._bind(index, model)
+
+    def __len__(self) -> int:
+        return len(self.models)
+
+    def __getitem__(self, index: int) -> Sequential:
+        return self.models[index]
+
+    @property
+    def stateful(self) -> bool:
+        return self.kernels[0].shape[1] > 1
+
+    def assign(self, index: int, model: Sequential) -> None:
+        """Copies the parameters of a model into a slot, the model then views the slot."""
+        for i, lr in enumerate(model.layers):
+            self.kernels[i][index] = _stack([lr.kernel], self.stateful)[0]
+            self.biases[i][index] = _stack([lr.bias], self.stateful)[0]
+        self._bind(index, model)
+        self.models[index] = model
+
+    def copy_from(self, source: Population, indices: np.ndarray, slots: np.ndarray) -> None:
+        """Copies the parameters of models of another population into slots, the models are not rebound."""
+        self._match_states(source)
+        for i in range(len(self.layers)):
+            self.kernels[i][slots] = source.kernels[i][indices]
+            self.biases[i][slots] = source.biases[i][indices]
+
+    def restore(self, kernels: list[np.ndarray], biases: list[np.ndarray]) -> None:
+        """Copies stacks into the population, as captured by a checkpoint. The states are reset if they have none."""
+        assert len(kernels[0]) == len(self)
+        if kernels[0].shape[1] > 1 and not self.stateful:
+            self._allocate_states()
+        for fronts, stacks in ((self.kernels, kernels), (self.biases, biases)):
+            for front, stack in zip(fronts, stacks, strict=True):
+                front[:, : stack.shape[1]] = stack
+                front[:, stack.shape[1] :] = ZERO
+
+    def evolve(
+        self,
+        parents: np.ndarray,
+        optimizer_func: Callable,
+        rate: float = 0.1,
+        variance: float = 1.0,
+        mates: Optional[np.ndarray] = None,
+        slots: Optional[np.ndarray] = None,
+        source: Optional[Population] = None,
+    ) -> None:
+        """Replaces models by mutated children of parents, in the manner of `GeneticTrainer` but for all at once.
+
+        Args:
+            parents: The indices of the parents in the source, one per child.
+            optimizer_func: The optimizer applying the mutations to the parameters and their state.
+            rate: The probability of a parameter to be mutated.
+            variance: The scale of the mutations.
+            mates: The indices of second parents in the source, each parameter of a child then comes from either one.
+            slots: The slots receiving the children, the whole population by default.
+            source: The population holding the parents, this population by default.
+        """
+        source = source if source is not None else self
+        parents = np.asarray(parents)
+        assert slots is not None or len(parents) == len(self)
+
+        if not self.stateful and not is_stateless(optimizer_func):
+            self._allocate_states()
+        self._match_states(source)
+
+        for i, lr in enumerate(self.layers):
+            for fronts, backs, sources in (
+                (self.kernels, self._back_kernels, source.kernels),
+                (self.biases, self._back_biases, source.biases),
+            ):
+                # The whole population is written into the back buffer, then swapped with the front one
+
+                if slots is None:
+                    children = np.take(sources[i], parents, axis=0, out=backs[i])
+                else:
+                    children = sources[i][parents]
+
+                if mates is not None:
+                    mask = np.random.random_sample((len(parents), 1, *children.shape[2:])) < 0.5  # noqa: PLR2004
+                    np.copyto(children, sources[i][mates], where=mask)
+
+                if lr.trainable:
+                    _mutate(children, optimizer_func, rate, variance)
+
+                if slots is None:
+                    fronts[i], backs[i] = backs[i], fronts[i]
+                else:
+                    fronts[i][slots] = children
+
+        if slots is None:
+            for index, model in enumerate(self.models):
+                self._bind(index, model)
+
+    def predict(self, x: np.ndarray, out: Optional[np.ndarray] = None) -> np.ndarray:
+        """Evaluates each model on its own input, x is (P, inputs) or (P, batch, inputs).
+
+        The activations are written into buffers reused by the next calls. The output is a new array, unless it is
+        written into out, then the call allocates nothing.
+        """
+        y = np.asarray(x, dtype=self.kernels[0].dtype)
+        single = y.ndim == 2  # noqa: PLR2004
+        if single:
+            y = y[:, None, :]
+
+        buffers = self._get_buffers(y)
+        shape = buffers[-1][1].shape
+        shape = (shape[0], shape[2]) if single else shape
+        out = np.empty(shape, dtype=y.dtype) if out is None else out
+        assert out.shape == shape and out.dtype == y.dtype
+
+        outs = [*(a for _, a in buffers[:-1]), out[:, None] if single else out]
+        for lr, kernel, bias, (z, _), a in zip(self.layers, self.kernels, self.biases, buffers, outs, strict=True):
+            np.matmul(y, kernel[:, 0], out=z)
+            z += bias[:, 0]
+            y = lr.activation(z, out=a)
+        return out
+
+    def _get_buffers(self, x: np.ndarray) -> list[tuple[np.ndarray, np.ndarray]]:
+        z, _ = self._buffers[0] if self._buffers else (None, None)
+        if z is None or z.shape[:-1] != x.shape[:-1]:
+            shapes = [(*x.shape[:-1], kernel.shape[-1]) for kernel in self.kernels]
+            self._buffers = [(np.empty(shape, dtype=x.dtype), np.empty(shape, dtype=x.dtype)) for shape in shapes]
+        return self._buffers
+
+    def _allocate_states(self) -> None:
+        for stacks in (self.kernels, self.biases, self._back_kernels, self._back_biases):
+            for i, stack in enumerate(stacks):
+                stacks[i] = np.zeros((stack.shape[0], 3, *stack.shape[2:]), dtype=stack.dtype)
+                stacks[i][:, 0] = stack[:, 0]
+        for index, model in enumerate(self.models):
+            self._bind(index, model)
+
+    def _match_states(self, source: Population) -> None:
+        if self.stateful and not source.stateful:
+            source._allocate_states()
+        elif source.stateful and not self.stateful:
+            self._allocate_states()
+
+    def _bind(self, index: int, model: Sequential) -> None:
+        for i, lr in enumerate(model.layers):
+            for params, stack in ((lr.kernel, self.kernels[i]), (lr.bias, self.biases[i])):
+                params.data = stack[index, 0]
+                params.state = stack[index, 1:] if self.stateful else None
+
+
+def _stack(params: list[Params], stateful: bool) -> np.ndarray:
+    if stateful:
+        return np.stack([np.concatenate([p.data[None], p.get_state()]) for p in params])
+    return np.stack([p.data[None] for p in params])
+
+
+def _mutate(params: np.ndarray, optimizer_func: Callable, rate: float, variance: float) -> None:
+    # Draw the number of mutations then their distinct positions, which is a Bernoulli draw per parameter like
+    # `GeneticDense.backward`, then update the parameters and their state like `Params.apply_grad`
+
+    weights = params[:, 0]
+    gradient = np.zeros_like(weights)
+    count = np.random.binomial(gradient.size, rate)
+    gradient.flat[np.random.choice(gradient.size, count, replace=False)] = np.random.standard_normal(count) * variance
+
+    if params.shape[1] == 1:
+        x, _, _ = optimizer_func(gradient, ZERO, ZERO)
+        weights += x
+        return
+
+    x, s, v = optimizer_func(gradient, params[:, 1], params[:, 2])
+    weights += x
+    params[:, 1] = s
+    params[:, 2] = v
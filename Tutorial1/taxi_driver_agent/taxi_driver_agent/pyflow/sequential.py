@@ -7,7 +7,10 @@ from typing import Optional
 
 import numpy as np
 
+from taxi_driver_agent.pyflow import binary
 from taxi_driver_agent.pyflow.core import Layer, Model, Trainer
+from taxi_driver_agent.pyflow.dataset import Dataset, is_streamed
+from taxi_driver_agent.pyflow.functions import cast
 
 
 class Sequential(Model):
@@ -16,6 +19,7 @@ class Sequential(Model):
 
         super().__init__(trainer if trainer is not None else gradient)
         self.layers = layers
+        self._buffers: Optional[list[tuple[np.ndarray, np.ndarray]]] = None
 
     def call(self, x: np.ndarray, training: bool = False) -> list[np.ndarray]:
         forward = lambda res, lr: [*res, lr.call(res[-1], training=training)]
@@ -24,15 +28,56 @@ class Sequential(Model):
     def clone(self) -> Sequential:
         cloned = copy.copy(self)
         cloned.layers = [lr.clone() for lr in self.layers]
+        cloned._buffers = None
         return cloned
 
-    def load(self, file_path: str) -> None:
+    def predict(self, x: np.ndarray | Dataset, batch_size: int = 128, out: Optional[np.ndarray] = None) -> np.ndarray:
+        """Uses the trained model to make predictions on new data.
+
+        Unlike `call`, only the output is returned. The activations are written into buffers allocated for the shape of
+        the batch and reused by the next calls. The output is a new array, unless it is written into out, then the call
+        allocates nothing. The predictions of a dataset are gathered into a new array.
+        """
+        if is_streamed(x):
+            assert out is None, "The predictions of a dataset can not be written into out"
+            return super().predict(x, batch_size)
+
+        y = np.atleast_2d(cast(x))
+        buffers = self._get_buffers(y)
+        out = np.empty_like(buffers[-1][1]) if out is None else out
+        assert out.shape == buffers[-1][1].shape and out.dtype == y.dtype
+
+        outs = [*(a for _, a in buffers[:-1]), out]
+        for lr, (z, _), a in zip(self.layers, buffers, outs, strict=True):
+            y = lr.infer(y, z, a)
+        return y
+
+    def _get_buffers(self, x: np.ndarray) -> list[tuple[np.ndarray, np.ndarray]]:
+        z, _ = self._buffers[0] if self._buffers is not None else (None, None)
+        if z is None or z.shape[:-1] != x.shape[:-1] or z.dtype != x.dtype:
+            shapes = [(*x.shape[:-1], lr.kernel[0].shape[1]) for lr in self.layers]
+            self._buffers = [(np.empty(shape, dtype=x.dtype), np.empty(shape, dtype=x.dtype)) for shape in shapes]
+        return self._buffers
+
+    def load(self, file_path: str, mmap: bool = False) -> None:
+        """Loads the weights from a binary or a JSON file, a binary file can be memory mapped read-only."""
+        if binary.is_binary(file_path):
+            binary.load(self.layers, file_path, mmap)
+            return
+
+        assert not mmap, "Only the binary model files can be memory mapped"
         with open(file_path, "r") as f:
             model_data = json.load(f)
         for lr, dt in zip(self.layers, model_data["layers"], strict=True):
             lr.from_dict(dt)
 
-    def save(self, file_path: str) -> None:
+    def save(self, file_path: str, format: str = "binary") -> None:
+        """Saves the weights in the binary format, or in the JSON format of the previous versions."""
+        assert format in ("binary", "json")
+        if format == "binary":
+            binary.save(self.layers, file_path)
+            return
+
         model_data = {"layers": [lr.to_dict() for lr in self.layers]}
         with open(file_path, "w") as f:
             json.dump(model_data, f, indent=4)
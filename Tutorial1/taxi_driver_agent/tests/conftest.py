@@ -0,0 +1,48 @@
+from typing import Callable
+
+import numpy as np
+import pytest
+from taxi_driver_agent.pyflow.genetic import GeneticTrainer
+from taxi_driver_agent.pyflow.layers.dense import Dense
+from taxi_driver_agent.pyflow.layers.genetic_dense import GeneticDense
+from taxi_driver_agent.pyflow.optimizers import sgd
+from taxi_driver_agent.pyflow.sequential import Sequential
+
+
+@pytest.fixture
+def make_model() -> Callable[..., Sequential]:
+    """Builds a small regression model from 4 inputs to 2 outputs, which matches `make_data`."""
+
+    def make(activation: str = "tanh", hidden: int = 8) -> Sequential:
+        model = Sequential(
+            [Dense(4, hidden, activation=activation), Dense(hidden, 2, activation="linear")], trainer=None
+        )
+        model.compile(optimizer="adam", loss="mse")
+        return model
+
+    return make
+
+
+@pytest.fixture
+def make_genetic_model() -> Callable[..., Sequential]:
+    """Builds the architecture of the agent models, trained by mutations."""
+
+    def make(rate: float = 0.1) -> Sequential:
+        model = Sequential(
+            [GeneticDense(17, 32, activation="leaky_relu"), GeneticDense(32, 2, activation="tanh")],
+            trainer=GeneticTrainer(rate=rate),
+        )
+        model.compile(optimizer=sgd(momentum=0.9, lr=0.1, nesterov=True))
+        return model
+
+    return make
+
+
+@pytest.fixture
+def make_data() -> Callable[..., tuple[np.ndarray, np.ndarray]]:
+    def make(n: int = 300) -> tuple[np.ndarray, np.ndarray]:
+        x = np.random.standard_normal((n, 4))
+        y = np.stack([x[:, 0] * x[:, 1], x[:, 2] - x[:, 3]], axis=1)
+        return x, y
+
+    return make
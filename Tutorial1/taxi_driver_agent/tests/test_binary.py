@@ -0,0 +1,121 @@
+import json
+import os
+
+import numpy as np
+import pytest
+from taxi_driver_agent.__main__ import get_agent_model
+from taxi_driver_agent.convert import main as convert
+from taxi_driver_agent.pyflow import binary
+from taxi_driver_agent.pyflow.layers.dense import Dense
+from taxi_driver_agent.pyflow.layers.genetic_dense import GeneticDense
+from taxi_driver_agent.pyflow.sequential import Sequential
+
+AGENT_MODEL = os.path.join(os.path.dirname(__file__), "..", "agent.model")
+
+
+def test_binary_round_trip(tmp_path, make_model):
+    np.random.seed(1)
+    model = make_model()
+    model.save(str(tmp_path / "model.bin"))
+    assert binary.is_binary(str(tmp_path / "model.bin"))
+
+    loaded = make_model()
+    loaded.load(str(tmp_path / "model.bin"))
+    for lr, expected in zip(loaded.layers, model.layers, strict=True):
+        assert lr.kernel == expected.kernel
+        assert lr.bias == expected.bias
+        assert lr.kernel.data.dtype == expected.kernel.data.dtype
+
+
+def test_binary_convert_agent_model(tmp_path):
+    assert not binary.is_binary(AGENT_MODEL)
+    convert(AGENT_MODEL, str(tmp_path / "agent.model"))
+    assert binary.is_binary(str(tmp_path / "agent.model"))
+
+    model = get_agent_model()
+    model.load(AGENT_MODEL)
+    converted = get_agent_model()
+    converted.load(str(tmp_path / "agent.model"))
+    for lr, expected in zip(converted.layers, model.layers, strict=True):
+        assert lr.kernel == expected.kernel
+        assert lr.bias == expected.bias
+
+    x = np.random.standard_normal((5, 17)).astype(model.layers[0].kernel.data.dtype)
+    assert np.array_equal(converted.predict(x), model.predict(x))
+
+
+def test_binary_mmap(tmp_path, make_model):
+    np.random.seed(2)
+    model = make_model()
+    model.save(str(tmp_path / "model.bin"))
+
+    mapped = make_model()
+    mapped.load(str(tmp_path / "model.bin"), mmap=True)
+    x = np.random.standard_normal((3, 4)).astype(model.layers[0].kernel.data.dtype)
+    assert np.array_equal(mapped.predict(x), model.predict(x))
+    for lr in mapped.layers:
+        assert not lr.kernel.data.flags.writeable
+        with pytest.raises(ValueError):
+            lr.kernel[0] = 0
+
+    cloned = mapped.clone()
+    for lr, expected in zip(cloned.layers, model.layers, strict=True):
+        assert lr.kernel.data.flags.writeable
+        lr.kernel[0] = 0
+        assert lr.kernel != expected.kernel
+    assert np.array_equal(mapped.predict(x), model.predict(x))
+
+
+def test_binary_wrong_architecture(tmp_path, make_model):
+    make_model().save(str(tmp_path / "model.bin"))
+
+    with pytest.raises(AssertionError, match="activation"):
+        make_model("relu").load(str(tmp_path / "model.bin"))
+    with pytest.raises(AssertionError, match="Dense layer"):
+        Sequential([Dense(4, 8, activation="tanh"), GeneticDense(8, 2, activation="linear")], trainer=None).load(
+            str(tmp_path / "model.bin")
+        )
+    with pytest.raises(AssertionError, match="parameter"):
+        make_model(hidden=6).load(str(tmp_path / "model.bin"))
+    with pytest.raises(AssertionError, match="number of layers"):
+        Sequential([Dense(4, 2, activation="tanh")], trainer=None).load(str(tmp_path / "model.bin"))
+
+
+def save_version_1(model: Sequential, file_path: str) -> None:
+    # The layout of the first version, with the blobs listed in the layers
+
+    blobs = [p.data for lr in model.layers for p in (lr.kernel, lr.bias)]
+    offsets = np.cumsum([0, *(binary._align(blob.nbytes) for blob in blobs)])
+    params = iter(zip(blobs, offsets, strict=False))
+    header = {
+        "dtype": blobs[0].dtype.name,
+        "layers": [
+            {
+                "class": type(lr).__name__,
+                "activation": lr.activation_name,
+                "params": [{"shape": b.shape, "offset": int(o)} for b, o in (next(params), next(params))],
+            }
+            for lr in model.layers
+        ],
+    }
+    data = json.dumps(header).encode()
+    start = binary._align(binary.PREFIX.size + len(data))
+    with open(file_path, "wb") as f:
+        f.write(binary.PREFIX.pack(binary.MAGIC, 1, start))
+        f.write(data)
+        for blob, offset in zip(blobs, offsets, strict=False):
+            f.seek(start + offset)
+            f.write(blob.tobytes())
+
+
+def test_binary_version_1(tmp_path, make_model):
+    np.random.seed(3)
+    model = make_model()
+    save_version_1(model, str(tmp_path / "model.bin"))
+
+    for mmap in (False, True):
+        loaded = make_model()
+        loaded.load(str(tmp_path / "model.bin"), mmap=mmap)
+        for lr, expected in zip(loaded.layers, model.layers, strict=True):
+            assert np.array_equal(lr.kernel.data, expected.kernel.data)
+            assert np.array_equal(lr.bias.data, expected.bias.data)
@@ -0,0 +1,113 @@
+import json
+import tracemalloc
+
+import numpy as np
+import pytest
+from taxi_driver_agent.pyflow.core import Params
+from taxi_driver_agent.pyflow.functions import floatx
+from taxi_driver_agent.pyflow.layers.dense import Dense
+from taxi_driver_agent.pyflow.optimizers import adam, sgd
+from taxi_driver_agent.pyflow.sequential import Sequential
+
+
+def test_params_state_stateless_optimizer():
+    params = Params((3, 2), initializer="gorot")
+    params.apply_grad(np.ones((3, 2), dtype=params.data.dtype), sgd(lr=0.1))
+    assert params.state is None
+
+
+def test_params_state_stateful_optimizer():
+    params = Params((3, 2), initializer="gorot")
+    data = params.data.copy()
+    params.apply_grad(np.ones((3, 2), dtype=params.data.dtype), sgd(momentum=0.9, lr=0.1))
+    assert params.state is not None
+    assert params.state.shape == (2, 3, 2)
+    assert params.state.dtype == params.data.dtype
+    assert np.allclose(params.state[1], -0.1)
+    assert not np.array_equal(params.data, data)
+
+
+def test_params_clone():
+    params = Params((3, 2), initializer="gorot")
+    assert params.clone() == params
+    assert params.clone().state is None
+
+    params.apply_grad(np.ones((3, 2), dtype=params.data.dtype), adam())
+    cloned = params.clone()
+    assert cloned == params
+    assert not np.shares_memory(cloned.state, params.state)
+
+
+def test_sequential_json_round_trip(tmp_path, make_model):
+    np.random.seed(1)
+    model = make_model()
+    model.save(str(tmp_path / "model.json"), format="json")
+
+    loaded = make_model()
+    loaded.load(str(tmp_path / "model.json"))
+    for lr, expected in zip(loaded.layers, model.layers, strict=True):
+        assert lr.kernel == expected.kernel
+        assert lr.bias == expected.bias
+        assert lr.kernel.state is None
+
+
+def test_sequential_json_old_format(tmp_path, make_model):
+    # The previous versions saved the state of the optimizer after the parameters
+
+    np.random.seed(2)
+    model = make_model()
+    states = [np.random.standard_normal((2, *p.data.shape)) for lr in model.layers for p in (lr.kernel, lr.bias)]
+    old_list = lambda p, state: np.concatenate([p.data[None], state]).tolist()
+    model_data = {
+        "layers": [
+            {"W": old_list(lr.kernel, w), "B": old_list(lr.bias, b)}
+            for lr, w, b in zip(model.layers, states[::2], states[1::2], strict=True)
+        ]
+    }
+    with open(tmp_path / "model.json", "w") as f:
+        json.dump(model_data, f)
+
+    loaded = make_model()
+    loaded.load(str(tmp_path / "model.json"))
+    for lr, expected, w, b in zip(loaded.layers, model.layers, states[::2], states[1::2], strict=True):
+        assert np.array_equal(lr.kernel.data, expected.kernel.data)
+        assert np.array_equal(lr.bias.data, expected.bias.data)
+        assert np.allclose(lr.kernel.state, w)
+        assert np.allclose(lr.bias.state, b)
+
+
+@pytest.mark.parametrize("activation", ["linear", "sigmoid", "tanh", "relu", "leaky_relu", "softmax"])
+def test_sequential_predict(activation):
+    np.random.seed(3)
+    model = Sequential([Dense(4, 8, activation=activation), Dense(8, 3, activation=activation)], trainer=None)
+
+    for x in (np.random.standard_normal(4), np.random.standard_normal((5, 4))):
+        *_, expected = model.call(np.atleast_2d(x).astype(floatx()))
+        y = model.predict(x)
+        assert np.array_equal(y, expected)
+        assert y.dtype == expected.dtype
+        assert model.predict(x) is not y
+
+
+def test_sequential_predict_out(make_model):
+    np.random.seed(4)
+    model = make_model()
+    x = np.random.standard_normal((16384, 4)).astype(floatx())
+    *_, expected = model.call(x)
+    out = np.empty((16384, 2), dtype=floatx())
+    model.predict(x, out=out)
+
+    # The buffers are allocated by the first call, the next ones only write into them. Numpy may still use its bounded
+    # ufunc buffer to broadcast the bias, but nothing grows with the batch
+
+    tracemalloc.start()
+    try:
+        tracemalloc.reset_peak()
+        start, _ = tracemalloc.get_traced_memory()
+        y = model.predict(x, out=out)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    assert y is out
+    assert np.array_equal(out, expected)
+    assert peak - start < out.nbytes
@@ -0,0 +1,78 @@
+import threading
+
+import numpy as np
+import pytest
+from taxi_driver_agent.pyflow.dataset import ArrayDataset, GeneratorDataset, prefetch
+
+
+def has_prefetch_thread() -> bool:
+    return any(thread.name == "prefetch" for thread in threading.enumerate())
+
+
+def test_dataset_fit_prefetch(make_model, make_data):
+    np.random.seed(1)
+    x, y = make_data()
+    model = make_model()
+    prefetched = model.clone()
+    initial = model.layers[0].kernel.data.copy()
+
+    np.random.seed(2)
+    model.fit(x, y, epochs=3, batch_size=32, prefetch_size=0, verbose=False)
+    np.random.seed(2)
+    prefetched.fit(x, y, epochs=3, batch_size=32, prefetch_size=2, verbose=False)
+
+    assert not np.array_equal(model.layers[0].kernel.data, initial)
+    for lr, expected in zip(prefetched.layers, model.layers, strict=True):
+        assert np.array_equal(lr.kernel.data, expected.kernel.data)
+        assert np.array_equal(lr.bias.data, expected.bias.data)
+    assert not has_prefetch_thread()
+
+
+def test_dataset_memmap(tmp_path, make_model, make_data):
+    np.random.seed(3)
+    x, y = make_data()
+    np.save(tmp_path / "x.npy", x)
+    np.save(tmp_path / "y.npy", y)
+    model = make_model()
+
+    loss, accuracy, yhat = model.evaluate(x, y, verbose=False)
+    dataset = ArrayDataset.load(str(tmp_path / "x.npy"), str(tmp_path / "y.npy"))
+    streamed_loss, streamed_accuracy, streamed_yhat = model.evaluate(dataset, batch_size=64, verbose=False)
+    assert np.isclose(streamed_loss, loss)
+    assert np.isclose(streamed_accuracy, accuracy)
+    assert np.allclose(streamed_yhat, yhat)
+
+    expected = model.predict(x)
+    assert np.allclose(model.predict(np.load(tmp_path / "x.npy", mmap_mode="r"), batch_size=64), expected)
+    assert np.allclose(model.predict(dataset, batch_size=64), expected)
+
+
+def test_dataset_generator(make_model, make_data):
+    np.random.seed(4)
+    x, y = make_data()
+    model = make_model()
+    batches = lambda: ((x[i : i + 50], y[i : i + 50]) for i in range(0, len(x), 50))
+
+    history = model.fit(GeneratorDataset(batches), epochs=2, verbose=False)
+    assert len(history["loss"]) == 3  # noqa: PLR2004
+    assert np.allclose(model.predict(GeneratorDataset(batches)), model.predict(x))
+
+
+def test_dataset_generator_error(make_model, make_data):
+    x, y = make_data()
+
+    def batches():
+        yield x[:50], y[:50]
+        raise ValueError("broken batch")
+
+    with pytest.raises(ValueError, match="broken batch"):
+        make_model().fit(GeneratorDataset(batches), epochs=1, verbose=False)
+    assert not has_prefetch_thread()
+
+
+def test_dataset_prefetch_close():
+    items = prefetch(iter(range(100)), 2)
+    assert next(items) == 0
+    assert has_prefetch_thread()
+    items.close()
+    assert not has_prefetch_thread()
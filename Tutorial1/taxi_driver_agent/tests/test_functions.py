@@ -0,0 +1,55 @@
+import numpy as np
+import pytest
+from taxi_driver_agent.pyflow.functions import cast, floatx, set_floatx
+from taxi_driver_agent.pyflow.gradient import compute_gradients
+from taxi_driver_agent.pyflow.layers.genetic_dense import GeneticDense
+from taxi_driver_agent.pyflow.optimizers import sgd
+from taxi_driver_agent.pyflow.population import Population
+from taxi_driver_agent.pyflow.sequential import Sequential
+
+
+@pytest.fixture(autouse=True)
+def default_floatx():
+    yield
+    set_floatx(np.float32)
+
+
+def get_dtypes(model: Sequential) -> set[np.dtype]:
+    params = [p for lr in model.layers for p in (lr.kernel, lr.bias)]
+    return {p.data.dtype for p in params} | {p.state.dtype for p in params if p.state is not None}
+
+
+@pytest.mark.parametrize("optimizer", ["adam", "rmsprop", "adadelta", sgd(momentum=0.9, lr=0.01, nesterov=True)])
+@pytest.mark.parametrize("dtype", [np.float32, np.float64])
+def test_floatx_fit(optimizer, dtype, make_model, make_data):
+    set_floatx(dtype)
+    np.random.seed(1)
+    x, y = make_data(64)
+    model = make_model("relu")
+    model.compile(optimizer=optimizer, loss="mse")
+    model.fit(x, y, epochs=2, batch_size=16, verbose=False)
+
+    # The data is float64, it is cast once and everything computes in floatx
+
+    assert floatx() == dtype
+    assert get_dtypes(model) == {np.dtype(dtype)}
+    assert all(p.state is not None for lr in model.layers for p in (lr.kernel, lr.bias))
+    assert {a.dtype for a in model.call(cast(x))} == {np.dtype(dtype)}
+    gradients, yhat = compute_gradients(model, cast(x), cast(y))
+    assert {g.dtype for g in (yhat, *(g for gradient in gradients for g in gradient))} == {np.dtype(dtype)}
+    assert model.predict(x).dtype == dtype
+
+
+@pytest.mark.parametrize("dtype", [np.float32, np.float64])
+def test_floatx_population_evolve(dtype):
+    set_floatx(dtype)
+    np.random.seed(2)
+    models = [Sequential([GeneticDense(4, 8), GeneticDense(8, 2)], trainer=None) for _ in range(4)]
+    population = Population(models)
+    optimizer = sgd(momentum=0.9, lr=0.1, nesterov=True)
+    for _ in range(2):
+        population.evolve(np.array([0, 0, 1, 2]), optimizer, mates=np.array([3, 2, 1, 0]))
+
+    assert {x.dtype for x in population.kernels + population.biases} == {np.dtype(dtype)}
+    assert all(get_dtypes(model) == {np.dtype(dtype)} for model in models)
+    assert population.predict(np.random.standard_normal((4, 4))).dtype == dtype
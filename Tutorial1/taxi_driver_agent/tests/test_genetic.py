@@ -0,0 +1,58 @@
+import numpy as np
+import pytest
+from taxi_driver_agent.pyflow.genetic import GeneticPool
+
+DRAWS = 200_000
+
+
+class Individual:
+    def __init__(self, fitness: float) -> None:
+        self.fitness = fitness
+
+    def get_fitness(self) -> float:
+        return self.fitness
+
+
+def get_frequencies(pool: GeneticPool, method: str, **kwargs) -> np.ndarray:
+    return np.bincount(pool.select_parents(DRAWS, method, **kwargs), minlength=len(pool.fitness)) / DRAWS
+
+
+def test_pool_roulette():
+    np.random.seed(1)
+    pool = GeneticPool(fitness=np.array([1.0, 2.0, 3.0, 4.0]))
+    assert np.allclose(get_frequencies(pool, "roulette"), [0.1, 0.2, 0.3, 0.4], atol=0.005)
+
+
+def test_pool_rank():
+    np.random.seed(2)
+    pool = GeneticPool(fitness=np.array([10.0, -5.0, 3.0, 0.0]))
+    assert np.allclose(get_frequencies(pool, "rank"), [0.4, 0.1, 0.3, 0.2], atol=0.005)
+
+
+@pytest.mark.parametrize("tournament_size", [1, 3])
+def test_pool_tournament(tournament_size):
+    np.random.seed(3)
+    fitness = np.array([10.0, -5.0, 3.0, 0.0])
+    pool = GeneticPool(fitness=fitness)
+
+    # The winner is the fittest of the drawn individuals, so the k-th worst wins with (k/n)^s - ((k-1)/n)^s
+
+    ranks = np.argsort(np.argsort(fitness)) + 1
+    expected = (ranks / len(fitness)) ** tournament_size - ((ranks - 1) / len(fitness)) ** tournament_size
+    frequencies = get_frequencies(pool, "tournament", tournament_size=tournament_size)
+    assert np.allclose(frequencies, expected, atol=0.005)
+
+
+@pytest.mark.parametrize("method", ["roulette", "tournament", "rank"])
+def test_pool_sample_indices(method):
+    np.random.seed(4)
+    individuals = [Individual(x) for x in (0.3, 0.9, 0.1, 0.7, 0.5)]
+    pool = GeneticPool(individuals)
+    pool.sample(2)
+    pool.normalize()
+
+    # The sampled pool holds the 2 fittest, its selections are still the indices of the whole pool
+
+    assert pool.best_parent() is individuals[1]
+    assert set(pool.select_parents(1000, method)) == {1, 3}
+    assert pool.select_parent() in (individuals[1], individuals[3])
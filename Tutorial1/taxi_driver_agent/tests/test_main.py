@@ -0,0 +1,45 @@
+import random
+
+import numpy as np
+from taxi_driver_agent.__main__ import main
+from taxi_driver_agent.pyflow.checkpoint import Checkpoint
+from taxi_driver_env.game.entities import world
+from taxi_driver_env.game.scenes import trainer
+
+SEED = 5
+
+
+def train(checkpoint_file: str, max_timestep: int, resume: bool = False) -> None:
+    # The world is generated once for all the runs, each run starts with a new simulation in it like a new process
+
+    if not world.has_singleton():
+        random.seed(SEED)
+        world.get_singleton()
+    trainer.get_singleton.cache_clear()
+
+    main(
+        seed=SEED,
+        agent_count=8,
+        headless=True,
+        max_timestep=max_timestep,
+        checkpoint_file=checkpoint_file,
+        checkpoint_every=1e-9,
+        resume=resume,
+    )
+
+
+def test_main_resume(tmp_path):
+    train(str(tmp_path / "uninterrupted.ckpt"), max_timestep=3)
+    train(str(tmp_path / "interrupted.ckpt"), max_timestep=1)
+    assert Checkpoint.load(str(tmp_path / "interrupted.ckpt")).timestep == 1
+    train(str(tmp_path / "interrupted.ckpt"), max_timestep=3, resume=True)
+
+    expected = Checkpoint.load(str(tmp_path / "uninterrupted.ckpt"))
+    resumed = Checkpoint.load(str(tmp_path / "interrupted.ckpt"))
+    assert resumed.timestep == expected.timestep == 3  # noqa: PLR2004
+    for x, y in zip(resumed.kernels + resumed.biases, expected.kernels + expected.biases, strict=True):
+        assert np.array_equal(x, y)
+    assert np.array_equal(resumed.fitness, expected.fitness)
+    assert resumed.random_state == expected.random_state
+    assert np.array_equal(resumed.np_random_state["state"]["key"], expected.np_random_state["state"]["key"])
+    assert resumed.extra == expected.extra
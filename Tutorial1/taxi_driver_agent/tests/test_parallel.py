@@ -0,0 +1,78 @@
+import os
+
+import numpy as np
+import pytest
+from taxi_driver_agent.pyflow import gradient
+from taxi_driver_agent.pyflow.parallel import ParallelTrainer
+
+SHM_DIR = "/dev/shm"
+
+
+def list_shared_memory() -> set[str]:
+    return set(os.listdir(SHM_DIR)) if os.path.isdir(SHM_DIR) else set()
+
+
+def raise_error(y: np.ndarray, yhat: np.ndarray) -> np.ndarray:
+    raise ValueError("broken loss")
+
+
+def exit_process(y: np.ndarray, yhat: np.ndarray) -> np.ndarray:
+    os._exit(1)
+
+
+def test_parallel_fit(make_model, make_data):
+    np.random.seed(1)
+    x, y = make_data(500)
+    model = make_model(hidden=16)
+    parallel = model.clone()
+    shared_memory = list_shared_memory()
+
+    np.random.seed(2)
+    model.fit(x, y, epochs=2, batch_size=64, verbose=False)
+    np.random.seed(2)
+    parallel.fit(x, y, epochs=2, batch_size=64, verbose=False, workers=2)
+
+    # The gradients are summed in another order, so the weights are only equal up to the rounding
+
+    for lr, expected in zip(parallel.layers, model.layers, strict=True):
+        assert np.allclose(lr.kernel.data, expected.kernel.data, atol=1e-6)
+        assert np.allclose(lr.bias.data, expected.bias.data, atol=1e-6)
+    assert parallel.trainer is gradient
+    assert list_shared_memory() == shared_memory
+
+
+@pytest.mark.parametrize("loss_prime, cause", [(raise_error, ValueError), (exit_process, EOFError)])
+def test_parallel_fit_error(loss_prime, cause, make_model, make_data):
+    np.random.seed(3)
+    x, y = make_data(500)
+    model = make_model(hidden=16)
+    model.loss_prime = loss_prime
+    shared_memory = list_shared_memory()
+
+    with pytest.raises(RuntimeError, match="2 training worker") as e:
+        model.fit(x, y, epochs=1, batch_size=64, verbose=False, workers=2)
+    assert isinstance(e.value.__cause__, cause)
+    assert model.trainer is gradient
+    assert list_shared_memory() == shared_memory
+
+
+def test_parallel_attach_error(make_model, make_data):
+    np.random.seed(4)
+    x, y = make_data(64)
+    model = make_model(hidden=16)
+    trainer = ParallelTrainer(2)
+    try:
+        trainer.train(model, x, y)
+
+        # A worker which can not attach the memory answers with the error, the next batch is not mixed up with it
+
+        trainer.conns[0].send(("inputs", ("pyflow-missing", [(1,)], "<f8")))
+        with pytest.raises(RuntimeError, match="1 training worker") as e:
+            trainer._gather(trainer.conns[:1])
+        assert isinstance(e.value.__cause__, FileNotFoundError)
+
+        trainer.inputs.close(unlink=True)
+        trainer.inputs = None
+        assert trainer.train(model, x, y).shape == (64, 2)
+    finally:
+        trainer.close()
@@ -0,0 +1,146 @@
+import tracemalloc
+
+import numpy as np
+from taxi_driver_agent.pyflow.population import Population
+from taxi_driver_agent.pyflow.sequential import Sequential
+
+
+def get_weights(model: Sequential) -> list[np.ndarray]:
+    return [p[0].copy() for lr in model.layers for p in (lr.kernel, lr.bias)]
+
+
+def test_population_evolve_without_mutation(make_genetic_model):
+    np.random.seed(1)
+    models = [make_genetic_model(rate=0) for _ in range(4)]
+    parents = [models[i].clone() for i in (2, 0, 0, 3)]
+    population = Population(models)
+
+    population.evolve(np.array([2, 0, 0, 3]), models[0].optimizer_func, rate=0)
+
+    for parent, child in zip(parents, population, strict=True):
+        parent.fit(epochs=1, verbose=False)
+        for expected, lr in zip(parent.layers, child.layers, strict=True):
+            assert lr.kernel == expected.kernel
+            assert lr.bias == expected.bias
+
+
+def test_population_evolve_mates(make_genetic_model):
+    np.random.seed(2)
+    models = [make_genetic_model() for _ in range(3)]
+    weights = [get_weights(m) for m in models]
+    population = Population(models)
+
+    population.evolve(np.array([0, 1, 2]), models[0].optimizer_func, rate=0, mates=np.array([1, 2, 0]))
+
+    for child, (parent, mate) in zip(population, ((0, 1), (1, 2), (2, 0)), strict=True):
+        for w, p, m in zip(get_weights(child), weights[parent], weights[mate], strict=True):
+            assert np.all((w == p) | (w == m))
+        assert np.any(get_weights(child)[0] != weights[parent][0])
+        assert np.any(get_weights(child)[0] != weights[mate][0])
+
+
+def test_population_evolve_mutation_rate(make_genetic_model):
+    np.random.seed(3)
+    rate = 0.5
+    models = [make_genetic_model(rate) for _ in range(50)]
+    before = [get_weights(m) for m in models]
+    Population(models).evolve(np.arange(50), models[0].optimizer_func, rate=rate)
+    evolved = np.mean([np.mean(w != b) for m, bs in zip(models, before) for w, b in zip(get_weights(m), bs)])
+
+    # A parameter is mutated with the probability rate, as in GeneticTrainer
+
+    models = [make_genetic_model(rate) for _ in range(50)]
+    before = [get_weights(m) for m in models]
+    for m in models:
+        m.fit(epochs=1, verbose=False)
+    trained = np.mean([np.mean(w != b) for m, bs in zip(models, before) for w, b in zip(get_weights(m), bs)])
+
+    assert abs(evolved - rate) < 0.02  # noqa: PLR2004
+    assert abs(trained - rate) < 0.02  # noqa: PLR2004
+
+
+def test_population_copy_from(make_genetic_model):
+    np.random.seed(4)
+    source = Population([make_genetic_model() for _ in range(3)])
+    target = Population([make_genetic_model() for _ in range(4)])
+    expected = [get_weights(source[i]) for i in (2, 0)]
+
+    target.copy_from(source, np.array([2, 0]), np.array([1, 3]))
+
+    for slot, weights in zip((1, 3), expected, strict=True):
+        for w, e in zip(get_weights(target[slot]), weights, strict=True):
+            assert np.array_equal(w, e)
+
+
+def test_population_allocate_states(make_genetic_model):
+    np.random.seed(5)
+    models = [make_genetic_model() for _ in range(3)]
+    population = Population(models)
+    assert not population.stateful
+    assert all(p.state is None for m in models for lr in m.layers for p in (lr.kernel, lr.bias))
+
+    population.evolve(np.array([1, 2, 0]), models[0].optimizer_func)
+
+    # The stacks grow to hold the state of the optimizer, the models view the new stacks
+
+    assert population.stateful
+    for index, model in enumerate(models):
+        for i, lr in enumerate(model.layers):
+            for p, stack in ((lr.kernel, population.kernels[i]), (lr.bias, population.biases[i])):
+                assert stack.shape[1] == 3  # noqa: PLR2004
+                assert np.shares_memory(p.data, stack) and np.array_equal(p.data, stack[index, 0])
+                assert np.shares_memory(p.state, stack) and np.array_equal(p.state, stack[index, 1:])
+
+    x = np.random.standard_normal((3, 17)).astype(population.kernels[0].dtype)
+    expected = np.array([model.predict(x[i])[0] for i, model in enumerate(models)])
+    assert np.allclose(population.predict(x), expected)
+
+
+def test_population_copy_from_stateful(make_genetic_model):
+    np.random.seed(6)
+    source = Population([make_genetic_model() for _ in range(2)])
+    source.evolve(np.array([0, 1]), source[0].optimizer_func)
+    target = Population([make_genetic_model() for _ in range(2)])
+
+    target.copy_from(source, np.array([1]), np.array([0]))
+
+    assert target.stateful
+    assert np.array_equal(target.kernels[0][0], source.kernels[0][1])
+    assert target[0].layers[0].kernel.state is not None
+    assert np.shares_memory(target[0].layers[0].kernel.state, target.kernels[0])
+
+
+def test_population_predict(make_genetic_model):
+    np.random.seed(7)
+    models = [make_genetic_model() for _ in range(3)]
+    population = Population(models)
+
+    for x in (np.random.standard_normal((3, 17)), np.random.standard_normal((3, 5, 17))):
+        x = x.astype(population.kernels[0].dtype)
+        expected = np.array([model.predict(x[i]).reshape((*x.shape[1:-1], 2)) for i, model in enumerate(models)])
+        y = population.predict(x)
+        assert np.array_equal(y, expected)
+        assert population.predict(x) is not y
+
+
+def test_population_predict_out(make_genetic_model):
+    np.random.seed(8)
+    population = Population([make_genetic_model() for _ in range(3)])
+    x = np.random.standard_normal((3, 4096, 17)).astype(population.kernels[0].dtype)
+    expected = population.predict(x)
+    out = np.empty_like(expected)
+
+    # The buffers are allocated by the first call, the next ones only write into them. Numpy may still use its bounded
+    # ufunc buffer to broadcast the biases, but nothing grows with the batch
+
+    tracemalloc.start()
+    try:
+        tracemalloc.reset_peak()
+        start, _ = tracemalloc.get_traced_memory()
+        y = population.predict(x, out=out)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    assert y is out
+    assert np.array_equal(out, expected)
+    assert peak - start < out.nbytes
@@ -0,0 +1,59 @@
+from __future__ import annotations
+
+import itertools
+import statistics
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Iterable
+
+Setup = Callable[..., Callable[[], Any]]
+
+
+@dataclass
+class Benchmark:
+    """A benchmark is a setup function returning the statement to time, optionally run over a grid of parameters."""
+
+    name: str
+    setup: Setup
+    params: dict[str, list[Any]] = field(default_factory=dict)
+    number: int = 100
+    repeat: int = 5
+
+    def cases(self) -> Iterable[tuple[str, dict[str, Any]]]:
+        keys = list(self.params.keys())
+        for values in itertools.product(*(self.params[k] for k in keys)):
+            kwargs = dict(zip(keys, values, strict=True))
+            suffix = ",".join(f"{k}={v}" for k, v in kwargs.items())
+            yield (f"{self.name}[{suffix}]" if suffix else self.name), kwargs
+
+
+BENCHMARKS: dict[str, Benchmark] = {}
+
+
+def benchmark(number: int = 100, repeat: int = 5, **params: list[Any]) -> Callable[[Setup], Setup]:
+    def decorator(setup: Setup) -> Setup:
+        name = f"{setup.__module__.split('.')[-1]}.{setup.__name__}"
+        BENCHMARKS[name] = Benchmark(name, setup, params, number, repeat)
+        return setup
+
+    return decorator
+
+
+def measure(stmt: Callable[[], Any], number: int, repeat: int) -> dict[str, float]:
+    stmt()  # Warm up, JIT compilation and caches
+
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            stmt()
+        timings.append((time.perf_counter() - start) / number)
+
+    return {
+        "number": number,
+        "repeat": repeat,
+        "min": min(timings),
+        "median": statistics.median(timings),
+        "mean": statistics.mean(timings),
+        "stdev": statistics.stdev(timings) if repeat > 1 else 0.0,
+    }
@@ -0,0 +1,127 @@
+import argparse
+import datetime
+import json
+import platform
+import re
+import sys
+from pathlib import Path
+
+import numpy as np
+
+import benchmarks.env  # noqa: F401
+import benchmarks.geometry  # noqa: F401
+import benchmarks.world  # noqa: F401
+from benchmarks import BENCHMARKS, measure
+
+BASELINES_DIR = Path(__file__).parent / "baselines"
+
+
+def _resolve(name_or_path: str) -> Path:
+    path = Path(name_or_path)
+    return path if path.suffix == ".json" else BASELINES_DIR / f"{name_or_path}.json"
+
+
+def _parse_value(value: str) -> int | float | str:
+    for parse in (int, float):
+        try:
+            return parse(value)
+        except ValueError:
+            pass
+    return value
+
+
+def _parse_params(params: list[str]) -> dict[str, list]:
+    result = {}
+    for param in params:
+        key, values = param.split("=", 1)
+        result[key] = [_parse_value(x) for x in values.split(",")]
+    return result
+
+
+def run(args: argparse.Namespace) -> int:
+    overrides = _parse_params(args.param)
+    results = {}
+
+    for bench in BENCHMARKS.values():
+        if args.filter and not re.search(args.filter, bench.name):
+            continue
+        bench.params = {k: overrides.get(k, v) for k, v in bench.params.items()}
+        for name, kwargs in bench.cases():
+            stmt = bench.setup(**kwargs)
+            result = measure(stmt, args.number or bench.number, args.repeat or bench.repeat)
+            results[name] = result
+            print(f"{name:<64}{result['median'] * 1000:>12.4f}ms ±{result['stdev'] * 1000:.4f}", flush=True)
+
+    report = {
+        "meta": {
+            "date": datetime.datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "machine": platform.machine(),
+            "processor": platform.processor(),
+        },
+        "results": results,
+    }
+
+    output = _resolve(args.save)
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=4)
+    print(f"Results saved into {output}")
+
+    return 0
+
+
+def compare(args: argparse.Namespace) -> int:
+    with open(_resolve(args.baseline), "r") as f:
+        baseline = json.load(f)["results"]
+    with open(_resolve(args.current), "r") as f:
+        current = json.load(f)["results"]
+
+    regressions = 0
+    print(f"{'benchmark':<64}{'baseline':>14}{'current':>14}{'ratio':>10}")
+    for name in sorted(baseline.keys() | current.keys()):
+        if name not in baseline or name not in current:
+            status = "baseline only" if name not in current else "current only"
+            print(f"{name:<64}{status:>38}")
+            continue
+        base, curr = baseline[name]["median"], current[name]["median"]
+        ratio = curr / base if base > 0 else float("inf")
+        flag = ""
+        if ratio > 1 + args.threshold:
+            flag = " slower"
+            regressions += 1
+        elif ratio < 1 - args.threshold:
+            flag = " faster"
+        print(f"{name:<64}{base * 1000:>12.4f}ms{curr * 1000:>12.4f}ms{ratio:>10.2f}{flag}")
+
+    return 1 if regressions > 0 and args.strict else 0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(prog="benchmarks", description="Taxi Driver Environment benchmarks")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = subparsers.add_parser("run", help="Run the benchmarks and save the results as a JSON baseline")
+    run_parser.add_argument("--save", default="latest", help="Baseline name or JSON file path")
+    run_parser.add_argument("--filter", default=None, help="Regex to select the benchmarks to run")
+    run_parser.add_argument("--number", type=int, default=None, help="Override the number of calls per repeat")
+    run_parser.add_argument("--repeat", type=int, default=None, help="Override the number of repeats")
+    run_parser.add_argument(
+        "--param", action="append", default=[], help="Override a parameter grid, i.e. agent_count=10,100"
+    )
+    run_parser.set_defaults(func=run)
+
+    compare_parser = subparsers.add_parser("compare", help="Compare two JSON baselines")
+    compare_parser.add_argument("baseline", help="Baseline name or JSON file path")
+    compare_parser.add_argument("current", nargs="?", default="latest", help="Baseline name or JSON file path")
+    compare_parser.add_argument("--threshold", type=float, default=0.1, help="Relative change to report")
+    compare_parser.add_argument("--strict", action="store_true", help="Exit with an error on regressions")
+    compare_parser.set_defaults(func=compare)
+
+    args = parser.parse_args()
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
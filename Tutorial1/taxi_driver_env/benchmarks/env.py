@@ -0,0 +1,22 @@
+import numpy as np
+from taxi_driver_env.envs import Tutorial1Env
+
+from benchmarks import benchmark
+
+AGENT_COUNTS = [10, 100, 1000, 10000]
+
+
+@benchmark(number=10, repeat=3, agent_count=AGENT_COUNTS)
+def tutorial1_env_step(agent_count: int):
+    env = Tutorial1Env(agent_count=agent_count)
+    env.reset(seed=5)
+    action = np.tile([1.0, 0.0], (agent_count, 1))
+
+    # The episode is reset as soon as it ends, the steps after it would only time an empty simulation
+
+    def step():
+        _, _, terminated, truncated, _ = env.step(action)
+        if terminated or truncated:
+            env.reset()
+
+    return step
@@ -0,0 +1,79 @@
+import numpy as np
+from taxi_driver_env.math import linalg as la
+from taxi_driver_env.math.geom import (
+    Point,
+    Segment,
+    cast_ray_segments,
+    intersect,
+    point_in_polygon,
+    polygon_to_segments,
+)
+from taxi_driver_env.math.linalg import lst_2_vec
+
+from benchmarks import benchmark
+
+
+def _random_segments(n: int, rng: np.random.Generator) -> list[Segment]:
+    return [Segment(Point(rng.uniform(-25, 25, 2)), Point(rng.uniform(-25, 25, 2))) for _ in range(n)]
+
+
+def _polygon(n: int) -> list[Point]:
+    angles = np.linspace(0, 2 * np.pi, n, endpoint=False)
+    return [Point(lst_2_vec([np.cos(a) * 10, np.sin(a) * 10])) for a in angles]
+
+
+@benchmark(number=10000)
+def normalize():
+    v = lst_2_vec([3, 4])
+    return lambda: la.normalize(v)
+
+
+@benchmark(number=10000)
+def intersect_jit():
+    a, b, c, d = lst_2_vec([0, 0]), lst_2_vec([1, 1]), lst_2_vec([0, 1]), lst_2_vec([1, 0])
+    return lambda: la.intersect_jit(a, b, c, d, True)
+
+
+@benchmark(number=10000)
+def distance_point_segment_jit():
+    p, a, b = lst_2_vec([0.5, 1]), lst_2_vec([0, 0]), lst_2_vec([1, 0])
+    return lambda: la.distance_point_segment_jit(p, a, b, True)
+
+
+@benchmark(number=10000)
+def nearest_point_segment_jit():
+    p, a, b = lst_2_vec([0.5, 1]), lst_2_vec([0, 0]), lst_2_vec([1, 0])
+    return lambda: la.nearest_point_segment_jit(p, a, b, True)
+
+
+@benchmark(number=10000)
+def collision_circle_segment_jit():
+    p, a, b = lst_2_vec([0.5, 0.5]), lst_2_vec([0, 0]), lst_2_vec([1, 0])
+    return lambda: la.collision_circle_segment_jit(p, 1.0, a, b)
+
+
+@benchmark(number=1000)
+def intersect_segments():
+    seg1 = Segment(Point(lst_2_vec([0, 0])), Point(lst_2_vec([1, 1])))
+    seg2 = Segment(Point(lst_2_vec([0, 1])), Point(lst_2_vec([1, 0])))
+    return lambda: intersect(seg1, seg2)
+
+
+@benchmark(number=100, segment_count=[10, 100, 1000])
+def cast_ray_segments_first_hit(segment_count: int):
+    segments = _random_segments(segment_count, np.random.default_rng(5))
+    position, direction = Point(lst_2_vec([0, 0])), lst_2_vec([1, 0])
+    return lambda: cast_ray_segments(position, direction, 25, segments)
+
+
+@benchmark(number=100, point_count=[24, 240])
+def point_in_polygon_strict(point_count: int):
+    polygon = _polygon(point_count)
+    point = Point(lst_2_vec([1, 1]))
+    return lambda: point_in_polygon(point, polygon)
+
+
+@benchmark(number=100)
+def polygon_to_segments_24():
+    polygon = _polygon(24)
+    return lambda: polygon_to_segments(polygon)
@@ -0,0 +1,32 @@
+import random
+
+import numpy as np
+from taxi_driver_env.game.entities.world import ROAD_WIDTH
+from taxi_driver_env.math import envelope, graph
+
+from benchmarks import benchmark
+
+
+def _random_graph(seed: int = 5) -> graph.SpatialGraph:
+    random.seed(seed)
+    np.random.seed(seed)
+    return graph.generate_random()
+
+
+@benchmark(number=1, repeat=3)
+def generate_random_graph():
+    return lambda: _random_graph()
+
+
+@benchmark(number=1, repeat=3)
+def generare_borders_from_spatial_graph():
+    roads = _random_graph()
+    return lambda: envelope.generare_borders_from_spatial_graph(roads, ROAD_WIDTH, [])
+
+
+@benchmark(number=100)
+def get_shortest_path():
+    roads = _random_graph()
+    start = roads.vertice[0]
+    stop = max(roads.vertice, key=lambda x: np.linalg.norm(x.point.xy - start.point.xy))
+    return lambda: roads.get_shortest_path(start, stop)
@@ -4,6 +4,7 @@ import numpy as np
 import pyray as pr
 
 import taxi_driver_env.render.pyrayex as prx
+import taxi_driver_env.resources as res
 from taxi_driver_env.constants import (
     APP_NAME,
     FRAME_RATE,
@@ -28,6 +29,7 @@ def main():
     scene = first_scene("title")
 
     while not pr.window_should_close():
+        res.process_uploads()
         next = scene.update(pr.get_frame_time())
         pr.begin_drawing()
         scene.draw()
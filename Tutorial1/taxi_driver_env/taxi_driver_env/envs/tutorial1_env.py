@@ -1,4 +1,5 @@
 import random
+import time
 
 import gymnasium as gym
 import numpy as np
@@ -11,18 +12,64 @@ from taxi_driver_env.constants import (
     WINDOW_WIDTH,
 )
 from taxi_driver_env.game.scenes import trainer
+from taxi_driver_env.physic.engine import INTEGRATORS
+from taxi_driver_env.render import pyrayex as prx
+from taxi_driver_env.utils import profiler
+from taxi_driver_env.utils.recorder import DTYPES, KEYFRAME_EVERY, Episode, Header, Keyframe, Recorder
 
 
 class Tutorial1Env(gym.Env):
-    metadata = {"render_modes": ["human"], "render_fps": 10}  # type: ignore # noqa: RUF012
+    metadata = {"render_modes": ["human", "rgb_array"], "render_fps": 10}  # type: ignore # noqa: RUF012
 
-    def __init__(self, agent_count=10, render_mode=None, render_fps=None):
+    def __init__(
+        self,
+        agent_count=10,
+        render_mode=None,
+        render_fps=None,
+        render_every=1,
+        render_width=None,
+        render_height=None,
+        uncapped=False,
+        integrator="semi_implicit_euler",
+        substeps=1,
+        dt=None,
+        profile=False,
+        profile_file=None,
+        autoreset=False,
+        record_file=None,
+        record_dtype="float32",
+        keyframe_every=KEYFRAME_EVERY,
+    ):
         assert render_mode is None or render_mode in self.metadata["render_modes"]
+        assert render_every > 0
+        assert render_width is None or render_width > 0
+        assert render_height is None or render_height > 0
+        assert integrator in INTEGRATORS
+        assert substeps > 0
+        assert dt is None or dt > 0
+        assert record_dtype in DTYPES
+        assert keyframe_every > 0
 
         self.agent_count = agent_count
-        self.render_mode = render_mode or self.metadata["render_modes"][0]
+        self.render_mode = render_mode
         self.render_fps = render_fps or self.metadata["render_fps"]
+        self.render_every = render_every
+        self.render_width = render_width or WINDOW_WIDTH
+        self.render_height = render_height or WINDOW_HEIGHT
+        self.uncapped = uncapped
         self.agent_count = agent_count
+        self.integrator = integrator
+        self.substeps = substeps
+        self.dt = dt or 1 / FRAME_RATE
+        self.profile_file = profile_file
+        self.keyframe_every = keyframe_every
+        self.autoreset = autoreset
+
+        # The timers of the simulation go to the profiler of the env while it steps, other envs keep their own
+
+        self._profiler = profiler.Profiler(enabled=profile)
+        if profile_file is not None:
+            self._profiler.start_cprofile()
 
         agent_space = gym.spaces.Dict(
             {
@@ -34,8 +81,18 @@ class Tutorial1Env(gym.Env):
 
         self.action_space = gym.spaces.Box(-1, 1, shape=(agent_count, 2), dtype=np.float64)
 
+        self._recorder = None
+        if record_file is not None:
+            header = Header(agent_count, record_dtype, substeps, self.dt, keyframe_every, integrator, autoreset)
+            self._recorder = Recorder(record_file, header)
+
         self._gfx_initialized = False
         self._agent_spawned = False
+        self._step_count = 0
+        self._episode_step = 0
+        self._dones = np.zeros(agent_count, dtype=bool)
+        self._final_scores = np.full(agent_count, np.nan)
+        self._next_frame_time = 0.0
 
     def reset(self, seed=None, options=None):
         super().reset(seed=seed)
@@ -44,38 +101,103 @@ class Tutorial1Env(gym.Env):
             random.seed(seed)
             np.random.seed(seed)
 
-        if options is not None and isinstance(options, dict):
-            if options.get("reset_corridor", False):
-                trainer.get_singleton().corridor = None
+        options = options if isinstance(options, dict) else {}
+        if options.get("reset_corridor", False):
+            trainer.get_singleton().corridor = None
 
         if not self._agent_spawned:
+            if options.get("corridor_id") is not None:
+                trainer.reset_corridor(options["corridor_id"])
+            trainer.get_singleton().integrator = self.integrator
+            trainer.get_singleton().substeps = self.substeps
             trainer.spawn_agents(self.agent_count)
             self._agent_spawned = True
 
+        if options.get("spawn_location") is not None:
+            trainer.set_spawn_index(*options["spawn_location"])
+
+        if self._recorder is not None:
+            spawn_index, spawn_point = trainer.get_spawn_index()
+            self._recorder.write_episode(Episode(seed, trainer.get_corridor_id(), spawn_index, spawn_point))
+
         trainer.reset()
+        self._episode_step = 0
+        self._dones[:] = False
+        self._final_scores[:] = np.nan
+        self._record_keyframe()
 
         return self._get_obs(), self._get_info()
 
     def step(self, action):
-        for i, agent in enumerate(trainer.get_agents()):
-            throttle, wheel = action[i]
-            agent.push_throttle(throttle)
-            agent.turn_wheel(wheel)
+        with profiler.activate(self._profiler):
+            return self._step(action)
 
-        trainer.update(1 / FRAME_RATE)
-        terminated = trainer.is_terminated()
+    def clone_state(self):
+        """Returns a snapshot of the simulation, from which it can be restored and branched any number of times."""
+        return trainer.clone_state(), self._episode_step
 
-        if self.render_mode == "human":
+    def restore_state(self, state):
+        assert self._recorder is None, "A recording can not be replayed across a restored state"
+        snapshot, self._episode_step = state
+        trainer.restore_state(snapshot)
+        return self._get_obs(), self._get_info()
+
+    def get_spawn_location(self):
+        """The spawn location of the next reset as an index and a point, it can be given back as a reset option."""
+        return trainer.get_spawn_index()
+
+    def render(self):
+        if self.render_mode != "rgb_array":
+            return None
+
+        with profiler.activate(self._profiler), profiler.timer("env.render"):
             if not self._gfx_initialized:
                 self._gfx_init()
                 self._gfx_initialized = True
-            self._gfx_render()
-
-        return self._get_obs(), 0, terminated, False, self._get_info()
+            return self._gfx_capture()
 
     def close(self):
-        if self.render_mode == "human" and self._gfx_initialized:
+        if self._recorder is not None:
+            self._recorder.close()
+            self._recorder = None
+        if self._gfx_initialized:
             self._gfx_close()
+        if self.profile_file is not None:
+            self._profiler.stop_cprofile(self.profile_file)
+
+    def profile_summary(self):
+        """The timings of the phases of the last steps, computed on demand."""
+        return self._profiler.summary()
+
+    def _step(self, action):
+        with profiler.timer("env.actions"):
+            if self._recorder is not None:
+                action = self._recorder.write_step(action)
+            for i, agent in enumerate(trainer.get_agents()):
+                throttle, wheel = action[i]
+                agent.push_throttle(throttle)
+                agent.turn_wheel(wheel)
+
+        with profiler.timer("env.update"):
+            trainer.update(self.dt)
+            if self.autoreset:
+                self._respawn_dead_agents()
+                terminated = False
+            else:
+                terminated = trainer.is_terminated()
+
+        self._episode_step += 1
+        self._record_keyframe()
+
+        if self.render_mode == "human":
+            with profiler.timer("env.render"):
+                if not self._gfx_initialized:
+                    self._gfx_init()
+                    self._gfx_initialized = True
+                if self._is_frame_due():
+                    self._gfx_render()
+
+        return self._get_obs(), 0, terminated, False, self._get_info()
 
     def _get_obs(self):
         return [trainer.get_agent_obs(x) for x in trainer.get_agents()]
@@ -83,15 +205,72 @@ class Tutorial1Env(gym.Env):
     def _get_info(self):
         agents = trainer.get_agents()
         best_agent = trainer.get_best_agent()
-        return {
+        info = {
             "scores": [trainer.get_agent_score(x) for x in agents],
             "best_agent_vin": best_agent.vin if best_agent is not None else -1,
         }
+        if self.autoreset:
+            info["dones"] = self._dones.copy()
+            info["final_scores"] = self._final_scores.copy()
+        return info
+
+    def _respawn_dead_agents(self):
+        # Refill the slot of a dead agent at once, so the batch stays full instead of waiting for the last survivor
+
+        self._dones[:] = False
+        self._final_scores[:] = np.nan
+        for i, agent in enumerate(trainer.get_agents()):
+            if not agent.is_alive():
+                self._dones[i] = True
+                self._final_scores[i] = trainer.get_agent_score(agent)
+                trainer.respawn_agent(agent)
+
+    def _record_keyframe(self):
+        if self._recorder is None or self._episode_step % self.keyframe_every != 0:
+            return
+        agents = trainer.get_agents()
+        self._recorder.write_keyframe(
+            Keyframe(
+                self._episode_step,
+                np.array([x.pos for x in agents]),
+                np.array([x.vel for x in agents]),
+                np.array([x.head for x in agents]),
+            )
+        )
+
+    def _is_frame_due(self):
+        # Decimate the rendering to one frame every k steps, and in uncapped mode, to the wall-clock frame rate
+
+        self._step_count += 1
+        if self._step_count % self.render_every != 0:
+            return False
+        if self.uncapped:
+            now = time.monotonic()
+            if now < self._next_frame_time:
+                return False
+            self._next_frame_time = now + 1 / self.render_fps
+        return True
 
     def _gfx_init(self):
+        if self.render_mode == "rgb_array":
+            # A hidden window only provides the GL context, the frames are rendered offscreen. The window still
+            # needs a display, a virtual one on a machine without any
+
+            if not prx.has_display():
+                raise RuntimeError("The rgb_array mode needs a display, run it under a virtual one such as xvfb-run")
+            pr.set_config_flags(pr.ConfigFlags.FLAG_WINDOW_HIDDEN)
+            pr.init_window(WINDOW_WIDTH, WINDOW_HEIGHT, APP_NAME)
+            pr.set_target_fps(0)
+            self._read_pixels = prx.load_read_pixels()
+            self._frame = pr.load_render_texture(WINDOW_WIDTH, WINDOW_HEIGHT)
+            self._capture = pr.load_render_texture(self.render_width, self.render_height)
+            pr.set_texture_filter(self._frame.texture, pr.TextureFilter.TEXTURE_FILTER_BILINEAR)
+            self._pixels = np.zeros((self.render_height, self.render_width, 3), dtype=np.uint8)
+            return
+
         pr.set_config_flags(pr.ConfigFlags.FLAG_MSAA_4X_HINT)
         pr.init_window(WINDOW_WIDTH, WINDOW_HEIGHT, APP_NAME)
-        pr.set_target_fps(self.render_fps)
+        pr.set_target_fps(0 if self.uncapped else self.render_fps)
         pr.hide_cursor()
         pr.init_audio_device()
 
@@ -100,5 +279,48 @@ class Tutorial1Env(gym.Env):
         trainer.draw()
         pr.end_drawing()
 
+    def _gfx_capture(self):
+        # The tiles must be baked before entering the texture mode, raylib does not nest them
+
+        trainer.prepare(complete=True)
+        pr.begin_texture_mode(self._frame)
+        trainer.draw(prepared=True)
+        pr.end_texture_mode()
+
+        # Scale into the capture target without flipping, so the rows read back from OpenGL are already top-down
+
+        tex = self._frame.texture
+        width, height = self.render_width, self.render_height
+        pr.begin_texture_mode(self._capture)
+        pr.draw_texture_pro(
+            tex,
+            pr.Rectangle(0, 0, tex.width, tex.height),
+            pr.Rectangle(0, 0, width, height),
+            pr.Vector2(0, 0),
+            0,
+            pr.WHITE,
+        )
+
+        # The pixels are read straight into the returned array while the capture target is bound
+
+        if self._read_pixels is not None:
+            self._read_pixels(self._pixels)
+            pr.end_texture_mode()
+            return self._pixels
+
+        pr.end_texture_mode()
+        data = pr.rl_read_texture_pixels(
+            self._capture.texture.id, width, height, pr.PixelFormat.PIXELFORMAT_UNCOMPRESSED_R8G8B8A8
+        )
+        try:
+            buffer = pr.ffi.buffer(pr.ffi.cast("unsigned char *", data), width * height * 4)
+            np.copyto(self._pixels, np.frombuffer(buffer, dtype=np.uint8).reshape(height, width, 4)[..., :3])
+        finally:
+            pr.mem_free(data)
+        return self._pixels
+
     def _gfx_close(self):
+        if self.render_mode == "rgb_array":
+            pr.unload_render_texture(self._frame)
+            pr.unload_render_texture(self._capture)
         pr.close_window()
@@ -1,8 +1,9 @@
+from dataclasses import dataclass
 from typing import Optional
 
 import numpy as np
 import pyray as pr
-import taxi_driver_env.resources as res
+import taxi_driver_env.render.pyrayex as prx
 from taxi_driver_env.constants import GAMEPAD_AXIS_X, GAMEPAD_AXIS_Y, GAMEPAD_ID
 from taxi_driver_env.game.entities import world
 from taxi_driver_env.math import envelope
@@ -16,7 +17,10 @@ from taxi_driver_env.math.geom import (
 )
 from taxi_driver_env.math.linalg import EPS, lst_2_vec, norm, normalize
 from taxi_driver_env.physic.constants import C_G
-from taxi_driver_env.physic.engine import euler_integrate
+from taxi_driver_env.physic.engine import Acceleration, integrate
+from taxi_driver_env.render import atlas
+from taxi_driver_env.render.sprite_batch import SpriteBatch, to_rgba
+from taxi_driver_env.utils import profiler
 from taxi_driver_env.utils.bitbang import bit_set, bit_set_if, bit_unset, is_bit_set
 
 MAX_LIFE = 100
@@ -38,6 +42,33 @@ RAY_FOV = np.pi * 0.3
 START_OFFSET = world.ROAD_WIDTH / 4  # m
 MAX_VISITED_LOCATION = 10
 
+_sprites = SpriteBatch(atlas.get_atlas())
+
+
+@dataclass(slots=True)
+class CarState:
+    """A copy of the dynamic state of a car, the segments and points it refers to are never modified in place."""
+
+    pos: np.ndarray
+    vel: np.ndarray
+    head: np.ndarray
+    mass: float
+    life: float
+    wheel: float
+    throttle: float
+    flags: int
+    corridor: envelope.Envelope
+    spawn_location: envelope.Location
+    current_location: envelope.Location
+    visited_location: list[envelope.Location]
+    camera: list[Point]
+    proximity: Optional[Point]
+    prev_pos: Point
+    curr_pos: Point
+    total_distance: float
+    total_velocity: float
+    total_tick: int
+
 
 class Car:
     def __init__(
@@ -46,12 +77,16 @@ class Car:
         input_mode: str = "human",
         vin: int = 0,
         corridor: Optional[envelope.Envelope] = None,
+        integrator: str = "semi_implicit_euler",
+        substeps: int = 1,
     ) -> None:
         assert input_mode in ("human", "ai")
         self.vin = vin
         self.color = color
         self.input_mode = input_mode
         self.debug_mode = False
+        self.integrator = integrator
+        self.substeps = substeps
 
         self.corridor: envelope.Envelope = corridor if corridor is not None else world.get_random_corridor()
         self.spawn_location: envelope.Location = (
@@ -129,6 +164,54 @@ class Car:
         self.total_velocity = 0.0
         self.total_tick = 0
 
+    def get_state(self) -> CarState:
+        return CarState(
+            self.pos.copy(),
+            self.vel.copy(),
+            self.head.copy(),
+            self.mass,
+            self.life,
+            self.wheel,
+            self.throttle,
+            self.flags,
+            self.corridor,
+            self.spawn_location,
+            self.current_location,
+            self.visited_location.copy(),
+            [x.end for x in self.camera],
+            self.proximity.end if self.proximity is not None else None,
+            self.prev_pos,
+            self.curr_pos,
+            self.total_distance,
+            self.total_velocity,
+            self.total_tick,
+        )
+
+    def set_state(self, state: CarState) -> None:
+        self.pos = state.pos.copy()
+        self.vel = state.vel.copy()
+        self.head = state.head.copy()
+        self.mass = state.mass
+        self.life = state.life
+        self.wheel = state.wheel
+        self.throttle = state.throttle
+        self.flags = state.flags
+        self.corridor = state.corridor
+        self.spawn_location = state.spawn_location
+        self.current_location = state.current_location
+        self.visited_location = state.visited_location.copy()
+        self.prev_pos = state.prev_pos
+        self.curr_pos = state.curr_pos
+        self.total_distance = state.total_distance
+        self.total_velocity = state.total_velocity
+        self.total_tick = state.total_tick
+
+        # The sensors start from the position of the car, they share its array like the ones cast by the update
+
+        pos = Point(self.pos)
+        self.camera = [Segment(pos, x) for x in state.camera]
+        self.proximity = Segment(pos, state.proximity) if state.proximity is not None else None
+
     def update(self, dt: float) -> None:
         if self.input_mode == "human":
             self._input_human()
@@ -139,31 +222,37 @@ class Car:
             return
 
         if self.debug_mode:
-            color: pr.Color = pr.YELLOW if not is_bit_set(self.flags, FLAG_DAMAGED | FLAG_OUT_OF_TRACK) else pr.RED  # type: ignore
-            color = pr.color_alpha(color, 0.25)
-
-            pr.draw_line_v(
-                self.visited_location[-1][1].to_vec(),
-                self.current_location[1].to_vec(),
-                color,
-            )
-
-            for ray in self.camera:
-                pr.draw_line_v(ray.start.to_vec(), ray.end.to_vec(), color)
+            self._draw_debug()
 
-            if self.proximity is not None:
-                pr.draw_line_v(self.proximity.start.to_vec(), self.proximity.end.to_vec(), color)
-
-        tex = res.load_texture("spritesheet")
+        sprites = atlas.get_atlas()
         pr.draw_texture_pro(
-            tex,
-            pr.Rectangle(0, 0, 128, 128),
+            sprites.texture,
+            sprites.get_region("car"),
             pr.Rectangle(self.pos[0], self.pos[1], LENGTH, LENGTH),
             pr.Vector2(LENGTH * 0.5, LENGTH * 0.5),
             np.rad2deg(np.arctan2(self.head[1], self.head[0]) + np.pi / 2),
-            pr.color_alpha(self.color, 1.0) if self.debug_mode else self.color,
+            self._get_sprite_color(),
         )
 
+    def _get_sprite_color(self) -> pr.Color:
+        return pr.color_alpha(self.color, 1.0) if self.debug_mode else self.color
+
+    def _draw_debug(self) -> None:
+        color: pr.Color = pr.YELLOW if not is_bit_set(self.flags, FLAG_DAMAGED | FLAG_OUT_OF_TRACK) else pr.RED  # type: ignore
+        color = pr.color_alpha(color, 0.25)
+
+        pr.draw_line_v(
+            self.visited_location[-1][1].to_vec(),
+            self.current_location[1].to_vec(),
+            color,
+        )
+
+        for ray in self.camera:
+            pr.draw_line_v(ray.start.to_vec(), ray.end.to_vec(), color)
+
+        if self.proximity is not None:
+            pr.draw_line_v(self.proximity.start.to_vec(), self.proximity.end.to_vec(), color)
+
     def _input_human(self) -> None:
         # Gamepad
 
@@ -184,68 +273,67 @@ class Car:
     def _update_physic(self, dt: float) -> None:
         # Simple car modelisation (traction, drag road, drag rolling)
 
-        forces = np.zeros(2)
+        with profiler.timer("car.physics"):
+            if self.wheel != 0:
+                circ_radius = LENGTH / (np.sin(self.wheel))
+                ang_vel = np.linalg.norm(self.vel) / circ_radius
+                c, s = np.cos(ang_vel), np.sin(ang_vel)
+                self.head = [[c, -s], [s, c]] @ self.head
 
-        if self.wheel != 0:
-            circ_radius = LENGTH / (np.sin(self.wheel))
-            ang_vel = np.linalg.norm(self.vel) / circ_radius
-            c, s = np.cos(ang_vel), np.sin(ang_vel)
-            self.head = [[c, -s], [s, c]] @ self.head
-        tract = self.head * self.throttle
-        forces += tract
+            acc = get_acceleration(self.head, self.throttle, self.mass)
+            self.pos[:], self.vel[:] = integrate(self.pos, self.vel, acc, dt, self.integrator, self.substeps)
 
-        drag_rd = self.vel * -DRAG_ROAD * self.mass * C_G
-        forces += drag_rd
-
-        drag_rr = self.vel * -DRAG_ROLLING * self.mass * C_G
-        forces += drag_rr
-
-        euler_integrate(self, forces, dt)
+        self._update_state()
 
+    def _update_state(self) -> None:
         # Collisions
 
-        match self._collision():
-            case None:
-                self.flags = bit_unset(self.flags, FLAG_DAMAGED)
-            case reaction:
-                self.vel = self.vel * 0.5 + reaction
-                self.pos += reaction
-                self.head = normalize(self.vel)
-                self.flags = bit_set(self.flags, FLAG_DAMAGED)
+        with profiler.timer("car.collision"):
+            match self._collision():
+                case None:
+                    self.flags = bit_unset(self.flags, FLAG_DAMAGED)
+                case reaction:
+                    self.vel = self.vel * 0.5 + reaction
+                    self.pos += reaction
+                    self.head = normalize(self.vel)
+                    self.flags = bit_set(self.flags, FLAG_DAMAGED)
 
-        self.prev_pos = self.curr_pos
-        self.curr_pos = Point(self.pos.copy())
+            self.prev_pos = self.curr_pos
+            self.curr_pos = Point(self.pos.copy())
 
         # Sensors
 
         pos = Point(self.pos)
 
-        self.camera = self._cast_rays()
+        with profiler.timer("car.sensors"):
+            self.camera = self._cast_rays()
 
-        match nearest_point_segment(pos, self.visited_location[-1][0], True):
-            case None:
-                self.proximity = None
-                self.flags = bit_unset(self.flags, FLAG_OUT_OF_TRACK)
-            case Point() as nearest:
-                self.proximity = Segment(pos, nearest)
-                self.flags = bit_set_if(self.flags, FLAG_OUT_OF_TRACK, self.proximity.length < WIDTH * 0.75)
+            match nearest_point_segment(pos, self.visited_location[-1][0], True):
+                case None:
+                    self.proximity = None
+                    self.flags = bit_unset(self.flags, FLAG_OUT_OF_TRACK)
+                case Point() as nearest:
+                    self.proximity = Segment(pos, nearest)
+                    self.flags = bit_set_if(self.flags, FLAG_OUT_OF_TRACK, self.proximity.length < WIDTH * 0.75)
 
         # Localisation
 
-        is_new_location_added = False
-        self.current_location = self.corridor.get_nearest_location(pos)
-        curr_loc_seg, curr_loc_pos = self.current_location
-        if self.visited_location[-1][0] != curr_loc_seg:
-            self.visited_location.append((curr_loc_seg, curr_loc_seg.closest_ep(curr_loc_pos)))
-            if len(self.visited_location) > MAX_VISITED_LOCATION:
-                self.visited_location.pop(0)
-            is_new_location_added = True
+        with profiler.timer("car.localisation"):
+            is_new_location_added = False
+            self.current_location = self.corridor.get_nearest_location(pos)
+            curr_loc_seg, curr_loc_pos = self.current_location
+            if self.visited_location[-1][0] != curr_loc_seg:
+                self.visited_location.append((curr_loc_seg, curr_loc_seg.closest_ep(curr_loc_pos)))
+                if len(self.visited_location) > MAX_VISITED_LOCATION:
+                    self.visited_location.pop(0)
+                is_new_location_added = True
 
         # Statistics
 
-        self.total_distance += self.visited_location[-2][0].length if is_new_location_added else 0
-        self.total_velocity += norm(self.vel)
-        self.total_tick += 1
+        with profiler.timer("car.stats"):
+            self.total_distance += self.visited_location[-2][0].length if is_new_location_added else 0
+            self.total_velocity += norm(self.vel)
+            self.total_tick += 1
 
     def _cast_rays(
         self,
@@ -270,3 +358,79 @@ class Car:
         nearest_segments = envelope.get_nearest_segments(self.corridor, position, radius)
         collide = lambda x: collision_circle_segment(position, radius, x)
         return next((x for x in map(collide, nearest_segments) if x is not None), None)
+
+
+def get_acceleration(head: np.ndarray, throttle: float | np.ndarray, mass: float | np.ndarray) -> Acceleration:
+    def acceleration(_: np.ndarray, vel: np.ndarray) -> np.ndarray:
+        tract = head * throttle
+        drag_rd = vel * -DRAG_ROAD * mass * C_G
+        drag_rr = vel * -DRAG_ROLLING * mass * C_G
+        return (tract + drag_rd + drag_rr) / mass
+
+    return acceleration
+
+
+def update_batch(cars: list[Car], dt: float) -> None:
+    if len(cars) == 0:
+        return
+
+    for acar in cars:
+        if acar.input_mode == "human":
+            acar._input_human()
+
+    # Same modelisation as Car._update_physic, but vectorized over all cars
+
+    with profiler.timer("car.physics"):
+        pos = np.array([x.pos for x in cars])
+        vel = np.array([x.vel for x in cars])
+        head = np.array([x.head for x in cars])
+        wheel = np.array([x.wheel for x in cars])
+        throttle = np.array([[x.throttle] for x in cars])
+        mass = np.array([[x.mass] for x in cars])
+
+        with np.errstate(divide="ignore"):
+            ang_vel = np.linalg.norm(vel, axis=1) / (LENGTH / np.sin(wheel))
+        c, s = np.cos(ang_vel), np.sin(ang_vel)
+        head = np.stack([c * head[:, 0] - s * head[:, 1], s * head[:, 0] + c * head[:, 1]], axis=1)
+
+        acc = get_acceleration(head, throttle, mass)
+        pos, vel = integrate(pos, vel, acc, dt, cars[0].integrator, cars[0].substeps)
+
+    for i, acar in enumerate(cars):
+        acar.head = head[i]
+        acar.pos[:], acar.vel[:] = pos[i], vel[i]
+        acar._update_state()
+
+
+def draw_batch(cars: list[Car], layer: int = 1) -> None:
+    """Draws the sprites of all the cars in a single draw call, the debug overlays are still drawn per car."""
+    if layer != 1 or len(cars) == 0:
+        return
+
+    # Cull the cars out of the view, with room for the debug rays
+
+    view = prx.get_view()
+    positions = np.array([x.pos for x in cars])
+    visible = np.all(
+        (positions >= (view.x - RAY_MAX_LEN, view.y - RAY_MAX_LEN))
+        & (positions <= (view.x + view.width + RAY_MAX_LEN, view.y + view.height + RAY_MAX_LEN)),
+        axis=1,
+    )
+    cars = [cars[i] for i in np.flatnonzero(visible)]
+    if len(cars) == 0:
+        return
+
+    for acar in cars:
+        if acar.debug_mode:
+            acar._draw_debug()
+
+    heads = np.array([x.head for x in cars])
+    _sprites.clear()
+    _sprites.add(
+        "car",
+        positions[visible],
+        (LENGTH, LENGTH),
+        np.arctan2(heads[:, 1], heads[:, 0]) + np.pi / 2,
+        [to_rgba(x._get_sprite_color()) for x in cars],
+    )
+    _sprites.draw()
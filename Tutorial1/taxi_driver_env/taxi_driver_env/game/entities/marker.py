@@ -4,10 +4,10 @@ from typing import Optional, Protocol
 
 import numpy as np
 import pyray as pr
-import taxi_driver_env.resources as res
 from taxi_driver_env.math.envelope import Location
 from taxi_driver_env.math.geom import Point, point_in_polygon
 from taxi_driver_env.math.linalg import normalize
+from taxi_driver_env.render import atlas
 
 
 class MarkerListener(Protocol):
@@ -69,10 +69,10 @@ class Marker:
             return
 
         pos = self.location[1].xy + self.right * self.width * 0.5
-        tex = res.load_texture("spritesheet")
+        sprites = atlas.get_atlas()
         pr.draw_texture_pro(
-            tex,
-            pr.Rectangle(768, 256, 20, 16),
+            sprites.texture,
+            sprites.get_region("marker"),
             pr.Rectangle(pos[0], pos[1], self.width, self.height),
             pr.Vector2(self.width * 0.5, self.height * 0.5),
             np.rad2deg(np.arctan2(self.right[1], self.right[0])),
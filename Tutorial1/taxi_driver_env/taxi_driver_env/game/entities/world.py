@@ -1,27 +1,36 @@
 from __future__ import annotations
 
+import itertools
 import random
-from dataclasses import dataclass
-from functools import lru_cache
+from dataclasses import dataclass, field
+from multiprocessing.connection import Connection
+from typing import Any
 
 import numpy as np
+import numpy.typing as npt
 import pyray as pr
-import taxi_driver_env.resources as res
+import taxi_driver_env.render.pyrayex as prx
 from taxi_driver_env.math import envelope, graph
 from taxi_driver_env.math.geom import (
     Point,
     Segment,
+    SegmentArray,
     distance,
     distance_point_segment,
     nearest_point_segment,
 )
 from taxi_driver_env.math.linalg import normalize
+from taxi_driver_env.math.spatial import UniformGrid
+from taxi_driver_env.render import atlas
+from taxi_driver_env.render.sprite_batch import SpriteBatch
+from taxi_driver_env.render.tile_cache import TileCache
 
 GRASS_COLOR = pr.Color(157, 176, 84, 255)
 BASE_COLOR = pr.Color(111, 111, 111, 255)
 ROAD_COLOR = pr.Color(60, 60, 60, 255)
 BORDER1_COLOR = pr.Color(255, 255, 255, 255)
 BORDER2_COLOR = pr.Color(255, 0, 0, 255)
+SHADOW_COLOR = pr.Color(0, 0, 0, 64)
 
 ROAD_WIDTH = 10  # m
 START_OFFSET = 2  # m
@@ -47,6 +56,11 @@ TREE_SIZES = {
 TREE_TYPES = list(TREE_SIZES.keys())
 TREE_OFFSET = 5  # m
 
+atlas.get_atlas().add_regions({name: sizes[:4] for name, sizes in (HOUSE_SIZES | TREE_SIZES).items()})
+
+# Each world gets a new generation, the caches built from a world are keyed by it since its id can be reused
+_generations = itertools.count()
+
 
 @dataclass
 class House:
@@ -81,15 +95,81 @@ class World:
     borders: envelope.Envelope
     houses: list[House]
     trees: list[Tree]
+    generation: int = field(default_factory=lambda: next(_generations), init=False, repr=False, compare=False)
+
+    def to_arrays(self) -> dict[str, npt.NDArray[Any]]:
+        """Flattens the world into plain arrays, cheap to pickle across processes."""
+        vertex_ids = {id(v): i for i, v in enumerate(self.roads.vertice)}
+        return {
+            "road_vertice": np.array([v.point.xy for v in self.roads.vertice]).reshape(-1, 2),
+            "road_edges": np.array([(vertex_ids[id(e.start)], vertex_ids[id(e.end)]) for e in self.roads.edges]),
+            "border_segments": self.borders.segment_array.xy,
+            "border_skeleton": SegmentArray.from_segments(self.borders.skeleton).xy,
+            "border_width": np.array(self.borders.width),
+            "house_paths": SegmentArray.from_segments(x.path for x in self.houses).xy,
+            "house_segments": SegmentArray.from_segments(x.segment for x in self.houses).xy,
+            "house_types": np.array([HOUSE_TYPES.index(x.type) for x in self.houses], dtype=np.int64),
+            "tree_positions": np.array([x.position.xy for x in self.trees]).reshape(-1, 2),
+            "tree_angles": np.array([x.angle for x in self.trees], dtype=np.float64),
+            "tree_types": np.array([TREE_TYPES.index(x.type) for x in self.trees], dtype=np.int64),
+        }
+
+    @staticmethod
+    def from_arrays(arrays: dict[str, npt.NDArray[Any]]) -> World:
+        vertice = [graph.SpatialVertex(Point(xy.copy())) for xy in arrays["road_vertice"]]
+        edges = [graph.SpatialEdge(vertice[i], vertice[j]) for i, j in arrays["road_edges"]]
+        borders = envelope.Envelope(
+            SegmentArray(arrays["border_segments"].copy()).to_segments(),
+            SegmentArray(arrays["border_skeleton"].copy()).to_segments(),
+            int(arrays["border_width"]),
+        )
+
+        # The houses are restored as generated, their position was already moved along the path
+
+        houses = []
+        for path, segment, type in zip(
+            SegmentArray(arrays["house_paths"].copy()),
+            SegmentArray(arrays["house_segments"].copy()),
+            arrays["house_types"],
+            strict=True,
+        ):
+            house = object.__new__(House)
+            house.position, house.segment, house.type = path.start, segment, HOUSE_TYPES[type]
+            house.angle = segment.angle
+            house.path = path
+            houses.append(house)
+
+        trees = [
+            Tree(Point(xy.copy()), float(angle), TREE_TYPES[type])
+            for xy, angle, type in zip(
+                arrays["tree_positions"], arrays["tree_angles"], arrays["tree_types"], strict=True
+            )
+        ]
+
+        return World(graph.SpatialGraph(vertice, edges), borders, houses, trees)
 
 
 _progress_callback: list[envelope.ProgressCallBack] = []
+_singletons: dict[str, World] = {}
 
 
-@lru_cache(1)
 def get_singleton(name: str = "default") -> World:
-    pr.trace_log(pr.TraceLogLevel.LOG_INFO, "WORLD: Initialize singleton")
+    world = _singletons.get(name)
+    if world is None:
+        pr.trace_log(pr.TraceLogLevel.LOG_INFO, "WORLD: Initialize singleton")
+        world = _singletons[name] = generate()
+    return world
+
+
+def set_singleton(world: World, name: str = "default") -> None:
+    _singletons[name] = world
+
 
+def has_singleton(name: str = "default") -> bool:
+    return name in _singletons
+
+
+def generate() -> World:
     roads = graph.generate_random()
 
     borders, anchors = envelope.generare_borders_from_spatial_graph(roads, ROAD_WIDTH, _progress_callback)
@@ -125,6 +205,19 @@ def get_singleton(name: str = "default") -> World:
     return World(roads, borders, houses, trees)
 
 
+def generate_in_process(conn: Connection, random_state: object) -> None:
+    """Generates a world in a child process from the parent random state.
+
+    The progress is streamed over the connection, followed by the world as arrays and the random state after the
+    generation, so the parent carries on exactly as if it had generated the world itself.
+    """
+    random.setstate(random_state)  # type: ignore
+    add_progress_callback(lambda x: conn.send(("progress", x)))
+    world = generate()
+    conn.send(("done", (world.to_arrays(), random.getstate())))
+    conn.close()
+
+
 def add_progress_callback(progress_callback: envelope.ProgressCallBack):
     _progress_callback.append(progress_callback)
 
@@ -172,60 +265,84 @@ def update(dt: float) -> None:
     pass
 
 
+def draw_static() -> None:
+    world = get_singleton()
+
+    view = prx.get_view()
+    bound = (view.x, view.y, view.x + view.width, view.y + view.height)
+    skeleton_index, path_index, segment_index = _get_static_index(world)
+
+    skeleton = [world.borders.skeleton[i] for i in skeleton_index.query(*bound)]
+    for bone in skeleton:
+        bone.draw(world.borders.width + TREE_DISTANCE * 0.5, BASE_COLOR, None, True)
+    for i in path_index.query(*bound):
+        house = world.houses[i]
+        _, _, _, _, sx, _, _ = HOUSE_SIZES[house.type]
+        house.path.draw(sx * (1 + HOUSE_REAL_ESTATE), BASE_COLOR)
+    for bone in skeleton:
+        bone.draw(world.borders.width, ROAD_COLOR, None, True)
+    for bone in skeleton:
+        bone.draw(0.25, BORDER1_COLOR, (2, ROAD_COLOR), False)
+    for i in segment_index.query(*bound):
+        world.borders.segments[i].draw(0.5, BORDER1_COLOR, None, True)
+
+
+_static_layer = TileCache(draw_static, GRASS_COLOR)
+_sprites: dict[int, SpriteBatch] = {}
+_static_indexes: dict[int, tuple[UniformGrid, UniformGrid, UniformGrid]] = {}
+
+
+def _get_static_index(world: World) -> tuple[UniformGrid, UniformGrid, UniformGrid]:
+    static_index = _static_indexes.get(world.generation)
+    if static_index is not None:
+        return static_index
+
+    _static_indexes.clear()
+
+    max_path_width = max(sizes[4] for sizes in HOUSE_SIZES.values()) * (1 + HOUSE_REAL_ESTATE)
+    static_index = _static_indexes[world.generation] = (
+        UniformGrid.from_segments(
+            SegmentArray.from_segments(world.borders.skeleton).xy, (world.borders.width + TREE_DISTANCE * 0.5) / 2
+        ),
+        UniformGrid.from_segments(SegmentArray.from_segments(x.path for x in world.houses).xy, max_path_width / 2),
+        UniformGrid.from_segments(world.borders.segment_array.xy, 0.5),
+    )
+    return static_index
+
+
+def _get_sprites(world: World) -> SpriteBatch:
+    sprites = _sprites.get(world.generation)
+    if sprites is not None:
+        return sprites
+
+    for old_sprites in _sprites.values():
+        old_sprites.unload()
+    _sprites.clear()
+
+    sprites = _sprites[world.generation] = SpriteBatch(atlas.get_atlas(), 2 * (len(world.trees) + len(world.houses)))
+    for items, sizes in ((world.trees, TREE_SIZES), (world.houses, HOUSE_SIZES)):
+        for type, (_, _, _, _, sx, sy, sh) in sizes.items():
+            positions = np.array([x.position.xy for x in items if x.type == type]).reshape(-1, 2)
+            angles = np.array([x.angle for x in items if x.type == type])
+            sprites.add(type, positions + [-sh, sh], (sx, sy), angles, SHADOW_COLOR)
+            sprites.add(type, positions, (sx, sy), angles, pr.WHITE)
+    return sprites
+
+
+def prepare(camera: pr.Camera2D, complete: bool = False) -> None:
+    """Bakes the static layer seen by the camera, must be called before entering the 2D mode."""
+    _static_layer.prepare(camera, get_singleton().generation, complete)
+
+
 def draw(layer: int = 1) -> None:
     world = get_singleton()
 
     def draw_bg():
         pr.clear_background(GRASS_COLOR)
-        for bone in world.borders.skeleton:
-            bone.draw(world.borders.width + TREE_DISTANCE * 0.5, BASE_COLOR, None, True)
-        for house in world.houses:
-            _, _, _, _, sx, _, _ = HOUSE_SIZES[house.type]
-            house.path.draw(sx * (1 + HOUSE_REAL_ESTATE), BASE_COLOR)
-        for bone in world.borders.skeleton:
-            bone.draw(world.borders.width, ROAD_COLOR, None, True)
-        for bone in world.borders.skeleton:
-            bone.draw(0.25, BORDER1_COLOR, (2, ROAD_COLOR), False)
-        for segment in world.borders.segments:
-            segment.draw(0.5, BORDER1_COLOR, None, True)
+        if not _static_layer.draw():
+            draw_static()
 
     def draw_fg():
-        tex = res.load_texture("spritesheet")
-        for tree in world.trees:
-            tx, ty, tw, th, sx, sy, sh = TREE_SIZES[tree.type]
-            pr.draw_texture_pro(
-                tex,
-                pr.Rectangle(tx, ty, tw, th),
-                pr.Rectangle(tree.position.xy[0] - sh, tree.position.xy[1] + sh, sx, sy),
-                pr.Vector2(sx * 0.5, sy * 0.5),
-                np.rad2deg(tree.angle),
-                pr.Color(0, 0, 0, 64),
-            )
-            pr.draw_texture_pro(
-                tex,
-                pr.Rectangle(tx, ty, tw, th),
-                pr.Rectangle(tree.position.xy[0], tree.position.xy[1], sx, sy),
-                pr.Vector2(sx * 0.5, sy * 0.5),
-                np.rad2deg(tree.angle),
-                pr.WHITE,  # type: ignore
-            )
-        for house in world.houses:
-            tx, ty, tw, th, sx, sy, sh = HOUSE_SIZES[house.type]
-            pr.draw_texture_pro(
-                tex,
-                pr.Rectangle(tx, ty, tw, th),
-                pr.Rectangle(house.position.xy[0] - sh, house.position.xy[1] + sh, sx, sy),
-                pr.Vector2(sx * 0.5, sy * 0.5),
-                np.rad2deg(house.angle),
-                pr.Color(0, 0, 0, 64),
-            )
-            pr.draw_texture_pro(
-                tex,
-                pr.Rectangle(tx, ty, tw, th),
-                pr.Rectangle(house.position.xy[0], house.position.xy[1], sx, sy),
-                pr.Vector2(sx * 0.5, sy * 0.5),
-                np.rad2deg(house.angle),
-                pr.WHITE,  # type: ignore
-            )
+        _get_sprites(world).draw()
 
     [draw_bg, draw_fg][layer]()
@@ -56,7 +56,6 @@ def get_singleton(name: str = "default"):
 
 
 def reset() -> None:
-    res.clear_caches()
     ctx = get_singleton()
     ctx.state = 0
     for x in ctx.entities:
@@ -192,11 +191,13 @@ def update(dt: float) -> str:  # noqa: PLR0915
 def draw() -> None:
     ctx = get_singleton()
 
-    pr.begin_mode_2d(ctx.camera.camera)
+    world.prepare(ctx.camera.camera)
+
+    prx.begin_mode_2d(ctx.camera.camera)
     for layer in range(2):
         for entity in ctx.entities:
             entity.draw(layer)
-    pr.end_mode_2d()
+    prx.end_mode_2d()
 
     for floating in ctx.floatings:
         floating.draw()
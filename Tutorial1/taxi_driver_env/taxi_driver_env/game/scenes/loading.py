@@ -1,15 +1,23 @@
-from concurrent.futures import Future, ThreadPoolExecutor
+import multiprocessing
+import random
 from dataclasses import dataclass
 from functools import lru_cache
+from multiprocessing.connection import Connection
+from multiprocessing.process import BaseProcess
+from typing import Optional
 
 import pyray as pr
+import taxi_driver_env.resources as res
 from taxi_driver_env.constants import WINDOW_HEIGHT
 from taxi_driver_env.game.entities import world
 
+WORLD_WEIGHT = 0.9
+
 
 @dataclass
 class Context:
-    executor = ThreadPoolExecutor(max_workers=1)
+    process: Optional[BaseProcess] = None
+    conn: Optional[Connection] = None
     progress = 0.0
     done = False
 
@@ -19,25 +27,65 @@ def get_singleton(name: str = "default") -> Context:
     return Context()
 
 
-def reset() -> None:
+def prefetch() -> None:
+    """Starts generating the world in a separate process, unless it is already generated or being generated."""
     ctx = get_singleton()
+    if ctx.process is not None or ctx.done:
+        return
 
-    def progress_callback(progress: float) -> None:
-        ctx.progress = progress
-
-    def done_callback(_: Future) -> None:
+    if world.has_singleton():
+        ctx.progress = 1.0
         ctx.done = True
+        return
+
+    mp = multiprocessing.get_context("spawn")
+    ctx.conn, child_conn = mp.Pipe(duplex=False)
+    ctx.process = mp.Process(target=world.generate_in_process, args=(child_conn, random.getstate()), daemon=True)
+    ctx.process.start()
+    child_conn.close()
+
+
+def poll() -> None:
+    """Reads the progress streamed by the generation process, and installs the world once it is received."""
+    ctx = get_singleton()
+    if ctx.conn is None or ctx.process is None:
+        return
 
-    world.add_progress_callback(progress_callback)
-    ctx.executor.submit(world.get_singleton).add_done_callback(done_callback)
+    while ctx.conn.poll():
+        try:
+            kind, value = ctx.conn.recv()
+        except EOFError:
+            raise RuntimeError(f"World generation failed with exit code {ctx.process.exitcode}") from None
+
+        if kind == "progress":
+            ctx.progress = value
+        else:
+            arrays, random_state = value
+            world.set_singleton(world.World.from_arrays(arrays))
+            random.setstate(random_state)
+            ctx.process.join()
+            ctx.conn.close()
+            ctx.process, ctx.conn = None, None
+            ctx.progress = 1.0
+            ctx.done = True
+            break
+
+
+def get_progress() -> float:
+    return get_singleton().progress * WORLD_WEIGHT + res.get_progress() * (1 - WORLD_WEIGHT)
+
+
+def reset() -> None:
+    prefetch()
 
 
 def update(_: float) -> str:
     ctx = get_singleton()
-    return "gameplay" if ctx.done else "loading"
+    poll()
+    return "gameplay" if ctx.done and res.get_progress() >= 1 else "loading"
 
 
 def draw() -> None:
     pr.clear_background(pr.WHITE)  # type: ignore
     pr.draw_rectangle_lines(100, WINDOW_HEIGHT // 2, (WINDOW_HEIGHT - 200) + 4, 14, pr.BLACK)  # type: ignore
-    pr.draw_rectangle(102, WINDOW_HEIGHT // 2 + 2, int(get_singleton().progress * (WINDOW_HEIGHT - 200)), 10, pr.BLACK)  # type: ignore
+    pr.draw_rectangle(102, WINDOW_HEIGHT // 2 + 2, int(get_progress() * (WINDOW_HEIGHT - 200)), 10, pr.BLACK)  # type: ignore
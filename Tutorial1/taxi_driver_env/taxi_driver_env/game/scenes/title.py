@@ -3,6 +3,7 @@ from functools import lru_cache
 
 import pyray as pr
 import taxi_driver_env.resources as res
+from taxi_driver_env.game.scenes import loading
 from taxi_driver_env.render.effects.fade_inout import FadeInOut
 from taxi_driver_env.render.widgets.screen import Screen
 
@@ -23,7 +24,8 @@ def get_singleton(name: str = "default") -> Context:
 
 
 def reset() -> None:
-    res.clear_caches()
+    res.preload()
+    loading.prefetch()
     ctx = get_singleton()
     ctx.state = 0
     ctx.timer = 0.0
@@ -33,6 +35,7 @@ def reset() -> None:
 
 def update(dt: float) -> str:
     ctx = get_singleton()
+    loading.poll()
     match ctx.state:
         case 0:
             ctx.timer += dt
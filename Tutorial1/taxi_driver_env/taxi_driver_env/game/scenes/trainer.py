@@ -7,6 +7,7 @@ from functools import lru_cache
 from typing import Optional
 
 import numpy as np
+import numpy.typing as npt
 import pyray as pr
 import taxi_driver_env.render.pyrayex as prx
 from taxi_driver_env.game.cameras.camera_follower import CameraFollower
@@ -18,6 +19,7 @@ from taxi_driver_env.math import envelope
 from taxi_driver_env.math.geom import Point, distance
 from taxi_driver_env.math.linalg import lst_2_vec
 from taxi_driver_env.physic.types import Entity
+from taxi_driver_env.utils import profiler
 from taxi_driver_env.utils.bitbang import is_bit_set
 
 CAR_BEST_COLOR = pr.Color(255, 255, 255, 255)
@@ -34,11 +36,15 @@ class Context:
     entities: list[Entity]
     camera: Optional[CameraFollower | CameraFree] = None
     corridor: Optional[envelope.Envelope] = None
+    corridor_id: int = -1
     best_agent: Optional[car.Car] = None
     last_spawn_location: Optional[envelope.Location] = None
     spawn_location_changed: bool = False
     timestep: int = 0
     lap: int = 0
+    integrator: str = "semi_implicit_euler"
+    substeps: int = 1
+    follow_vin: Optional[int] = None
 
     def get_previous_pos(self) -> Point:
         return self.best_agent.prev_pos if self.best_agent is not None else Point(np.zeros(2))
@@ -53,19 +59,65 @@ class Context:
         pass
 
 
+@dataclass(slots=True)
+class Snapshot:
+    agents: list[car.Car]
+    agent_states: list[car.CarState]
+    entities: list[Entity]
+    explosion_lives: list[int]
+    camera: Optional[CameraFollower | CameraFree]
+    camera_car: Optional[car.Car]
+    camera_view: tuple[float, float, float]
+    corridor: Optional[envelope.Envelope]
+    corridor_id: int
+    best_agent: Optional[car.Car]
+    last_spawn_location: Optional[envelope.Location]
+    spawn_location_changed: bool
+    timestep: int
+    lap: int
+    random_state: tuple
+    np_random_state: dict
+
+
 @lru_cache(1)
 def get_singleton(name: str = "default"):
     return Context([], [])
 
 
-def reset_corridor():
+def reset_corridor(corridor_id: Optional[int] = None):
+    """Builds the corridor starting from the road vertex `corridor_id`, a random one if it is not given."""
     ctx = get_singleton()
     roads = world.get_singleton().roads
-    start = random.choice(roads.vertice)
+    if corridor_id is None:
+        corridor_id = random.randrange(len(roads.vertice))
+    start = roads.vertice[corridor_id]
     stop = max(roads.vertice, key=lambda x: distance(start.point, x.point))
     ctx.corridor, _ = envelope.generare_borders_from_spatial_graph(
         roads.get_shortest_path(start, stop), world.ROAD_WIDTH, []
     )
+    ctx.corridor_id = corridor_id
+
+
+def get_corridor_id() -> int:
+    return get_singleton().corridor_id
+
+
+def get_spawn_index() -> tuple[int, Optional[npt.NDArray[np.float64]]]:
+    """The spawn location of the next reset as an index in the corridor skeleton and a point, (-1, None) if unset."""
+    ctx = get_singleton()
+    if ctx.corridor is None or ctx.last_spawn_location is None:
+        return -1, None
+    segment, point = ctx.last_spawn_location
+    return next(i for i, x in enumerate(ctx.corridor.skeleton) if x is segment), point.xy
+
+
+def set_spawn_index(index: int, point: Optional[npt.ArrayLike]) -> None:
+    ctx = get_singleton()
+    assert ctx.corridor is not None
+    if index < 0 or point is None:
+        ctx.last_spawn_location = None
+    else:
+        ctx.last_spawn_location = (ctx.corridor.skeleton[index], Point(np.array(point, dtype=np.float64)))
 
 
 def get_agents() -> list[car.Car]:
@@ -78,7 +130,17 @@ def spawn_agents(agent_count: int) -> None:
     if ctx.corridor is None:
         reset_corridor()
 
-    ctx.agents = [car.Car(CAR_COLOR, input_mode="ai", vin=i, corridor=ctx.corridor) for i in range(agent_count)]
+    ctx.agents = [
+        car.Car(
+            CAR_COLOR,
+            input_mode="ai",
+            vin=i,
+            corridor=ctx.corridor,
+            integrator=ctx.integrator,
+            substeps=ctx.substeps,
+        )
+        for i in range(agent_count)
+    ]
 
 
 def reset_agents() -> None:
@@ -88,6 +150,71 @@ def reset_agents() -> None:
             agent.set_spawn_location(ctx.last_spawn_location)
 
 
+def clone_state() -> Snapshot:
+    """Copies the state of the simulation, the entities which are not modified in place are shared."""
+    ctx = get_singleton()
+    camera_view = (0.0, 0.0, 0.0)
+    if ctx.camera is not None:
+        camera_view = (ctx.camera.camera.target.x, ctx.camera.camera.target.y, ctx.camera.camera.zoom)
+    return Snapshot(
+        ctx.agents.copy(),
+        [x.get_state() for x in ctx.agents],
+        ctx.entities.copy(),
+        [x.life for x in ctx.entities if isinstance(x, Explosion)],
+        ctx.camera,
+        ctx.camera.car if isinstance(ctx.camera, CameraFollower) else None,
+        camera_view,
+        ctx.corridor,
+        ctx.corridor_id,
+        ctx.best_agent,
+        ctx.last_spawn_location,
+        ctx.spawn_location_changed,
+        ctx.timestep,
+        ctx.lap,
+        random.getstate(),
+        np.random.get_state(legacy=False),
+    )
+
+
+def restore_state(snapshot: Snapshot) -> None:
+    ctx = get_singleton()
+
+    ctx.agents = snapshot.agents.copy()
+    for agent, state in zip(ctx.agents, snapshot.agent_states, strict=True):
+        agent.set_state(state)
+
+    ctx.entities = snapshot.entities.copy()
+    explosions = (x for x in ctx.entities if isinstance(x, Explosion))
+    for explosion, life in zip(explosions, snapshot.explosion_lives, strict=True):
+        explosion.life = life
+
+    ctx.camera = snapshot.camera
+    if ctx.camera is not None:
+        x, y, zoom = snapshot.camera_view
+        ctx.camera.camera.target = pr.Vector2(x, y)
+        ctx.camera.camera.zoom = zoom
+    if isinstance(ctx.camera, CameraFollower) and snapshot.camera_car is not None:
+        ctx.camera.set_target(snapshot.camera_car)
+
+    ctx.corridor = snapshot.corridor
+    ctx.corridor_id = snapshot.corridor_id
+    ctx.best_agent = snapshot.best_agent
+    ctx.last_spawn_location = snapshot.last_spawn_location
+    ctx.spawn_location_changed = snapshot.spawn_location_changed
+    ctx.timestep = snapshot.timestep
+    ctx.lap = snapshot.lap
+    random.setstate(snapshot.random_state)
+    np.random.set_state(snapshot.np_random_state)
+
+
+def respawn_agent(agent: car.Car) -> None:
+    """Resets a dead agent at its spawn location, without ending the episode of the others."""
+    ctx = get_singleton()
+    agent.reset()
+    if agent not in ctx.entities:
+        ctx.entities.append(agent)
+
+
 def get_best_agent():
     context = get_singleton()
     return context.best_agent
@@ -166,29 +293,54 @@ def update(dt: float) -> str:
                 ctx.camera = CameraFollower(acar)
                 ctx.camera.reset()
 
-    for entity in ctx.entities:
-        entity.update(dt)
-    ctx.entities = [entity for entity in ctx.entities if entity.is_alive()]
+    with profiler.timer("trainer.entities"):
+        car.update_batch([x for x in ctx.entities if isinstance(x, car.Car)], dt)
+        for entity in ctx.entities:
+            if not isinstance(entity, car.Car):
+                entity.update(dt)
+        ctx.entities = [entity for entity in ctx.entities if entity.is_alive()]
 
-    for agent in ctx.agents:
-        if agent.is_alive() and not is_agent_alive(agent):
+    with profiler.timer("trainer.liveness"):
+        dead_agents = [x for x in ctx.agents if x.is_alive() and not is_agent_alive(x)]
+
+    with profiler.timer("trainer.explosions"):
+        for agent in dead_agents:
             agent.hit(car.MAX_LIFE)
             ctx.entities.append(Explosion(Point(agent.pos)))
 
-    ctx.best_agent = max((x for x in ctx.agents if x.is_alive()), key=get_agent_score, default=None)
-    if ctx.best_agent is not None:
-        last_spawn_location = ctx.best_agent.get_spawn_location()
-        ctx.spawn_location_changed = ctx.last_spawn_location != last_spawn_location
-        ctx.last_spawn_location = last_spawn_location
-        if isinstance(ctx.camera, CameraFollower):
-            ctx.camera.set_target(ctx.best_agent)
+    with profiler.timer("trainer.best_agent"):
+        ctx.best_agent = max((x for x in ctx.agents if x.is_alive()), key=get_agent_score, default=None)
+        if ctx.best_agent is not None:
+            last_spawn_location = ctx.best_agent.get_spawn_location()
+            ctx.spawn_location_changed = ctx.last_spawn_location != last_spawn_location
+            ctx.last_spawn_location = last_spawn_location
+            if isinstance(ctx.camera, CameraFollower):
+                ctx.camera.set_target(_get_followed_agent())
 
-    ctx.camera.update(dt)
+    with profiler.timer("trainer.camera"):
+        ctx.camera.update(dt)
 
     return "trainer"
 
 
-def draw() -> None:
+def _get_followed_agent() -> car.Car:
+    ctx = get_singleton()
+    assert ctx.best_agent is not None
+    if ctx.follow_vin is None:
+        return ctx.best_agent
+    return ctx.agents[ctx.follow_vin]
+
+
+def prepare(complete: bool = False) -> None:
+    """Renders the offscreen layers, must be called outside of any 2D or texture mode."""
+    ctx = get_singleton()
+    assert ctx.camera is not None
+
+    world.prepare(ctx.camera.camera, complete)
+
+
+def draw(prepared: bool = False) -> None:
+    """Draws the simulation, prepared tells if `prepare` was called already for this frame."""
     ctx = get_singleton()
     assert ctx.corridor is not None
     assert ctx.camera is not None
@@ -196,7 +348,10 @@ def draw() -> None:
     for agent in ctx.agents:
         agent.set_debug_mode(agent is ctx.best_agent)
 
-    pr.begin_mode_2d(ctx.camera.camera)
+    if not prepared:
+        prepare()
+
+    prx.begin_mode_2d(ctx.camera.camera)
 
     for entity in ctx.entities:
         entity.draw(0)
@@ -207,10 +362,14 @@ def draw() -> None:
     if ctx.last_spawn_location is not None:
         ctx.last_spawn_location[1].draw(1, CORRIDOR_COLOR)  # type: ignore
 
+    cars = [x for x in ctx.entities if isinstance(x, car.Car)]
     for entity in ctx.entities:
-        entity.draw(1)
+        if not isinstance(entity, car.Car):
+            entity.draw(1)
+        elif entity is cars[0]:
+            car.draw_batch(cars)
 
-    pr.end_mode_2d()
+    prx.end_mode_2d()
 
     match ctx.best_agent:
         case None:
@@ -3,6 +3,7 @@ import taxi_driver_env.render.pyrayex as prx
 import taxi_driver_env.resources as res
 from taxi_driver_env.constants import WINDOW_HEIGHT, WINDOW_WIDTH
 from taxi_driver_env.game.entities.taxi_driver import TaxiDriver
+from taxi_driver_env.render import atlas
 
 BORDER = 0.01 * WINDOW_WIDTH
 BOUND_WIDTH = 0.128 * WINDOW_WIDTH
@@ -32,10 +33,10 @@ class Meter:
         pass
 
     def draw(self) -> None:
-        tex = res.load_texture("spritesheet")
+        sprites = atlas.get_atlas()
         pr.draw_texture_pro(
-            tex,
-            pr.Rectangle(640, 256, 128, 88),
+            sprites.texture,
+            sprites.get_region("meter"),
             self.get_bound(),
             pr.Vector2(0, 0),
             0,
@@ -1,9 +1,12 @@
+from typing import Optional
+
 import pyray as pr
-import taxi_driver_env.resources as res
+import taxi_driver_env.render.pyrayex as prx
 from taxi_driver_env.constants import WINDOW_HEIGHT, WINDOW_WIDTH
 from taxi_driver_env.game.cameras.camera_zoomer import CameraZoomer
 from taxi_driver_env.game.entities import world
 from taxi_driver_env.game.entities.taxi_driver import TaxiDriver
+from taxi_driver_env.render import atlas
 
 BORDER = 0.01 * WINDOW_WIDTH
 BOUND_WIDTH = 0.128 * WINDOW_WIDTH
@@ -11,11 +14,17 @@ BOUND_HEIGHT = 0.256 * WINDOW_HEIGHT
 MAP_WIDTH = 0.109 * WINDOW_WIDTH
 MAP_HEIGHT = 0.199 * WINDOW_HEIGHT
 MAP_RATIO = MAP_WIDTH / MAP_HEIGHT
+LAYER_SIZE = 2048  # px
+LAYER_MARGIN = 10  # m
 
 
 class Minimap:
     def __init__(self, player: TaxiDriver) -> None:
         self.player = player
+        self.frame_buffer: Optional[pr.RenderTexture] = None
+        self.layer: Optional[pr.RenderTexture] = None
+        self.layer_bound = pr.Rectangle(0, 0, 0, 0)
+        self.layer_key: tuple[int, int] = (0, 0)
 
     def get_bound(self) -> pr.Rectangle:
         return pr.Rectangle(
@@ -34,13 +43,13 @@ class Minimap:
         )
 
     def get_corridor_bound(self) -> pr.Rectangle:
-        x1 = int(min((p.xy[0] for p in self.player.car.corridor.points)))
-        y1 = int(min((p.xy[1] for p in self.player.car.corridor.points)))
-        x2 = int(max((p.xy[0] for p in self.player.car.corridor.points)))
-        y2 = int(max((p.xy[1] for p in self.player.car.corridor.points)))
+        x, y, w, h = self.player.car.corridor.bound
+        x1, y1, x2, y2 = int(x), int(y), int(x + w), int(y + h)
         return pr.Rectangle(x1, y1, x2 - x1, y2 - y1)
 
     def reset(self) -> None:
+        if self.frame_buffer is not None:
+            pr.unload_render_texture(self.frame_buffer)
         self.frame_buffer = pr.load_render_texture(int(WINDOW_WIDTH * MAP_RATIO), WINDOW_HEIGHT)
         self.camera = CameraZoomer(
             self.get_map_bound().width,
@@ -53,20 +62,63 @@ class Minimap:
         self.camera.set_bound(self.get_corridor_bound())
         self.camera.update(dt)
 
-    def draw(self) -> None:
-        pr.begin_texture_mode(self.frame_buffer)
+    def bake(self) -> None:
+        """Renders the world and the corridor once into a texture in world space, reused until either changes."""
+        the_world = world.get_singleton()
+        corridor = self.player.car.corridor
+        key = (id(the_world), id(corridor))
+        if self.layer is not None and self.layer_key == key:
+            return
+
+        x, y, w, h = the_world.borders.bound
+        size = max(w, h) + LAYER_MARGIN * 2
+        self.layer_bound = pr.Rectangle(x - LAYER_MARGIN, y - LAYER_MARGIN, size, size)
+        self.layer_key = key
+
+        if self.layer is None:
+            self.layer = pr.load_render_texture(LAYER_SIZE, LAYER_SIZE)
+            pr.set_texture_filter(self.layer.texture, pr.TextureFilter.TEXTURE_FILTER_BILINEAR)
+
+        pr.begin_texture_mode(self.layer)
         pr.clear_background(pr.WHITE)
-        pr.begin_mode_2d(self.camera.camera)
+        prx.begin_mode_2d(
+            pr.Camera2D(pr.Vector2(0, 0), pr.Vector2(self.layer_bound.x, self.layer_bound.y), 0, LAYER_SIZE / size),
+            LAYER_SIZE,
+            LAYER_SIZE,
+        )
 
-        for bone in world.get_singleton().borders.skeleton:
+        for bone in the_world.borders.skeleton:
             bone.draw(5, pr.GRAY)
 
-        for bone in self.player.car.corridor.skeleton:
+        for bone in corridor.skeleton:
             bone.draw(10, pr.BLUE)
 
+        prx.end_mode_2d()
+        pr.end_texture_mode()
+
+    def draw(self) -> None:
+        assert self.frame_buffer is not None
+
+        self.bake()
+        assert self.layer is not None
+
+        pr.begin_texture_mode(self.frame_buffer)
+        pr.clear_background(pr.WHITE)
+        prx.begin_mode_2d(self.camera.camera, self.frame_buffer.texture.width, self.frame_buffer.texture.height)
+
+        tex = self.layer.texture
+        pr.draw_texture_pro(
+            tex,
+            pr.Rectangle(0, 0, tex.width, -tex.height),
+            self.layer_bound,
+            pr.Vector2(0, 0),
+            0,
+            pr.WHITE,
+        )
+
         self.player.car.curr_pos.draw(15, pr.YELLOW)
 
-        pr.end_mode_2d()
+        prx.end_mode_2d()
         pr.end_texture_mode()
 
         tex = self.frame_buffer.texture
@@ -79,10 +131,10 @@ class Minimap:
             pr.WHITE,
         )
 
-        tex = res.load_texture("spritesheet")
+        sprites = atlas.get_atlas()
         pr.draw_texture_pro(
-            tex,
-            pr.Rectangle(512, 256, 128, 256),
+            sprites.texture,
+            sprites.get_region("minimap"),
             self.get_bound(),
             pr.Vector2(0, 0),
             0,
@@ -1,14 +1,15 @@
 import random
 from dataclasses import dataclass
-from functools import lru_cache, reduce
+from functools import cached_property, lru_cache, reduce
 from typing import Any, Callable, Iterable
 
 import numpy as np
-from taxi_driver_env.constants import VIRTUAL_WIDTH
+from taxi_driver_env.constants import VIRTUAL_CELL, VIRTUAL_WIDTH
 from taxi_driver_env.math import graph
 from taxi_driver_env.math.geom import (
     Point,
     Segment,
+    SegmentArray,
     break_segment,
     distance,
     distance_point_segment,
@@ -33,6 +34,17 @@ class Envelope:
     def points(self) -> list[Point]:
         return [s.start for s in self.segments]
 
+    @cached_property
+    def segment_array(self) -> SegmentArray:
+        return SegmentArray.from_segments(self.segments)
+
+    @cached_property
+    def bound(self) -> tuple[float, float, float, float]:
+        """The axis aligned bounding box of the envelope as (x, y, width, height)."""
+        xy = self.segment_array.xy.reshape(-1, 2)
+        (x1, y1), (x2, y2) = xy.min(axis=0), xy.max(axis=0)
+        return float(x1), float(y1), float(x2 - x1), float(y2 - y1)
+
     def __eq__(self, other: Any) -> bool:
         if not isinstance(other, Envelope):
             return NotImplemented
@@ -53,16 +65,30 @@ class Envelope:
         return s, Point(s.start.xy * (1 - t) + s.end.xy * t)
 
 
-@lru_cache(256)
 def get_nearest_segments(envelope: Envelope, position: Point, radius: int) -> list[Segment]:
+    """The segments around a position, nearest first.
+
+    The candidates are cached per virtual cell of the position, so the cache does not depend on the lookups made
+    before. They are then filtered and sorted by their distance to the position itself.
+    """
     radius = max(radius, VIRTUAL_WIDTH)
+    cx, cy = position.xy // VIRTUAL_CELL
     nearest_distance = lambda x: distance_point_segment(position, x, True)
     return sorted(
-        (x for x in envelope.segments if nearest_distance(x) < radius),
+        (x for x in _get_cell_segments(envelope, int(cx), int(cy), radius) if nearest_distance(x) < radius),
         key=nearest_distance,
     )
 
 
+@lru_cache(1024)
+def _get_cell_segments(envelope: Envelope, cx: int, cy: int, radius: int) -> list[Segment]:
+    # The segments within the radius of any position in the cell, in the order of the envelope
+
+    center = Point((np.array([cx, cy], dtype=np.float64) + 0.5) * VIRTUAL_CELL)
+    radius += VIRTUAL_CELL
+    return [x for x in envelope.segments if distance_point_segment(center, x, True) < radius]
+
+
 def generare_borders_from_spatial_graph(
     agraph: graph.SpatialGraph, width: int, progress_callbacks: list[ProgressCallBack]
 ) -> tuple[Envelope, list[Point]]:
@@ -166,6 +192,7 @@ def _break_envelopes(envelopes: list[Envelope]) -> list[Envelope]:
 
 def _union_envelopes(envelopes: list[Envelope]) -> Envelope:
     segments_to_keep: list[Segment] = []
+    kept = np.empty((sum(len(e.segments) for e in envelopes), 2, 2))
     skeleton = [e.skeleton[0] for e in envelopes]
     width = envelopes[0].width
 
@@ -184,7 +211,9 @@ def _union_envelopes(envelopes: list[Envelope]) -> Envelope:
                     filter(lambda x: x != e, envelopes),
                 )
             )
-            if not (inside or s.start.almost(s.end) or any((x.almost(s) for x in segments_to_keep))):
+            n = len(segments_to_keep)
+            if not (inside or s.start.almost(s.end) or SegmentArray(kept[:n]).almost(s).any()):
+                kept[n] = (s.start.xy, s.end.xy)
                 segments_to_keep.append(s)
 
     return Envelope(segments_to_keep, skeleton, width)
@@ -1,7 +1,7 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
-from typing import Any, Iterable, Optional
+from typing import Any, Iterable, Iterator, Optional, overload
 
 import numpy as np
 import numpy.typing as npt
@@ -13,7 +13,7 @@ from taxi_driver_env.constants import VIRTUAL_CELL, VIRTUAL_WIDTH
 VIRTUAL_SIZE = VIRTUAL_WIDTH // VIRTUAL_CELL
 
 
-@dataclass
+@dataclass(slots=True)
 class Point:
     xy: npt.NDArray[np.float64]
 
@@ -36,7 +36,7 @@ class Point:
         return int(y * VIRTUAL_SIZE + x)
 
 
-@dataclass
+@dataclass(slots=True)
 class Segment:
     start: Point
     end: Point
@@ -89,6 +89,105 @@ class Segment:
         )
 
 
+class PointArray:
+    """A compact collection of points stored in a single (n, 2) array.
+
+    Indexing with an integer returns a `Point` viewing the underlying row, so no data is copied.
+    """
+
+    __slots__ = ("xy",)
+
+    def __init__(self, xy: npt.NDArray[np.float64]) -> None:
+        self.xy = np.asarray(xy, dtype=np.float64).reshape(-1, 2)
+
+    @staticmethod
+    def from_points(points: Iterable[Point]) -> PointArray:
+        return PointArray(np.array([p.xy for p in points], dtype=np.float64))
+
+    def to_points(self) -> list[Point]:
+        return [Point(xy) for xy in self.xy]
+
+    def distance(self, other: Point | PointArray) -> npt.NDArray[np.float64]:
+        return np.sqrt(np.sum((other.xy - self.xy) ** 2, axis=-1))
+
+    def almost(self, other: Point | PointArray, eps=0.0001) -> npt.NDArray[np.bool_]:
+        return np.all(np.abs(other.xy - self.xy) <= eps, axis=-1)
+
+    def __len__(self) -> int:
+        return len(self.xy)
+
+    def __iter__(self) -> Iterator[Point]:
+        return (Point(xy) for xy in self.xy)
+
+    @overload
+    def __getitem__(self, idx: int) -> Point: ...
+
+    @overload
+    def __getitem__(self, idx: slice | npt.NDArray[Any]) -> PointArray: ...
+
+    def __getitem__(self, idx):
+        if isinstance(idx, (int, np.integer)):
+            return Point(self.xy[idx])
+        return PointArray(self.xy[idx])
+
+
+class SegmentArray:
+    """A compact collection of segments stored in a single (n, 2, 2) array.
+
+    Indexing with an integer returns a `Segment` whose end points view the underlying rows.
+    """
+
+    __slots__ = ("xy",)
+
+    def __init__(self, xy: npt.NDArray[np.float64]) -> None:
+        self.xy = np.asarray(xy, dtype=np.float64).reshape(-1, 2, 2)
+
+    @staticmethod
+    def from_segments(segments: Iterable[Segment]) -> SegmentArray:
+        return SegmentArray(np.array([(s.start.xy, s.end.xy) for s in segments], dtype=np.float64))
+
+    def to_segments(self) -> list[Segment]:
+        return [Segment(Point(xy[0]), Point(xy[1])) for xy in self.xy]
+
+    @property
+    def start(self) -> PointArray:
+        return PointArray(self.xy[:, 0])
+
+    @property
+    def end(self) -> PointArray:
+        return PointArray(self.xy[:, 1])
+
+    @property
+    def length(self) -> npt.NDArray[np.float64]:
+        return self.start.distance(self.end)
+
+    @property
+    def middle(self) -> PointArray:
+        return PointArray((self.xy[:, 0] + self.xy[:, 1]) * 0.5)
+
+    def almost(self, other: Segment | SegmentArray, eps=0.0001) -> npt.NDArray[np.bool_]:
+        same = self.start.almost(other.start, eps) & self.end.almost(other.end, eps)
+        flipped = self.end.almost(other.start, eps) & self.start.almost(other.end, eps)
+        return same | flipped
+
+    def __len__(self) -> int:
+        return len(self.xy)
+
+    def __iter__(self) -> Iterator[Segment]:
+        return (Segment(Point(xy[0]), Point(xy[1])) for xy in self.xy)
+
+    @overload
+    def __getitem__(self, idx: int) -> Segment: ...
+
+    @overload
+    def __getitem__(self, idx: slice | npt.NDArray[Any]) -> SegmentArray: ...
+
+    def __getitem__(self, idx):
+        if isinstance(idx, (int, np.integer)):
+            return Segment(Point(self.xy[idx, 0]), Point(self.xy[idx, 1]))
+        return SegmentArray(self.xy[idx])
+
+
 def distance(p1: Point, p2: Point) -> float:
     return la.norm(p2.xy - p1.xy)
 
@@ -0,0 +1,57 @@
+from __future__ import annotations
+
+import math
+
+import numpy as np
+import numpy.typing as npt
+
+CELL_SIZE = 50  # m
+
+
+class UniformGrid:
+    """A static spatial index bucketing axis aligned boxes, stored as rows (x1, y1, x2, y2), into uniform cells.
+
+    Queries return the indices of the boxes overlapping a rectangle in ascending order, so drawing them keeps the
+    original order.
+    """
+
+    __slots__ = ("boxes", "cell_size", "cells")
+
+    def __init__(self, boxes: npt.NDArray[np.float64], cell_size: float = CELL_SIZE) -> None:
+        self.boxes = np.asarray(boxes, dtype=np.float64).reshape(-1, 4)
+        self.cell_size = cell_size
+
+        cells: dict[tuple[int, int], list[int]] = {}
+        for i, (x1, y1, x2, y2) in enumerate(np.floor(self.boxes / cell_size).astype(np.int64)):
+            for cy in range(y1, y2 + 1):
+                for cx in range(x1, x2 + 1):
+                    cells.setdefault((cx, cy), []).append(i)
+        self.cells = {key: np.array(value, dtype=np.int64) for key, value in cells.items()}
+
+    @staticmethod
+    def from_segments(
+        segments: npt.NDArray[np.float64], margin: float = 0, cell_size: float = CELL_SIZE
+    ) -> UniformGrid:
+        """Indexes segments given as a (n, 2, 2) array, their boxes grown by a margin such as half a line thickness."""
+        segments = np.asarray(segments, dtype=np.float64).reshape(-1, 2, 2)
+        boxes = np.hstack([segments.min(axis=1) - margin, segments.max(axis=1) + margin])
+        return UniformGrid(boxes, cell_size)
+
+    def __len__(self) -> int:
+        return len(self.boxes)
+
+    def query(self, x1: float, y1: float, x2: float, y2: float) -> npt.NDArray[np.int64]:
+        c = self.cell_size
+        candidates = [
+            indices
+            for cy in range(math.floor(y1 / c), math.floor(y2 / c) + 1)
+            for cx in range(math.floor(x1 / c), math.floor(x2 / c) + 1)
+            if (indices := self.cells.get((cx, cy))) is not None
+        ]
+        if len(candidates) == 0:
+            return np.empty(0, dtype=np.int64)
+
+        indices = np.unique(np.concatenate(candidates))
+        boxes = self.boxes[indices]
+        mask = (boxes[:, 0] <= x2) & (boxes[:, 2] >= x1) & (boxes[:, 1] <= y2) & (boxes[:, 3] >= y1)
+        return indices[mask]
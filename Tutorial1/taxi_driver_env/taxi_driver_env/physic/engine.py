@@ -1,6 +1,13 @@
+from typing import Callable
+
 import numpy as np
 from taxi_driver_env.physic.types import Integrable
 
+# Acceleration as a function of position and velocity, both of shape (n, 2)
+
+Acceleration = Callable[[np.ndarray, np.ndarray], np.ndarray]
+Integrator = Callable[[np.ndarray, np.ndarray, Acceleration, float], tuple[np.ndarray, np.ndarray]]
+
 
 def euler_integrate(object: Integrable, forces: np.ndarray, dt: float):
     # Second Newton law
@@ -11,3 +18,50 @@ def euler_integrate(object: Integrable, forces: np.ndarray, dt: float):
 
     object.vel += acc * dt
     object.pos += object.vel * dt
+
+
+def explicit_euler(pos: np.ndarray, vel: np.ndarray, acc: Acceleration, dt: float) -> tuple[np.ndarray, np.ndarray]:
+    return pos + vel * dt, vel + acc(pos, vel) * dt
+
+
+def semi_implicit_euler(
+    pos: np.ndarray, vel: np.ndarray, acc: Acceleration, dt: float
+) -> tuple[np.ndarray, np.ndarray]:
+    vel = vel + acc(pos, vel) * dt
+    return pos + vel * dt, vel
+
+
+def rk4(pos: np.ndarray, vel: np.ndarray, acc: Acceleration, dt: float) -> tuple[np.ndarray, np.ndarray]:
+    k1_x, k1_v = vel, acc(pos, vel)
+    k2_x, k2_v = vel + k1_v * dt * 0.5, acc(pos + k1_x * dt * 0.5, vel + k1_v * dt * 0.5)
+    k3_x, k3_v = vel + k2_v * dt * 0.5, acc(pos + k2_x * dt * 0.5, vel + k2_v * dt * 0.5)
+    k4_x, k4_v = vel + k3_v * dt, acc(pos + k3_x * dt, vel + k3_v * dt)
+    return (
+        pos + (k1_x + 2 * k2_x + 2 * k3_x + k4_x) * dt / 6,
+        vel + (k1_v + 2 * k2_v + 2 * k3_v + k4_v) * dt / 6,
+    )
+
+
+INTEGRATORS: dict[str, Integrator] = {
+    "euler": explicit_euler,
+    "semi_implicit_euler": semi_implicit_euler,
+    "rk4": rk4,
+}
+
+
+def integrate(
+    pos: np.ndarray,
+    vel: np.ndarray,
+    acc: Acceleration,
+    dt: float,
+    method: str = "semi_implicit_euler",
+    substeps: int = 1,
+) -> tuple[np.ndarray, np.ndarray]:
+    assert method in INTEGRATORS
+    assert substeps > 0
+
+    integrator = INTEGRATORS[method]
+    h = dt / substeps
+    for _ in range(substeps):
+        pos, vel = integrator(pos, vel, acc, h)
+    return pos, vel
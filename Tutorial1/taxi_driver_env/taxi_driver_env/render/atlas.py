@@ -0,0 +1,50 @@
+from functools import cache
+
+import numpy as np
+import numpy.typing as npt
+import pyray as pr
+import taxi_driver_env.resources as res
+
+Region = tuple[int, int, int, int]  # x, y, width, height in pixels
+
+SPRITESHEET_REGIONS: dict[str, Region] = {
+    "car": (0, 0, 128, 128),
+    "marker": (768, 256, 20, 16),
+    "minimap": (512, 256, 128, 256),
+    "meter": (640, 256, 128, 88),
+}
+
+
+class Atlas:
+    """Named regions of a texture, with their texture coordinates ready to be batched."""
+
+    def __init__(self, texture_name: str, regions: dict[str, Region]) -> None:
+        self.texture_name = texture_name
+        self.regions = dict(regions)
+        self.texcoords: dict[str, npt.NDArray[np.float32]] = {}
+
+    @property
+    def texture(self) -> pr.Texture:
+        return res.load_texture(self.texture_name)
+
+    def add_regions(self, regions: dict[str, Region]) -> None:
+        self.regions.update(regions)
+
+    def get_region(self, name: str) -> pr.Rectangle:
+        return pr.Rectangle(*self.regions[name])
+
+    def get_texcoords(self, name: str) -> npt.NDArray[np.float32]:
+        """Returns the normalized region corners ordered top-left, bottom-left, bottom-right, top-right."""
+        texcoords = self.texcoords.get(name)
+        if texcoords is None:
+            tex = self.texture
+            x, y, w, h = self.regions[name]
+            u1, v1, u2, v2 = x / tex.width, y / tex.height, (x + w) / tex.width, (y + h) / tex.height
+            texcoords = self.texcoords[name] = np.array([[u1, v1], [u1, v2], [u2, v2], [u2, v1]], dtype=np.float32)
+        return texcoords
+
+
+@cache
+def get_atlas(texture_name: str = "spritesheet") -> Atlas:
+    assert texture_name == "spritesheet"
+    return Atlas(texture_name, SPRITESHEET_REGIONS)
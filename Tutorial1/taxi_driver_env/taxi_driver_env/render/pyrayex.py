@@ -1,17 +1,99 @@
-from typing import Optional
+import ctypes
+import os
+import sys
+from typing import Callable, Optional
 
+import numpy as np
 import pyray as pr
 from taxi_driver_env.constants import WINDOW_HEIGHT, WINDOW_WIDTH
 
 SCREEN = pr.Rectangle(0, 0, WINDOW_WIDTH, WINDOW_HEIGHT)
 DEFAULT_FONT_HEIGHT = 10
 
+GL_PACK_ALIGNMENT = 0x0D05
+GL_RGB = 0x1907
+GL_UNSIGNED_BYTE = 0x1401
+
+_view: list[pr.Rectangle] = [SCREEN]
+
 
 def init_gamepad():
     for i in range(5):
         pr.trace_log(pr.TraceLogLevel.LOG_INFO, f"GAMEPAD: id: {i} - {pr.get_gamepad_name(i)}")
 
 
+def has_display() -> bool:
+    """Tells if a window can be created, even a hidden one needs a display on Linux."""
+    return sys.platform != "linux" or any(os.environ.get(x) for x in ("DISPLAY", "WAYLAND_DISPLAY"))
+
+
+def load_read_pixels() -> Optional[Callable[[np.ndarray], None]]:
+    """Returns a function reading the pixels of the bound framebuffer into a (height, width, 3) uint8 array.
+
+    raylib only reads pixels into a buffer it allocates, so this calls the OpenGL functions it loaded instead. It must
+    be called once the window is created, and returns None for the builds of raylib which do not export them.
+    """
+    try:
+        import raylib._raylib_cffi as raylib_cffi
+
+        library = ctypes.CDLL(raylib_cffi.__file__)
+        read_pixels = ctypes.c_void_p.in_dll(library, "glad_glReadPixels").value
+        pixel_store = ctypes.c_void_p.in_dll(library, "glad_glPixelStorei").value
+    except (ImportError, OSError, ValueError):
+        return None
+    if not read_pixels or not pixel_store:
+        return None
+
+    gl_read_pixels = ctypes.CFUNCTYPE(None, *[ctypes.c_int] * 4, ctypes.c_uint, ctypes.c_uint, ctypes.c_void_p)(
+        read_pixels
+    )
+    ctypes.CFUNCTYPE(None, ctypes.c_uint, ctypes.c_int)(pixel_store)(GL_PACK_ALIGNMENT, 1)  # The rows are not padded
+
+    def read(pixels: np.ndarray) -> None:
+        assert pixels.dtype == np.uint8 and pixels.ndim == 3 and pixels.shape[2] == 3  # noqa: PLR2004
+        assert pixels.flags.c_contiguous
+        pr.rl_draw_render_batch_active()
+        gl_read_pixels(0, 0, pixels.shape[1], pixels.shape[0], GL_RGB, GL_UNSIGNED_BYTE, pixels.ctypes.data)
+
+    return read
+
+
+def get_camera_view(camera: pr.Camera2D, width: int = WINDOW_WIDTH, height: int = WINDOW_HEIGHT) -> pr.Rectangle:
+    """Returns the world rectangle seen by a camera without rotation through a viewport of the given size."""
+    return pr.Rectangle(
+        camera.target.x - camera.offset.x / camera.zoom,
+        camera.target.y - camera.offset.y / camera.zoom,
+        width / camera.zoom,
+        height / camera.zoom,
+    )
+
+
+def begin_mode_2d(camera: pr.Camera2D, width: int = WINDOW_WIDTH, height: int = WINDOW_HEIGHT) -> None:
+    """Begins the 2D mode and culls the following draws against the camera view."""
+    _view.append(get_camera_view(camera, width, height))
+    pr.begin_mode_2d(camera)
+
+
+def end_mode_2d() -> None:
+    pr.end_mode_2d()
+    _view.pop()
+
+
+def get_view() -> pr.Rectangle:
+    """Returns the rectangle seen in the current drawing space, the screen outside of any 2D mode."""
+    return _view[-1]
+
+
+def is_visible(x1: float, y1: float, x2: float, y2: float, margin: float = 0) -> bool:
+    view = _view[-1]
+    return (
+        x1 - margin <= view.x + view.width
+        and x2 + margin >= view.x
+        and y1 - margin <= view.y + view.height
+        and y2 + margin >= view.y
+    )
+
+
 def draw_text(
     text: str,
     pos: pr.Vector2,
@@ -47,13 +129,7 @@ def draw_line(
     color: pr.Color,
     rounded: bool,
 ) -> None:
-    aabb = pr.Rectangle(
-        min(start.x, end.x),
-        min(start.y, end.y),
-        abs(end.x - start.x),
-        abs(end.y - start.y),
-    )
-    if pr.get_collision_rec(SCREEN, aabb) is None:
+    if not is_visible(min(start.x, end.x), min(start.y, end.y), max(start.x, end.x), max(start.y, end.y), thick):
         return
 
     pr.draw_line_ex(start, end, thick, color)
@@ -70,13 +146,7 @@ def draw_dashed_line(
     dashed: tuple[int, pr.Color],
     rounded: bool,
 ) -> None:
-    aabb = pr.Rectangle(
-        min(start.x, end.x),
-        min(start.y, end.y),
-        abs(end.x - start.x),
-        abs(end.y - start.y),
-    )
-    if pr.get_collision_rec(SCREEN, aabb) is None:
+    if not is_visible(min(start.x, end.x), min(start.y, end.y), max(start.x, end.x), max(start.y, end.y), thick):
         return
 
     u = pr.vector2_subtract(end, start)
@@ -0,0 +1,145 @@
+from __future__ import annotations
+
+from typing import Optional
+
+import numpy as np
+import numpy.typing as npt
+import pyray as pr
+from taxi_driver_env.render.atlas import Atlas
+
+CAPACITY = 1024  # quads
+
+# Quad corners relative to the center, in the order top-left, bottom-left, bottom-right, top-right like rlgl, and
+# the two triangles splitting the quad
+
+CORNERS = np.array([[-0.5, -0.5], [-0.5, 0.5], [0.5, 0.5], [0.5, -0.5]], dtype=np.float32)
+TRIANGLES = np.array([0, 1, 2, 0, 2, 3])
+
+Color = tuple[int, int, int, int] | npt.NDArray[np.uint8]
+
+
+def to_rgba(color: pr.Color | Color) -> Color:
+    if isinstance(color, pr.ffi.CData):
+        return color.r, color.g, color.b, color.a
+    return color
+
+
+class SpriteBatch:
+    """Collects the textured quads of an atlas into preallocated arrays and submits them as one mesh draw.
+
+    The arrays are uploaded to the GPU only when the content changed since the last draw, so a batch filled once can
+    be redrawn for the cost of a single draw call.
+    """
+
+    def __init__(self, atlas: Atlas, capacity: int = CAPACITY) -> None:
+        self.atlas = atlas
+        self.count = 0
+        self.dirty = False
+        self.mesh: Optional[pr.Mesh] = None
+        self.material: Optional[pr.Material] = None
+        self._allocate(capacity)
+
+    def reserve(self, capacity: int) -> None:
+        if capacity <= self.capacity:
+            return
+        self.unload()
+        vertices, texcoords, colors = self.vertices, self.texcoords, self.colors
+        self._allocate(max(capacity, self.capacity * 2))
+        self.vertices[: self.count] = vertices[: self.count]
+        self.texcoords[: self.count] = texcoords[: self.count]
+        self.colors[: self.count] = colors[: self.count]
+
+    def clear(self) -> None:
+        self.count = 0
+        self.dirty = True
+
+    def add(
+        self,
+        region: str,
+        positions: npt.ArrayLike,
+        size: npt.ArrayLike,
+        angles: npt.ArrayLike,
+        colors: pr.Color | Color,
+    ) -> None:
+        """Adds a quad per position, centered and rotated by the angle in radians like `pr.draw_texture_pro`."""
+        positions = np.asarray(positions, dtype=np.float32).reshape(-1, 2)
+        n = len(positions)
+        if n == 0:
+            return
+        self.reserve(self.count + n)
+
+        cos, sin = np.cos(angles), np.sin(angles)
+        corners = CORNERS * np.broadcast_to(np.asarray(size, dtype=np.float32), (n, 2))[:, None, :]
+        rotated = np.empty_like(corners)
+        rotated[..., 0] = corners[..., 0] * np.reshape(cos, (-1, 1)) - corners[..., 1] * np.reshape(sin, (-1, 1))
+        rotated[..., 1] = corners[..., 0] * np.reshape(sin, (-1, 1)) + corners[..., 1] * np.reshape(cos, (-1, 1))
+        rotated += positions[:, None, :]
+
+        quads = slice(self.count, self.count + n)
+        self.vertices[quads, :, :2] = rotated[:, TRIANGLES]
+        self.texcoords[quads] = self.atlas.get_texcoords(region)[TRIANGLES]
+        colors = np.asarray(to_rgba(colors), dtype=np.uint8).reshape(-1, 4)
+        self.colors[quads] = np.broadcast_to(colors, (n, 4))[:, None, :]
+        self.count += n
+        self.dirty = True
+
+    def draw(self) -> None:
+        if self.count == 0:
+            return
+
+        if self.mesh is None or self.material is None:
+            self._load()
+        assert self.mesh is not None and self.material is not None
+
+        if self.dirty:
+            n = self.count * len(TRIANGLES)
+            for index, buffer in ((0, self.vertices), (1, self.texcoords), (3, self.colors)):
+                pr.update_mesh_buffer(
+                    self.mesh,
+                    index,
+                    pr.ffi.cast("void *", pr.ffi.from_buffer(buffer)),
+                    n * buffer.itemsize * buffer.shape[-1],
+                    0,
+                )
+            self.dirty = False
+
+        self.mesh.vertexCount = self.count * len(TRIANGLES)
+        self.mesh.triangleCount = self.count * 2
+        self.material.maps[pr.MaterialMapIndex.MATERIAL_MAP_ALBEDO].texture = self.atlas.texture
+
+        # Flush the sprites already queued by rlgl so the batch keeps the drawing order
+
+        pr.rl_draw_render_batch_active()
+        pr.draw_mesh(self.mesh, self.material, pr.matrix_identity())
+
+    def unload(self) -> None:
+        if self.mesh is not None:
+            # The arrays are owned by numpy, raylib must not free them
+
+            self.mesh.vertices = pr.ffi.NULL
+            self.mesh.texcoords = pr.ffi.NULL
+            self.mesh.colors = pr.ffi.NULL
+            pr.unload_mesh(self.mesh)
+            self.mesh = None
+        if self.material is not None:
+            self.material.maps[pr.MaterialMapIndex.MATERIAL_MAP_ALBEDO].texture.id = pr.rl_get_texture_id_default()
+            pr.unload_material(self.material)
+            self.material = None
+        self.dirty = True
+
+    def _allocate(self, capacity: int) -> None:
+        self.capacity = capacity
+        self.vertices = np.zeros((capacity, len(TRIANGLES), 3), dtype=np.float32)
+        self.texcoords = np.zeros((capacity, len(TRIANGLES), 2), dtype=np.float32)
+        self.colors = np.zeros((capacity, len(TRIANGLES), 4), dtype=np.uint8)
+
+    def _load(self) -> None:
+        self.mesh = pr.Mesh()
+        self.mesh.vertexCount = self.capacity * len(TRIANGLES)
+        self.mesh.triangleCount = self.capacity * 2
+        self.mesh.vertices = pr.ffi.cast("float *", pr.ffi.from_buffer(self.vertices))
+        self.mesh.texcoords = pr.ffi.cast("float *", pr.ffi.from_buffer(self.texcoords))
+        self.mesh.colors = pr.ffi.cast("unsigned char *", pr.ffi.from_buffer(self.colors))
+        pr.upload_mesh(self.mesh, True)
+        self.material = pr.load_material_default()
+        self.dirty = False
@@ -0,0 +1,125 @@
+from __future__ import annotations
+
+import math
+from collections import OrderedDict
+from typing import Callable, Hashable, Optional
+
+import pyray as pr
+import taxi_driver_env.render.pyrayex as prx
+
+TILE_SIZE = 512  # px
+MAX_TILES = 64
+BAKE_BUDGET = 4  # tiles per frame
+MIN_SCALE = 1
+MAX_SCALE = 32
+
+TileKey = tuple[int, int, int]  # scale, tile x, tile y
+
+
+class TileCache:
+    """Rasterizes a static layer once into tiled render textures and blits only the visible tiles.
+
+    Tiles are baked lazily per zoom bucket, the smallest power of two above the camera zoom, so a tile is always
+    down-sampled when blitted. The least recently used tiles are unloaded when the cache is full.
+    """
+
+    def __init__(
+        self,
+        draw_func: Callable[[], None],
+        clear_color: pr.Color,
+        tile_size: int = TILE_SIZE,
+        max_tiles: int = MAX_TILES,
+        bake_budget: int = BAKE_BUDGET,
+    ) -> None:
+        self.draw_func = draw_func
+        self.clear_color = clear_color
+        self.tile_size = tile_size
+        self.max_tiles = max_tiles
+        self.bake_budget = bake_budget
+        self.tiles: OrderedDict[TileKey, pr.RenderTexture] = OrderedDict()
+        self.visible: list[TileKey] = []
+        self.complete = False
+        self.owner: Optional[Hashable] = None
+
+    def get_scale(self, zoom: float) -> int:
+        scale = 2 ** math.ceil(math.log2(max(zoom, MIN_SCALE)))
+        return min(scale, MAX_SCALE)
+
+    def get_visible_tiles(self, camera: pr.Camera2D) -> list[TileKey]:
+        scale = self.get_scale(camera.zoom)
+        size = self.tile_size / scale
+        view = prx.get_camera_view(camera)
+        x1, y1 = math.floor(view.x / size), math.floor(view.y / size)
+        x2, y2 = math.floor((view.x + view.width) / size), math.floor((view.y + view.height) / size)
+        return [(scale, tx, ty) for ty in range(y1, y2 + 1) for tx in range(x1, x2 + 1)]
+
+    def prepare(self, camera: pr.Camera2D, owner: Optional[Hashable] = None, complete: bool = False) -> None:
+        """Bakes the missing visible tiles, must be called outside of any 2D or texture mode.
+
+        Args:
+            camera: The camera the layer will be drawn with.
+            owner: An identifier of the layer content, the tiles are discarded when it changes.
+            complete: Bakes all the missing tiles at once instead of the budget per frame.
+        """
+        if owner != self.owner:
+            self.clear()
+            self.owner = owner
+
+        self.visible = self.get_visible_tiles(camera)
+        self.complete = True
+
+        budget = len(self.visible) if complete else self.bake_budget
+        for key in self.visible:
+            if key in self.tiles:
+                self.tiles.move_to_end(key)
+            elif budget > 0:
+                self.tiles[key] = self._bake(key)
+                budget -= 1
+            else:
+                self.complete = False
+
+        while len(self.tiles) > max(self.max_tiles, len(self.visible)):
+            _, target = self.tiles.popitem(last=False)
+            pr.unload_render_texture(target)
+
+    def draw(self) -> bool:
+        """Blits the visible tiles, returns False if some are not baked yet and the layer must be drawn directly."""
+        if not self.complete:
+            return False
+
+        for scale, tx, ty in self.visible:
+            tex = self.tiles[(scale, tx, ty)].texture
+            size = self.tile_size / scale
+            pr.draw_texture_pro(
+                tex,
+                pr.Rectangle(0, 0, tex.width, -tex.height),
+                pr.Rectangle(tx * size, ty * size, size, size),
+                pr.Vector2(0, 0),
+                0,
+                pr.WHITE,  # type: ignore
+            )
+        return True
+
+    def clear(self) -> None:
+        for target in self.tiles.values():
+            pr.unload_render_texture(target)
+        self.tiles.clear()
+        self.visible = []
+        self.complete = False
+
+    def _bake(self, key: TileKey) -> pr.RenderTexture:
+        scale, tx, ty = key
+        size = self.tile_size / scale
+
+        target = pr.load_render_texture(self.tile_size, self.tile_size)
+        pr.begin_texture_mode(target)
+        pr.clear_background(self.clear_color)
+        prx.begin_mode_2d(
+            pr.Camera2D(pr.Vector2(0, 0), pr.Vector2(tx * size, ty * size), 0, scale), self.tile_size, self.tile_size
+        )
+        self.draw_func()
+        prx.end_mode_2d()
+        pr.end_texture_mode()
+
+        pr.set_texture_filter(target.texture, pr.TextureFilter.TEXTURE_FILTER_BILINEAR)
+        return target
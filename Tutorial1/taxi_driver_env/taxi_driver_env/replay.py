@@ -0,0 +1,81 @@
+import argparse
+import sys
+import time
+
+import numpy as np
+
+from taxi_driver_env.envs.tutorial1_env import Tutorial1Env
+from taxi_driver_env.game.scenes import trainer
+from taxi_driver_env.utils.recorder import Episode, Keyframe, RecordingReader, Step
+
+
+def replay(path: str, agent: int | None = None, render_fps: int | None = None) -> int:
+    """Re-simulates a recording and checks that the states at the keyframes are the recorded ones.
+
+    Args:
+        path: The recording file.
+        agent: The vin of the agent followed by the camera, the replay is headless if it is not given.
+        render_fps: The frame rate of the rendered replay.
+
+    Returns:
+        The number of keyframes which diverged.
+    """
+    reader = RecordingReader(path)
+    header = reader.header
+    assert agent is None or 0 <= agent < header.agent_count
+
+    env = Tutorial1Env(
+        agent_count=header.agent_count,
+        render_mode="human" if agent is not None else None,
+        render_fps=render_fps,
+        integrator=header.integrator,
+        substeps=header.substeps,
+        dt=header.dt,
+        autoreset=header.autoreset,
+    )
+
+    episodes, steps, keyframes, diverged = 0, 0, 0, 0
+    start = None
+    try:
+        for record in reader:
+            match record:
+                case Episode(seed, corridor_id, spawn_index, spawn_point):
+                    options = {"corridor_id": corridor_id, "spawn_location": (spawn_index, spawn_point)}
+                    env.reset(seed=seed, options=options)
+                    trainer.get_singleton().follow_vin = agent
+                    episodes += 1
+                case Step(actions):
+                    start = start or time.perf_counter()
+                    env.step(actions.astype(np.float64))
+                    steps += 1
+                case Keyframe(step, pos, vel, head):
+                    agents = trainer.get_agents()
+                    state = [np.array([getattr(x, name) for x in agents]) for name in ("pos", "vel", "head")]
+                    if not all(np.array_equal(x, y) for x, y in zip(state, (pos, vel, head), strict=True)):
+                        error = max(float(np.abs(x - y).max()) for x, y in zip(state, (pos, vel, head), strict=True))
+                        print(f"Episode {episodes} diverged at step {step}, max error {error:.6g}", file=sys.stderr)
+                        diverged += 1
+                    keyframes += 1
+    finally:
+        env.close()
+
+    elapsed = time.perf_counter() - start if start is not None else 0.0
+    print(
+        f"{episodes} episodes, {steps} steps in {elapsed:.2f}s ({steps / max(elapsed, 1e-9):.0f} steps/s), "
+        f"{keyframes - diverged}/{keyframes} keyframes matched"
+    )
+    return diverged
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(prog="taxi_driver_env.replay", description="Replay a recorded simulation.")
+    parser.add_argument("file", help="recording file written by the environment")
+    parser.add_argument("--agent", type=int, help="render the replay following the agent with this vin")
+    parser.add_argument("--render-fps", type=int, help="frame rate of the rendered replay")
+    args = parser.parse_args()
+
+    return 1 if replay(args.file, args.agent, args.render_fps) > 0 else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
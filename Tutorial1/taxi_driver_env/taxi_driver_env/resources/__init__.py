@@ -1,6 +1,10 @@
-from functools import cache
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from functools import lru_cache
 from importlib import resources as impresources
-from typing import Callable
+from typing import Any, Iterable
 
 import pyray as pr
 
@@ -18,32 +22,120 @@ RESOURCES = {
     "mono": "fonts/GelatinMono.ttf",
 }
 
-_gc: list[Callable[[], None]] = []
+UPLOAD_BUDGET = 0.004  # s per frame
+
+_textures: dict[str, pr.Texture] = {}
+_sounds: dict[str, pr.Sound] = {}
+_fonts: dict[tuple[str, int], pr.Font] = {}
+_font_data: dict[str, bytes] = {}
+
+
+@dataclass
+class Preloader:
+    executor: ThreadPoolExecutor = field(default_factory=lambda: ThreadPoolExecutor(max_workers=1))
+    pending: deque[tuple[str, Future]] = field(default_factory=deque)
+    requested: int = 0
+    completed: int = 0
+
+
+@lru_cache(1)
+def get_preloader(name: str = "default") -> Preloader:
+    return Preloader()
+
+
+def get_path(name: str) -> str:
+    return str(impresources.files(res) / RESOURCES[name])
 
 
 def clear_caches():
-    [x() or True for x in _gc]
-    load_texture.cache_clear()
-    load_sound.cache_clear()
-    load_font.cache_clear()
+    for texture in _textures.values():
+        pr.unload_texture(texture)
+    for sound in _sounds.values():
+        pr.unload_sound(sound)
+    for font in _fonts.values():
+        pr.unload_font(font)
+    _textures.clear()
+    _sounds.clear()
+    _fonts.clear()
+    _font_data.clear()
 
 
-@cache
 def load_texture(name: str) -> pr.Texture:
-    texture = pr.load_texture(str(impresources.files(res) / RESOURCES[name]))
-    _gc.append(lambda: pr.unload_texture(texture))
+    texture = _textures.get(name)
+    if texture is None:
+        texture = _textures[name] = pr.load_texture(get_path(name))
     return texture
 
 
-@cache
 def load_sound(name: str) -> pr.Sound:
-    sound = pr.load_sound(str(impresources.files(res) / RESOURCES[name]))
-    _gc.append(lambda: pr.unload_sound(sound))
+    sound = _sounds.get(name)
+    if sound is None:
+        sound = _sounds[name] = pr.load_sound(get_path(name))
     return sound
 
 
-@cache
 def load_font(name: str, size: int = 20) -> pr.Font:
-    font = pr.load_font_ex(str(impresources.files(res) / RESOURCES[name]), size, None, 0)
-    _gc.append(lambda: pr.unload_font(font))
+    font = _fonts.get((name, size))
+    if font is None:
+        data = _font_data.get(name)
+        if data is None:
+            font = pr.load_font_ex(get_path(name), size, None, 0)
+        else:
+            font = pr.load_font_from_memory(
+                ".ttf", pr.ffi.cast("unsigned char *", pr.ffi.from_buffer(data)), len(data), size, None, 0
+            )
+        _fonts[(name, size)] = font
     return font
+
+
+def preload(names: Iterable[str] = RESOURCES) -> None:
+    """Decodes the images, waves and font files in the background, `process_uploads` moves them to the devices."""
+    preloader = get_preloader()
+    pending = {x for x, _ in preloader.pending}
+    for name in names:
+        if name in _textures or name in _sounds or name in _font_data or name in pending:
+            continue
+        pending.add(name)
+        preloader.pending.append((name, preloader.executor.submit(_decode, name)))
+        preloader.requested += 1
+
+
+def process_uploads(budget: float = UPLOAD_BUDGET) -> None:
+    """Uploads the decoded resources on the main thread, until the time budget of the frame is spent."""
+    preloader = get_preloader()
+    start = time.perf_counter()
+    while preloader.pending and preloader.pending[0][1].done():
+        name, future = preloader.pending.popleft()
+        _upload(name, future.result())
+        preloader.completed += 1
+        if time.perf_counter() - start > budget:
+            break
+
+
+def get_progress() -> float:
+    preloader = get_preloader()
+    return preloader.completed / preloader.requested if preloader.requested > 0 else 1.0
+
+
+def _decode(name: str) -> Any:
+    path = get_path(name)
+    if path.endswith(".png"):
+        return pr.load_image(path)
+    if path.endswith(".ogg"):
+        return pr.load_wave(path)
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def _upload(name: str, data: Any) -> None:
+    path = get_path(name)
+    if path.endswith(".png"):
+        if name not in _textures:
+            _textures[name] = pr.load_texture_from_image(data)
+        pr.unload_image(data)
+    elif path.endswith(".ogg"):
+        if name not in _sounds:
+            _sounds[name] = pr.load_sound_from_wave(data)
+        pr.unload_wave(data)
+    else:
+        _font_data[name] = data
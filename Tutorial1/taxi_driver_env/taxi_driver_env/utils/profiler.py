@@ -0,0 +1,121 @@
+from __future__ import annotations
+
+import cProfile
+import time
+from collections import deque
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Iterator, Optional
+
+import numpy as np
+
+WINDOW_SIZE = 600  # samples
+PERCENTILES = (50, 95, 99)
+
+
+class Timer:
+    __slots__ = ("samples", "start")
+
+    def __init__(self, window_size: int = WINDOW_SIZE) -> None:
+        self.samples: deque[float] = deque(maxlen=window_size)
+        self.start = 0.0
+
+    def __enter__(self) -> Timer:
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *_) -> None:
+        self.samples.append(time.perf_counter() - self.start)
+
+    def summary(self) -> dict[str, float]:
+        samples = np.fromiter(self.samples, dtype=np.float64, count=len(self.samples)) * 1000  # ms
+        if len(samples) == 0:
+            return {"count": 0}
+        return {
+            "count": len(samples),
+            "mean": float(samples.mean()),
+            **{f"p{p}": float(x) for p, x in zip(PERCENTILES, np.percentile(samples, PERCENTILES), strict=True)},
+        }
+
+
+class NullTimer:
+    __slots__ = ()
+
+    def __enter__(self) -> NullTimer:
+        return self
+
+    def __exit__(self, *_) -> None:
+        pass
+
+
+NULL_TIMER = NullTimer()
+
+
+@dataclass
+class Profiler:
+    enabled: bool = False
+    window_size: int = WINDOW_SIZE
+    timers: dict[str, Timer] = field(default_factory=dict)
+    cprofile: Optional[cProfile.Profile] = None
+
+    def timer(self, name: str) -> Timer | NullTimer:
+        if not self.enabled:
+            return NULL_TIMER
+        timer = self.timers.get(name)
+        if timer is None:
+            timer = self.timers[name] = Timer(self.window_size)
+        return timer
+
+    def summary(self) -> dict[str, dict[str, float]]:
+        return {name: timer.summary() for name, timer in sorted(self.timers.items())}
+
+    def reset(self) -> None:
+        self.timers.clear()
+
+    def start_cprofile(self) -> None:
+        self.cprofile = cProfile.Profile()
+        self.cprofile.enable()
+
+    def stop_cprofile(self, file_path: str) -> None:
+        """Stops the cProfile hook and dumps the stats into a file, ready to be opened by snakeviz."""
+        if self.cprofile is None:
+            return
+        self.cprofile.disable()
+        self.cprofile.dump_stats(file_path)
+        self.cprofile = None
+
+
+@lru_cache(1)
+def get_singleton(name: str = "default") -> Profiler:
+    return Profiler()
+
+
+# The profilers activated by the callers, the last one receives the timers of the module
+
+_ACTIVE: list[Profiler] = []
+
+
+@contextmanager
+def activate(profiler: Profiler) -> Iterator[Profiler]:
+    """Routes the timers of the module to a profiler for the duration of the block, instead of the singleton."""
+    _ACTIVE.append(profiler)
+    try:
+        yield profiler
+    finally:
+        _ACTIVE.pop()
+
+
+def timer(name: str) -> Timer | NullTimer:
+    return (_ACTIVE[-1] if _ACTIVE else get_singleton()).timer(name)
+
+
+def format_summary(summary: dict[str, dict[str, float]]) -> str:
+    lines = [f"{'phase':<24}{'count':>8}{'mean':>10}" + "".join(f"{f'p{p}':>10}" for p in PERCENTILES)]
+    for name, stats in summary.items():
+        if stats["count"] == 0:
+            continue
+        line = f"{name:<24}{stats['count']:>8}{stats['mean']:>10.3f}"
+        line += "".join(f"{stats[f'p{p}']:>10.3f}" for p in PERCENTILES)
+        lines.append(line)
+    return "\n".join(lines)
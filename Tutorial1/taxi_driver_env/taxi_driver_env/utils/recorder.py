@@ -0,0 +1,181 @@
+from __future__ import annotations
+
+import struct
+from dataclasses import dataclass
+from typing import BinaryIO, Iterator, Optional
+
+import numpy as np
+import numpy.typing as npt
+
+MAGIC = b"TDRC"
+VERSION = 2
+KEYFRAME_EVERY = 600  # steps
+DTYPES = {"float16": np.float16, "float32": np.float32}
+
+# All the records are little endian and fixed width once the header is known, a record starts with a one byte tag
+
+# magic, version, agent count, dtype, substeps, dt, keyframe every, integrator, autoreset
+HEADER = struct.Struct("<4sHI8sIdI24s?")
+HEADER_VERSION_1 = struct.Struct("<4sHI8sIdI24s")  # without the autoreset
+PREFIX = struct.Struct("<4sH")  # magic, version
+EPISODE = struct.Struct("<qii2d")  # seed, corridor id, spawn index, spawn point
+KEYFRAME = struct.Struct("<Q")  # step, followed by the positions, velocities and headings as float64
+TAG_EPISODE = b"E"
+TAG_STEP = b"S"
+TAG_KEYFRAME = b"K"
+
+
+@dataclass
+class Header:
+    agent_count: int
+    dtype: str = "float32"
+    substeps: int = 1
+    dt: float = 1 / 60
+    keyframe_every: int = KEYFRAME_EVERY
+    integrator: str = "semi_implicit_euler"
+    autoreset: bool = False
+
+    def pack(self) -> bytes:
+        return HEADER.pack(
+            MAGIC,
+            VERSION,
+            self.agent_count,
+            self.dtype.encode(),
+            self.substeps,
+            self.dt,
+            self.keyframe_every,
+            self.integrator.encode(),
+            self.autoreset,
+        )
+
+    @staticmethod
+    def unpack(data: bytes) -> Header:
+        # The recordings of the first version had no autoreset
+
+        layout = _get_header_layout(data)
+        if layout is HEADER_VERSION_1:
+            _, _, agent_count, dtype, substeps, dt, keyframe_every, integrator = layout.unpack_from(data)
+            autoreset = False
+        else:
+            _, _, agent_count, dtype, substeps, dt, keyframe_every, integrator, autoreset = layout.unpack_from(data)
+        return Header(
+            agent_count,
+            dtype.rstrip(b"\0").decode(),
+            substeps,
+            dt,
+            keyframe_every,
+            integrator.rstrip(b"\0").decode(),
+            autoreset,
+        )
+
+
+def _get_header_layout(data: bytes) -> struct.Struct:
+    magic, version = PREFIX.unpack_from(data)
+    assert magic == MAGIC, "Not a recording file"
+    assert version in (1, VERSION), f"Unsupported recording version {version}"
+    return HEADER_VERSION_1 if version == 1 else HEADER
+
+
+@dataclass
+class Episode:
+    seed: Optional[int]
+    corridor_id: int
+    spawn_index: int = -1
+    spawn_point: Optional[npt.NDArray[np.float64]] = None
+
+
+@dataclass
+class Step:
+    actions: npt.NDArray[np.floating]
+
+
+@dataclass
+class Keyframe:
+    step: int
+    pos: npt.NDArray[np.float64]
+    vel: npt.NDArray[np.float64]
+    head: npt.NDArray[np.float64]
+
+
+Record = Episode | Step | Keyframe
+
+
+class Recorder:
+    """Appends the episodes and the actions of every step to a binary log, from which a run can be re-simulated.
+
+    A step is a single preallocated record written to a buffered file, so the recording can stay on during training.
+    The actions are stored in a reduced precision, `write_step` returns them as they were stored and they must be the
+    ones applied to the simulation for the replay to be exact.
+    """
+
+    def __init__(self, path: str, header: Header) -> None:
+        assert header.dtype in DTYPES
+        self.header = header
+        self.file: BinaryIO = open(path, "wb")  # noqa: SIM115
+        self.file.write(header.pack())
+
+        self._step = bytearray(TAG_STEP) + bytearray(header.agent_count * 2 * np.dtype(header.dtype).itemsize)
+        self._actions = np.frombuffer(self._step, dtype=header.dtype, offset=1).reshape(header.agent_count, 2)
+        self._applied = np.zeros((header.agent_count, 2), dtype=np.float64)
+
+    def write_episode(self, episode: Episode) -> None:
+        x, y = episode.spawn_point if episode.spawn_point is not None else (np.nan, np.nan)
+        seed = episode.seed if episode.seed is not None else -1
+        self.file.write(TAG_EPISODE + EPISODE.pack(seed, episode.corridor_id, episode.spawn_index, x, y))
+
+    def write_step(self, actions: npt.ArrayLike) -> npt.NDArray[np.float64]:
+        np.copyto(self._actions, actions, casting="same_kind")
+        self.file.write(self._step)
+        np.copyto(self._applied, self._actions)
+        return self._applied
+
+    def write_keyframe(self, keyframe: Keyframe) -> None:
+        self.file.write(TAG_KEYFRAME + KEYFRAME.pack(keyframe.step))
+        for array in (keyframe.pos, keyframe.vel, keyframe.head):
+            self.file.write(np.ascontiguousarray(array, dtype="<f8").tobytes())
+
+    def close(self) -> None:
+        self.file.close()
+
+
+class RecordingReader:
+    """Iterates over the records of a log, a record truncated by an interrupted run ends the iteration."""
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        with open(path, "rb") as f:
+            data = f.read(HEADER.size)
+        self.header = Header.unpack(data)
+        self._start = _get_header_layout(data).size
+
+    def __iter__(self) -> Iterator[Record]:
+        n = self.header.agent_count
+        dtype = np.dtype(self.header.dtype).newbyteorder("<")
+        step_size = n * 2 * dtype.itemsize
+        keyframe_size = n * 2 * 3 * 8
+
+        with open(self.path, "rb") as f:
+            f.seek(self._start)
+            while tag := f.read(1):
+                match tag:
+                    case b"E":
+                        data = f.read(EPISODE.size)
+                        if len(data) < EPISODE.size:
+                            return
+                        seed, corridor_id, spawn_index, x, y = EPISODE.unpack(data)
+                        spawn_point = np.array([x, y]) if spawn_index >= 0 else None
+                        yield Episode(seed if seed >= 0 else None, corridor_id, spawn_index, spawn_point)
+                    case b"S":
+                        data = f.read(step_size)
+                        if len(data) < step_size:
+                            return
+                        yield Step(np.frombuffer(data, dtype=dtype).reshape(n, 2))
+                    case b"K":
+                        data = f.read(KEYFRAME.size + keyframe_size)
+                        if len(data) < KEYFRAME.size + keyframe_size:
+                            return
+                        (step,) = KEYFRAME.unpack_from(data)
+                        pos, vel, head = np.frombuffer(data, dtype="<f8", offset=KEYFRAME.size).reshape(3, n, 2)
+                        yield Keyframe(step, pos, vel, head)
+                    case _:
+                        raise ValueError(f"Corrupted recording, unknown record {tag!r} at {f.tell() - 1}")
@@ -0,0 +1,58 @@
+import numpy as np
+from taxi_driver_env.math.linalg import lst_2_vec
+from taxi_driver_env.physic.engine import euler_integrate, integrate
+
+K = 8.0  # Damping coefficient
+
+
+def damping(_: np.ndarray, vel: np.ndarray) -> np.ndarray:
+    return -K * vel
+
+
+def exact(pos: np.ndarray, vel: np.ndarray, t: float) -> tuple[np.ndarray, np.ndarray]:
+    return pos + vel * (1 - np.exp(-K * t)) / K, vel * np.exp(-K * t)
+
+
+class Body:
+    def __init__(self, pos: np.ndarray, vel: np.ndarray) -> None:
+        self.pos = pos
+        self.vel = vel
+        self.head = lst_2_vec([1, 0])
+        self.mass = 2.0
+
+
+def test_semi_implicit_euler_matches_euler_integrate():
+    body = Body(lst_2_vec([1, 2]), lst_2_vec([3, 4]))
+    pos, vel = integrate(body.pos.copy(), body.vel.copy(), lambda p, v: damping(p, v) / body.mass, 0.1)
+    euler_integrate(body, damping(body.pos, body.vel), 0.1)
+    assert np.array_equal(pos, body.pos)
+    assert np.array_equal(vel, body.vel)
+
+
+def test_integrate_batch():
+    pos = lst_2_vec([[1, 2], [3, 4]])
+    vel = lst_2_vec([[5, 6], [7, 8]])
+    for method in ("euler", "semi_implicit_euler", "rk4"):
+        batch_pos, batch_vel = integrate(pos, vel, damping, 0.1, method)
+        for i in range(2):
+            single_pos, single_vel = integrate(pos[i], vel[i], damping, 0.1, method)
+            assert np.allclose(batch_pos[i], single_pos)
+            assert np.allclose(batch_vel[i], single_vel)
+
+
+def test_rk4_accuracy():
+    pos, vel = lst_2_vec([0, 0]), lst_2_vec([10, 0])
+    expected_pos, expected_vel = exact(pos, vel, 1.0)
+    rk4_pos, rk4_vel = integrate(pos, vel, damping, 1.0, "rk4", 10)
+    euler_pos, euler_vel = integrate(pos, vel, damping, 1.0, "euler", 10)
+    assert np.allclose(rk4_pos, expected_pos, 0.0, 1e-2)
+    assert np.allclose(rk4_vel, expected_vel, 0.0, 1e-2)
+    assert np.linalg.norm(rk4_pos - expected_pos) < np.linalg.norm(euler_pos - expected_pos)
+
+
+def test_explicit_euler_diverges_on_large_step():
+    pos, vel = lst_2_vec([0, 0]), lst_2_vec([10, 0])
+    _, euler_vel = integrate(pos, vel, damping, 1.0, "euler", 3)
+    _, rk4_vel = integrate(pos, vel, damping, 1.0, "rk4", 3)
+    assert np.linalg.norm(euler_vel) > np.linalg.norm(vel)
+    assert np.linalg.norm(rk4_vel) < np.linalg.norm(vel)
@@ -0,0 +1,20 @@
+import numpy as np
+from taxi_driver_env.constants import VIRTUAL_WIDTH
+from taxi_driver_env.math.envelope import Envelope, get_nearest_segments
+from taxi_driver_env.math.geom import Point, Segment, distance_point_segment
+
+
+def test_envelope_nearest_segments():
+    rng = np.random.default_rng(1)
+    points = [Point(xy) for xy in rng.uniform(0, 1000, (200, 2))]
+    envelope = Envelope([Segment(a, b) for a, b in zip(points[::2], points[1::2], strict=True)], [], 10)
+
+    # The candidates are shared by a cell, the result must still be the one of the position itself
+
+    for xy in rng.uniform(0, 1000, (100, 2)):
+        position = Point(xy)
+        for radius in (5, 400):
+            nearest_distance = lambda x, p=position: distance_point_segment(p, x, True)
+            within = max(radius, VIRTUAL_WIDTH)
+            expected = sorted((x for x in envelope.segments if nearest_distance(x) < within), key=nearest_distance)
+            assert get_nearest_segments(envelope, position, radius) == expected
@@ -2,6 +2,7 @@ import numpy as np
 import pyray as pr
 from taxi_driver_env.math.geom import (
     Point,
+    PointArray,
     Segment,
     distance,
     distance_point_segment,
@@ -174,3 +175,27 @@ def test_point_nearest_out_of_segment_but_non_strict():
     x = nearest_point_segment(d, e, True)
     assert x is not None
     assert x.almost(Point(lst_2_vec([2, 2])))
+
+
+def test_point_array_getitem_is_view():
+    a = PointArray(lst_2_vec([[1, 1], [2, 2]]))
+    b = a[1]
+    b.xy[0] = 3
+    assert a.xy[1, 0] == 3
+
+
+def test_point_array_from_points():
+    a = PointArray.from_points([Point(lst_2_vec([1, 1])), Point(lst_2_vec([2, 2]))])
+    assert a.to_points() == [Point(lst_2_vec([1, 1])), Point(lst_2_vec([2, 2]))]
+
+
+def test_point_array_distance():
+    a = PointArray(lst_2_vec([[1, 1], [2, 2]]))
+    b = Point(lst_2_vec([1, 1]))
+    assert np.allclose(a.distance(b), [0, np.sqrt(2)])
+
+
+def test_point_array_almost():
+    a = PointArray(lst_2_vec([[1, 1], [2, 2]]))
+    b = PointArray(lst_2_vec([[0.9, 0.9], [2, 2]]))
+    assert np.array_equal(a.almost(b, 0.01), [False, True])
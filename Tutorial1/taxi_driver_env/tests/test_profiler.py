@@ -0,0 +1,33 @@
+from taxi_driver_env.utils.profiler import NULL_TIMER, Profiler, activate, get_singleton, timer
+
+
+def test_profiler_disabled():
+    profiler = Profiler()
+    assert profiler.timer("a") is NULL_TIMER
+    with profiler.timer("a"):
+        pass
+    assert profiler.summary() == {}
+
+
+def test_profiler_summary():
+    profiler = Profiler(enabled=True, window_size=4)
+    for _ in range(10):
+        with profiler.timer("a"):
+            pass
+    summary = profiler.summary()
+    assert summary["a"]["count"] == 4
+    assert 0 <= summary["a"]["p50"] <= summary["a"]["p95"] <= summary["a"]["p99"]
+
+
+def test_profiler_activate():
+    profiler = Profiler(enabled=True)
+    with activate(profiler):
+        with timer("a"):
+            pass
+        with activate(Profiler()):
+            assert timer("b") is NULL_TIMER
+        with timer("a"):
+            pass
+    assert profiler.summary()["a"]["count"] == 2
+    assert timer("a") is NULL_TIMER
+    assert get_singleton().summary() == {}
@@ -0,0 +1,80 @@
+import numpy as np
+from taxi_driver_env.utils.recorder import (
+    EPISODE,
+    HEADER_VERSION_1,
+    MAGIC,
+    TAG_EPISODE,
+    TAG_STEP,
+    Episode,
+    Header,
+    Keyframe,
+    Recorder,
+    RecordingReader,
+    Step,
+)
+
+
+def test_recorder_round_trip(tmp_path):
+    path = str(tmp_path / "run.tdrc")
+    recorder = Recorder(path, Header(3, "float16", 2, 0.01, 10, "rk4"))
+    recorder.write_episode(Episode(5, 7, 2, np.array([1.5, -2.0])))
+    applied = recorder.write_step(np.array([[0.1, 0.2], [0.3, 0.4], [0.5, 0.6]])).copy()
+    state = np.arange(18, dtype=np.float64).reshape(3, 3, 2)
+    recorder.write_keyframe(Keyframe(1, *state))
+    recorder.write_episode(Episode(None, 7))
+    recorder.close()
+
+    reader = RecordingReader(path)
+    assert reader.header == Header(3, "float16", 2, 0.01, 10, "rk4")
+
+    records = list(reader)
+    assert len(records) == 4
+    assert records[0].seed == 5 and records[0].corridor_id == 7 and records[0].spawn_index == 2
+    assert np.array_equal(records[0].spawn_point, [1.5, -2.0])
+    assert isinstance(records[1], Step)
+    assert np.array_equal(records[1].actions.astype(np.float64), applied)
+    assert np.array_equal(applied, np.float16([[0.1, 0.2], [0.3, 0.4], [0.5, 0.6]]))
+    assert records[2].step == 1 and np.array_equal(records[2].vel, state[1])
+    assert records[3].seed is None and records[3].spawn_point is None
+
+
+def test_recorder_truncated(tmp_path):
+    path = str(tmp_path / "run.tdrc")
+    recorder = Recorder(path, Header(2))
+    for _ in range(3):
+        recorder.write_step(np.zeros((2, 2)))
+    recorder.close()
+
+    with open(path, "r+b") as f:
+        f.truncate(f.seek(0, 2) - 1)
+
+    assert len(list(RecordingReader(path))) == 2
+
+
+def test_recorder_autoreset(tmp_path):
+    path = str(tmp_path / "run.tdrc")
+    recorder = Recorder(path, Header(2, autoreset=True))
+    recorder.write_step(np.zeros((2, 2)))
+    recorder.close()
+
+    reader = RecordingReader(path)
+    assert reader.header == Header(2, autoreset=True)
+    assert len(list(reader)) == 1
+
+
+def test_recorder_version_1(tmp_path):
+    # The first version had no autoreset in its header, its episodes always ended with the last survivor
+
+    path = str(tmp_path / "run.tdrc")
+    with open(path, "wb") as f:
+        f.write(HEADER_VERSION_1.pack(MAGIC, 1, 2, b"float32", 1, 0.01, 10, b"rk4"))
+        f.write(TAG_EPISODE + EPISODE.pack(5, 7, -1, np.nan, np.nan))
+        f.write(TAG_STEP + np.float32([[0.1, 0.2], [0.3, 0.4]]).tobytes())
+
+    reader = RecordingReader(path)
+    assert reader.header == Header(2, "float32", 1, 0.01, 10, "rk4", False)
+
+    records = list(reader)
+    assert len(records) == 2
+    assert records[0].seed == 5 and records[0].corridor_id == 7 and records[0].spawn_point is None
+    assert np.array_equal(records[1].actions, np.float32([[0.1, 0.2], [0.3, 0.4]]))
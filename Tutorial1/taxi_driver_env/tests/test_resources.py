@@ -0,0 +1,26 @@
+import pytest
+from taxi_driver_env import resources
+
+
+@pytest.fixture
+def preloader():
+    resources.get_preloader.cache_clear()
+    yield resources.get_preloader()
+    resources.get_preloader().executor.shutdown()
+    resources.get_preloader.cache_clear()
+    resources._font_data.clear()
+
+
+def test_preload_once(preloader):
+    resources.preload(["mono", "mono"])
+    resources.preload(["mono"])
+    assert [name for name, _ in preloader.pending] == ["mono"]
+    assert preloader.requested == 1
+
+    preloader.pending[0][1].result()
+    resources.process_uploads()
+    assert not preloader.pending and "mono" in resources._font_data
+    assert resources.get_progress() == 1.0
+
+    resources.preload(["mono"])
+    assert not preloader.pending and preloader.requested == 1
@@ -2,6 +2,7 @@ import numpy as np
 from taxi_driver_env.math.geom import (
     Point,
     Segment,
+    SegmentArray,
     break_segment,
     cast_ray_segments,
     collision_circle_segment,
@@ -261,3 +262,34 @@ def test_segment_not_break():
     e1 = Segment(a, c)
     e2 = Segment(b, d)
     assert break_segment(e1, e2) == [e2]
+
+
+def test_segment_array_getitem_is_view():
+    a = SegmentArray(lst_2_vec([[[1, 1], [2, 2]], [[2, 2], [3, 3]]]))
+    e = a[0]
+    e.end.xy[0] = 4
+    assert a.xy[0, 1, 0] == 4
+
+
+def test_segment_array_from_segments():
+    a = Point(lst_2_vec([1, 1]))
+    b = Point(lst_2_vec([2, 2]))
+    e = SegmentArray.from_segments([Segment(a, b)])
+    assert e.to_segments() == [Segment(a, b)]
+
+
+def test_segment_array_length():
+    e = SegmentArray(lst_2_vec([[[1, 1], [2, 2]], [[2, 2], [2, 3]]]))
+    assert np.allclose(e.length, [np.sqrt(2), 1])
+
+
+def test_segment_array_middle():
+    e = SegmentArray(lst_2_vec([[[1, 1], [2, 2]], [[2, 2], [2, 3]]]))
+    assert np.allclose(e.middle.xy, [[1.5, 1.5], [2, 2.5]])
+
+
+def test_segment_array_almost():
+    a = Point(lst_2_vec([1, 1]))
+    b = Point(lst_2_vec([2, 2]))
+    e = SegmentArray(lst_2_vec([[[2, 2], [1.01, 1.01]], [[1, 1], [3, 3]]]))
+    assert np.array_equal(e.almost(Segment(a, b), 0.1), [True, False])
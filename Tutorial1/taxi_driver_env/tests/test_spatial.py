@@ -0,0 +1,35 @@
+import numpy as np
+from taxi_driver_env.math.spatial import UniformGrid
+
+
+def test_uniform_grid_query_overlapping_boxes():
+    boxes = np.array([[0, 0, 10, 10], [100, 100, 110, 110], [-60, -60, 60, 60]])
+    grid = UniformGrid(boxes, 50)
+    assert len(grid) == 3
+    assert grid.query(5, 5, 6, 6).tolist() == [0, 2]
+    assert grid.query(105, 105, 200, 200).tolist() == [1]
+    assert grid.query(500, 500, 600, 600).tolist() == []
+
+
+def test_uniform_grid_query_rejects_boxes_sharing_a_cell():
+    grid = UniformGrid(np.array([[0, 0, 1, 1], [40, 40, 41, 41]]), 50)
+    assert grid.query(20, 20, 30, 30).tolist() == []
+
+
+def test_uniform_grid_from_segments_with_margin():
+    segments = np.array([[[0, 0], [10, 0]], [[20, 20], [20, 30]]])
+    grid = UniformGrid.from_segments(segments, 1)
+    np.testing.assert_array_equal(grid.boxes, [[-1, -1, 11, 1], [19, 19, 21, 31]])
+    assert grid.query(5, 0.5, 6, 0.8).tolist() == [0]
+    assert grid.query(5, 1.5, 6, 2).tolist() == []
+
+
+def test_uniform_grid_matches_brute_force():
+    rng = np.random.default_rng(0)
+    xy = rng.uniform(-300, 300, (200, 2))
+    boxes = np.hstack([xy, xy + rng.uniform(0, 80, (200, 2))])
+    grid = UniformGrid(boxes, 25)
+    for x1, y1 in rng.uniform(-300, 300, (20, 2)):
+        x2, y2 = x1 + 60, y1 + 40
+        expected = np.flatnonzero((boxes[:, 0] <= x2) & (boxes[:, 2] >= x1) & (boxes[:, 1] <= y2) & (boxes[:, 3] >= y1))
+        np.testing.assert_array_equal(grid.query(x1, y1, x2, y2), expected)
@@ -0,0 +1,133 @@
+import random
+
+import numpy as np
+import pytest
+from taxi_driver_env.envs.tutorial1_env import Tutorial1Env
+from taxi_driver_env.game.entities import world
+from taxi_driver_env.game.scenes import trainer
+from taxi_driver_env.utils import profiler
+
+SEED = 5
+
+
+@pytest.fixture(scope="module", autouse=True)
+def generated_world():
+    # The world is generated once for all the tests, each test starts with a new simulation in it
+
+    if not world.has_singleton():
+        random.seed(SEED)
+        world.get_singleton()
+
+
+@pytest.fixture
+def make_env():
+    envs = []
+
+    def make(**kwargs) -> Tutorial1Env:
+        trainer.get_singleton.cache_clear()
+        envs.append(Tutorial1Env(**kwargs))
+        return envs[-1]
+
+    yield make
+    for env in envs:
+        env.close()
+
+
+def test_env_autoreset(make_env):
+    env = make_env(agent_count=4, autoreset=True)
+    _, info = env.reset(seed=SEED)
+    spawn = [agent.pos.copy() for agent in trainer.get_agents()]
+    assert not info["dones"].any() and np.isnan(info["final_scores"]).all()
+
+    # The first two agents turn into a wall, the last two drive straight on for longer
+
+    action = np.array([[1.0, 0.6], [1.0, 0.6], [1.0, 0.0], [1.0, 0.0]])
+    for _ in range(600):
+        _, _, terminated, truncated, info = env.step(action)
+        assert not terminated and not truncated
+        if info["dones"].any():
+            break
+
+    dones, final_scores = info["dones"], info["final_scores"]
+    assert dones.tolist() == [True, True, False, False]
+    assert np.isfinite(final_scores[:2]).all() and np.isnan(final_scores[2:]).all()
+
+    # The dead agents are respawned in the same step, at their spawn location
+
+    for agent, pos, done in zip(trainer.get_agents(), spawn, dones, strict=True):
+        assert agent.is_alive()
+        assert np.array_equal(agent.pos, pos) == done
+
+    # The info of a step is not overwritten by the next steps
+
+    _, _, _, _, info = env.step(action)
+    assert not info["dones"].any() and np.isnan(info["final_scores"]).all()
+    assert dones.tolist() == [True, True, False, False]
+    assert np.isfinite(final_scores[:2]).all()
+
+
+def run_branch(env: Tutorial1Env, seed: int, steps: int = 40) -> list[tuple[np.ndarray, np.ndarray, list[float]]]:
+    rng = np.random.default_rng(seed)
+    trajectory = []
+    for _ in range(steps):
+        action = np.column_stack([rng.uniform(0.6, 1, env.agent_count), rng.uniform(-0.5, 0.5, env.agent_count)])
+        obs, _, _, _, info = env.step(action)
+        pos = np.array([agent.pos for agent in trainer.get_agents()])
+        trajectory.append((pos, np.concatenate([x["agent_cam"] for x in obs]), info["scores"]))
+    return trajectory
+
+
+def test_env_clone_state(make_env):
+    # With the autoreset, the agents crashed in a branch are respawned and drive on
+
+    env = make_env(agent_count=4, autoreset=True)
+    env.reset(seed=SEED)
+    run_branch(env, 1, 20)
+    state = env.clone_state()
+    obs, info = env.restore_state(state)
+
+    # Another branch runs from the state, then the restored state continues like the first branch
+
+    expected = run_branch(env, 2)
+    run_branch(env, 3)
+    restored_obs, restored_info = env.restore_state(state)
+    assert restored_info["scores"] == info["scores"]
+    for x, y in zip(restored_obs, obs, strict=True):
+        assert np.array_equal(x["agent_vel"], y["agent_vel"]) and np.array_equal(x["agent_cam"], y["agent_cam"])
+
+    trajectory = run_branch(env, 2)
+    for (pos, cam, scores), (expected_pos, expected_cam, expected_scores) in zip(trajectory, expected, strict=True):
+        assert np.array_equal(pos, expected_pos)
+        assert np.array_equal(cam, expected_cam)
+        assert scores == expected_scores
+
+
+def test_env_profile(make_env):
+    env = make_env(agent_count=2, profile=True)
+    env.reset(seed=SEED)
+    for _ in range(3):
+        _, _, _, _, info = env.step(np.ones((2, 2)))
+
+    # The timings are kept by the env and only summarized on demand
+
+    assert "profile" not in info
+    summary = env.profile_summary()
+    assert summary["env.update"]["count"] == 3
+    assert summary["trainer.entities"]["count"] == 3
+    assert not profiler.get_singleton().enabled
+
+    env = make_env(agent_count=2)
+    env.reset(seed=SEED)
+    env.step(np.ones((2, 2)))
+    assert env.profile_summary() == {}
+
+
+def test_env_rgb_array_without_display(make_env, monkeypatch):
+    monkeypatch.setattr("sys.platform", "linux")
+    monkeypatch.delenv("DISPLAY", raising=False)
+    monkeypatch.delenv("WAYLAND_DISPLAY", raising=False)
+    env = make_env(agent_count=2, render_mode="rgb_array")
+    env.reset(seed=SEED)
+
+    with pytest.raises(RuntimeError, match="xvfb-run"):
+        env.render()
@@ -0,0 +1,36 @@
+import random
+
+import pytest
+from taxi_driver_env.game.entities import world
+
+SEED = 5
+
+
+@pytest.fixture(scope="module", autouse=True)
+def generated_world():
+    if not world.has_singleton():
+        random.seed(SEED)
+        world.get_singleton()
+
+
+def test_world_generation():
+    original = world.get_singleton()
+    restored = world.World.from_arrays(original.to_arrays())
+    assert restored.generation > original.generation
+    assert restored.generation != world.World.from_arrays(original.to_arrays()).generation
+
+
+def test_world_static_index_regenerated():
+    original = world.get_singleton()
+    index = world._get_static_index(original)
+    assert world._get_static_index(original) is index
+
+    # A regenerated world may reuse the id of the previous one, its index must be built again anyway
+
+    restored = world.World.from_arrays(original.to_arrays())
+    world.set_singleton(restored)
+    try:
+        assert world._get_static_index(restored) is not index
+        assert list(world._static_indexes) == [restored.generation]
+    finally:
+        world.set_singleton(original)